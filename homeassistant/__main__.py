@@ -80,6 +80,17 @@ def get_arguments():
         '-v', '--verbose',
         action='store_true',
         help="Enable verbose logging to file.")
+    parser.add_argument(
+        '--parallel-setup',
+        action='store_true',
+        help='Setup components that do not depend on each other in parallel')
+    parser.add_argument(
+        '--profile-startup',
+        metavar='path_to_json',
+        nargs='?',
+        const='startup_profile.json',
+        help="Write where the startup time went to a JSON file in the "
+             "configuration directory and print a summary")
     parser.add_argument(
         '--script',
         nargs=argparse.REMAINDER,
@@ -88,9 +99,33 @@ def get_arguments():
     return parser.parse_args()
 
 
+def write_startup_profile(hass, path):
+    """Write the startup profile to path and print a summary."""
+    from homeassistant.util import profile
+
+    startup_profile = profile.stop()
+    startup_profile.mark('started')
+
+    for name, seconds in hass.config.component_setup_times.items():
+        startup_profile.add('setup', name, seconds)
+
+    path = hass.config.path(path)
+    startup_profile.write(path)
+    print(startup_profile.summary())
+    print('Startup profile written to', path)
+    sys.stdout.flush()
+
+
 def setup_and_run_hass(config_dir, args):
     """Setup HASS and run."""
-    from homeassistant import bootstrap
+    if args.profile_startup:
+        from homeassistant.util import profile
+        profile.start()
+
+        with profile.timed('import', 'homeassistant.bootstrap'):
+            from homeassistant import bootstrap
+    else:
+        from homeassistant import bootstrap
 
     if args.demo_mode:
         config = {
@@ -98,11 +133,19 @@ def setup_and_run_hass(config_dir, args):
             'demo': {}
         }
         hass = bootstrap.from_config_dict(
-            config, config_dir=config_dir, verbose=args.verbose)
+            config, config_dir=config_dir, verbose=args.verbose,
+            parallel_setup=args.parallel_setup)
     else:
         config_file = ensure_config_file(config_dir)
         print('Config directory:', config_dir)
-        hass = bootstrap.from_config_file(config_file, verbose=args.verbose)
+        hass = bootstrap.from_config_file(
+            config_file, verbose=args.verbose,
+            parallel_setup=args.parallel_setup)
+
+    if args.profile_startup:
+        hass.bus.listen_once(
+            EVENT_HOMEASSISTANT_START,
+            lambda event: write_startup_profile(hass, args.profile_startup))
 
     if args.open_ui:
         def open_browser(event):
@@ -6,8 +6,10 @@ import logging
 import logging.handlers
 import os
 import sys
-from collections import defaultdict
-from threading import RLock
+import time
+from threading import Condition, RLock, current_thread
+
+from future.moves import queue
 
 import voluptuous as vol
 
@@ -17,6 +19,8 @@ import homeassistant.config as conf_util
 import homeassistant.core as core
 import homeassistant.helpers.config_validation as cv
 import homeassistant.loader as loader
+import homeassistant.util as util
+from homeassistant.util import profile, yaml
 from homeassistant.const import EVENT_COMPONENT_LOADED, PLATFORM_FORMAT
 from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers import (
@@ -24,10 +28,21 @@ from homeassistant.helpers import (
 
 _LOGGER = logging.getLogger(__name__)
 _SETUP_LOCK = RLock()
-_CURRENT_SETUP = []
+# Notified when a component is done setting up
+_SETUP_DONE = Condition(_SETUP_LOCK)
+# Domains being set up with the thread setting them up, and the domain
+# each thread is waiting on
+_CURRENT_SETUP = {}
+_WAITING_ON = {}
 
 ATTR_COMPONENT = 'component'
 
+# Number of threads setting up components in parallel setup mode
+SETUP_WORKERS = 10
+
+# Number of components to report in the setup time summary
+SLOWEST_SETUP_COUNT = 10
+
 ERROR_LOG_FILENAME = 'home-assistant.log'
 
 
@@ -55,52 +70,180 @@ def setup_component(hass, domain, config=None):
 
 
 def _setup_component(hass, domain, config):
-    """Setup a component for Home Assistant."""
+    """Setup a component for Home Assistant.
+
+    No lock is held while a component sets up, so components that do not
+    depend on each other can be set up from different threads. A thread
+    that needs a component another thread is setting up waits for it,
+    unless that thread is waiting on this one.
+    """
     # pylint: disable=too-many-return-statements,too-many-branches
     if domain in hass.config.components:
         return True
 
+    thread = current_thread()
+
     with _SETUP_LOCK:
+        while domain in _CURRENT_SETUP:
+            if _waits_on(_CURRENT_SETUP[domain], thread):
+                _LOGGER.error('Attempt made to setup %s during setup of %s',
+                              domain, domain)
+                return False
+
+            _WAITING_ON[thread] = domain
+            try:
+                _SETUP_DONE.wait()
+            finally:
+                del _WAITING_ON[thread]
+
         # It might have been loaded while waiting for lock
         if domain in hass.config.components:
             return True
 
-        if domain in _CURRENT_SETUP:
-            _LOGGER.error('Attempt made to setup %s during setup of %s',
-                          domain, domain)
+        component = loader.get_component(domain)
+
+        missing_deps = [dep for dep in getattr(component, 'DEPENDENCIES', [])
+                        if dep not in hass.config.components]
+
+        if missing_deps:
+            _LOGGER.error(
+                'Not initializing %s because not all dependencies loaded: %s',
+                domain, ", ".join(missing_deps))
             return False
 
-        component = loader.get_component(domain)
-        _CURRENT_SETUP.append(domain)
-        try:
-            if not component.setup(hass, config):
-                _LOGGER.error('component %s failed to initialize', domain)
-                return False
-        except Exception:  # pylint: disable=broad-except
-            _LOGGER.exception('Error during setup of component %s', domain)
+        _CURRENT_SETUP[domain] = thread
+
+    start = time.time()
+    success = False
+    try:
+        success = component.setup(hass, config)
+        if not success:
+            _LOGGER.error('component %s failed to initialize', domain)
+    except Exception:  # pylint: disable=broad-except
+        _LOGGER.exception('Error during setup of component %s', domain)
+    finally:
+        with _SETUP_LOCK:
+            if success:
+                hass.config.component_setup_times[component.DOMAIN] = \
+                    time.time() - start
+                hass.config.components.append(component.DOMAIN)
+            del _CURRENT_SETUP[domain]
+            _SETUP_DONE.notify_all()
+
+    if not success:
+        return False
+
+    # Assumption: if a component does not depend on groups
+    # it communicates with devices
+    if group.DOMAIN not in getattr(component, 'DEPENDENCIES', []):
+        hass.pool.add_worker()
+
+    hass.bus.fire(
+        EVENT_COMPONENT_LOADED, {ATTR_COMPONENT: component.DOMAIN})
+
+    return True
+
+
+def _waits_on(owner, thread):
+    """Return if owner is thread or waits on it, directly or not.
+
+    Must be called with the setup lock held.
+    """
+    seen = set()
+    while owner not in seen:
+        if owner == thread:
+            return True
+
+        seen.add(owner)
+        domain = _WAITING_ON.get(owner)
+        if domain is None or domain not in _CURRENT_SETUP:
             return False
 
+        owner = _CURRENT_SETUP[domain]
+
+    return False
+
+
+def _setup_components_parallel(hass, components, config):
+    """Setup components on a pool as soon as their dependencies are done.
+
+    Keeps the ordering guarantees of loader.load_order_components: the
+    promoted components are set up first and components that depend on
+    the group component wait for all the components that do not.
+    """
+    load_order = list(loader.load_order_components(components))
+
+    if not load_order:
+        return
+
+    # Components are only imported once a worker sets them up
+    waiting_on = {domain: set(loader.get_dependencies(domain))
+                  for domain in load_order}
+
+    first = [comp for comp in ('logger', 'recorder', 'introduction')
+             if comp in waiting_on]
+    first_deps = set(first)
+    for comp in first:
+        first_deps.update(loader.load_order_component(comp))
+
+    group_dependent = set(
+        domain for domain in load_order
+        if group.DOMAIN in loader.load_order_component(domain))
+    not_group_dependent = set(load_order) - group_dependent
+
+    for domain in load_order:
+        if domain in first_deps:
+            continue
+
+        waiting_on[domain].update(first)
+
+        if domain in group_dependent:
+            waiting_on[domain].update(not_group_dependent)
+
+    finished = queue.Queue()
+
+    def setup_job(domain):
+        """Setup a single component and report back when done."""
         try:
-            if not component.setup(hass, config):
-                _LOGGER.error('component %s failed to initialize', domain)
-                return False
-        except Exception:  # pylint: disable=broad-except
-            _LOGGER.exception('Error during setup of component %s', domain)
-            return False
+            _setup_component(hass, domain, config)
         finally:
-            _CURRENT_SETUP.remove(domain)
+            finished.put(domain)
 
-        hass.config.components.append(component.DOMAIN)
+    pool = util.ThreadPool(setup_job, min(SETUP_WORKERS, len(load_order)))
+    priority = {domain: index for index, domain in enumerate(load_order)}
+    pending = len(load_order)
 
-        # Assumption: if a component does not depend on groups
-        # it communicates with devices
-        if group.DOMAIN not in getattr(component, 'DEPENDENCIES', []):
-            hass.pool.add_worker()
+    def schedule_ready():
+        """Queue the components that are no longer waiting on others."""
+        for domain in [domain for domain, deps in waiting_on.items()
+                       if not deps]:
+            del waiting_on[domain]
+            pool.add_job(priority[domain], domain)
 
-        hass.bus.fire(
-            EVENT_COMPONENT_LOADED, {ATTR_COMPONENT: component.DOMAIN})
+    schedule_ready()
 
-        return True
+    while pending:
+        done = finished.get()
+        pending -= 1
+
+        for deps in waiting_on.values():
+            deps.discard(done)
+
+        schedule_ready()
+
+    pool.stop()
+
+
+def _log_setup_times(hass, elapsed):
+    """Log how long the setup of the components took."""
+    setup_times = sorted(hass.config.component_setup_times.items(),
+                         key=lambda item: item[1], reverse=True)
+
+    _LOGGER.info(
+        'Setup of %d components took %.2fs, slowest: %s', len(setup_times),
+        elapsed, ', '.join('{} {:.2f}s'.format(domain, seconds) for
+                           domain, seconds in
+                           setup_times[:SLOWEST_SETUP_COUNT]))
 
 
 def prepare_setup_platform(hass, config, domain, platform_name):
@@ -134,11 +277,13 @@ def prepare_setup_platform(hass, config, domain, platform_name):
 
 # pylint: disable=too-many-branches, too-many-statements, too-many-arguments
 def from_config_dict(config, hass=None, config_dir=None, enable_log=True,
-                     verbose=False):
+                     verbose=False, parallel_setup=False):
     """
     Tries to configure Home Assistant from a config dict.
 
-    Dynamically loads required components and its dependencies.
+    Dynamically loads required components and its dependencies. With
+    parallel_setup components that do not depend on each other are set up
+    at the same time.
     """
     if hass is None:
         hass = core.HomeAssistant()
@@ -150,7 +295,8 @@ def from_config_dict(config, hass=None, config_dir=None, enable_log=True,
     core_config = config.get(core.DOMAIN, {})
 
     try:
-        conf_util.process_ha_core_config(hass, core_config)
+        with profile.timed('config', 'validate_core_config'):
+            conf_util.process_ha_core_config(hass, core_config)
     except vol.Invalid as ex:
         cv.log_exception(_LOGGER, ex, 'homeassistant', core_config)
         return None
@@ -180,19 +326,29 @@ def from_config_dict(config, hass=None, config_dir=None, enable_log=True,
     persistent_notification.setup(hass, config)
 
     _LOGGER.info('Home Assistant core initialized')
+    profile.mark('core_initialized')
 
     # Give event decorators access to HASS
     event_decorators.HASS = hass
     service.HASS = hass
 
     # Setup the components
-    for domain in loader.load_order_components(components):
-        _setup_component(hass, domain, config)
+    start = time.time()
+
+    if parallel_setup:
+        _setup_components_parallel(hass, components, config)
+    else:
+        for domain in loader.load_order_components(components):
+            _setup_component(hass, domain, config)
+
+    _log_setup_times(hass, time.time() - start)
+    profile.mark('components_setup')
 
     return hass
 
 
-def from_config_file(config_path, hass=None, verbose=False):
+def from_config_file(config_path, hass=None, verbose=False,
+                     parallel_setup=False):
     """
     Reads the configuration file and tries to start all the required
     functionality. Will add functionality to 'hass' parameter if given,
@@ -208,12 +364,21 @@ def from_config_file(config_path, hass=None, verbose=False):
 
     enable_logging(hass, verbose)
 
+    # Skip parsing the YAML files that did not change since the last start
+    yaml.load_cache(hass.config.path(conf_util.YAML_CACHE_FILE))
+
     try:
         config_dict = conf_util.load_yaml_config_file(config_path)
     except HomeAssistantError:
         return None
 
-    return from_config_dict(config_dict, hass, enable_log=False)
+    hass = from_config_dict(config_dict, hass, enable_log=False,
+                            parallel_setup=parallel_setup)
+
+    # Also holds the files loaded while setting up the components
+    yaml.save_cache()
+
+    return hass
 
 
 def enable_logging(hass, verbose=False):
@@ -4,21 +4,24 @@ Rest API for Home Assistant.
 For more details about the RESTful API, please refer to the documentation at
 https://home-assistant.io/developers/api/
 """
+import collections
 import json
 import logging
 import queue
+import threading
+import uuid
 
 import homeassistant.core as ha
 import homeassistant.remote as rem
 from homeassistant.bootstrap import ERROR_LOG_FILENAME
 from homeassistant.const import (
-    EVENT_HOMEASSISTANT_STOP, EVENT_TIME_CHANGED,
+    ATTR_ENTITY_ID, EVENT_HOMEASSISTANT_STOP, EVENT_TIME_CHANGED,
     HTTP_BAD_REQUEST, HTTP_CREATED, HTTP_NOT_FOUND,
     HTTP_UNPROCESSABLE_ENTITY, MATCH_ALL, URL_API, URL_API_COMPONENTS,
     URL_API_CONFIG, URL_API_DISCOVERY_INFO, URL_API_ERROR_LOG,
-    URL_API_EVENT_FORWARD, URL_API_EVENTS, URL_API_SERVICES,
-    URL_API_STATES, URL_API_STATES_ENTITY, URL_API_STREAM, URL_API_TEMPLATE,
-    __version__)
+    URL_API_EVENT_BATCH, URL_API_EVENT_FORWARD, URL_API_EVENTS, URL_API_POOL,
+    URL_API_SERVICES, URL_API_STATES, URL_API_STATES_ENTITY, URL_API_STREAM,
+    URL_API_TEMPLATE, __version__)
 from homeassistant.exceptions import TemplateError
 from homeassistant.helpers.state import TrackStates
 from homeassistant.helpers import template
@@ -28,8 +31,17 @@ DOMAIN = 'api'
 DEPENDENCIES = ['http']
 
 STREAM_PING_PAYLOAD = "ping"
+STREAM_PING_MESSAGE = "data: {}\n\n".format(
+    STREAM_PING_PAYLOAD).encode("UTF-8")
 STREAM_PING_INTERVAL = 50  # seconds
 
+# Number of messages waiting for a client before its stream is closed
+STREAM_QUEUE_SIZE = 500
+
+# Number of events kept to resume event streams, less than fit in the
+# queue so a resumed stream has room for new events
+STREAM_BUFFER_SIZE = 400
+
 _LOGGER = logging.getLogger(__name__)
 
 
@@ -43,12 +55,14 @@ def setup(hass, config):
     hass.wsgi.register_view(APIEntityStateView)
     hass.wsgi.register_view(APIEventListenersView)
     hass.wsgi.register_view(APIEventView)
+    hass.wsgi.register_view(APIEventBatchView)
     hass.wsgi.register_view(APIServicesView)
     hass.wsgi.register_view(APIDomainServicesView)
     hass.wsgi.register_view(APIEventForwardingView)
     hass.wsgi.register_view(APIComponentsView)
     hass.wsgi.register_view(APIErrorLogView)
     hass.wsgi.register_view(APITemplateView)
+    hass.wsgi.register_view(APIPoolView)
 
     return True
 
@@ -70,63 +84,204 @@ class APIEventStream(HomeAssistantView):
     url = URL_API_STREAM
     name = "api:stream"
 
+    def __init__(self, hass):
+        """Initialize the view and the hub that feeds its streams."""
+        super(APIEventStream, self).__init__(hass)
+        self.hub = EventStreamHub(hass)
+
     def get(self, request):
         """Provide a streaming interface for the event bus."""
-        stop_obj = object()
-        to_write = queue.Queue()
-
         restrict = request.args.get('restrict')
         if restrict:
             restrict = restrict.split(',') + [EVENT_HOMEASSISTANT_STOP]
 
-        def forward_events(event):
-            """Forward events to the open request."""
-            if event.event_type == EVENT_TIME_CHANGED:
-                return
-
-            if restrict and event.event_type not in restrict:
-                return
-
-            _LOGGER.debug('STREAM %s FORWARDING %s', id(stop_obj), event)
-
-            if event.event_type == EVENT_HOMEASSISTANT_STOP:
-                data = stop_obj
-            else:
-                data = json.dumps(event, cls=rem.JSONEncoder)
+        entity_ids = request.args.get('entity_id')
+        if entity_ids:
+            entity_ids = entity_ids.lower().split(',')
+
+        domains = request.args.get('domain')
+        if domains:
+            domains = domains.lower().split(',')
+
+        # Event ids are passed as <run id>:<event id>
+        last_event_id = request.headers.get('Last-Event-ID')
+        run_id = None
+        if last_event_id:
+            run_id, _, event_id = last_event_id.rpartition(':')
+            try:
+                last_event_id = int(event_id)
+            except ValueError:
+                return self.json_message(
+                    'Invalid Last-Event-ID: {}'.format(last_event_id),
+                    HTTP_BAD_REQUEST)
+        else:
+            last_event_id = None
 
-            to_write.put(data)
+        subscription = EventStreamSubscription(restrict, entity_ids, domains)
 
         def stream():
             """Stream events to response."""
-            self.hass.bus.listen(MATCH_ALL, forward_events)
+            self.hub.subscribe(subscription, last_event_id, run_id)
 
-            _LOGGER.debug('STREAM %s ATTACHED', id(stop_obj))
+            _LOGGER.debug('STREAM %s ATTACHED', id(subscription))
 
             # Fire off one message right away to have browsers fire open event
-            to_write.put(STREAM_PING_PAYLOAD)
+            subscription.put(STREAM_PING_MESSAGE)
 
             while True:
                 try:
-                    payload = to_write.get(timeout=STREAM_PING_INTERVAL)
+                    msg = subscription.queue.get(timeout=STREAM_PING_INTERVAL)
 
-                    if payload is stop_obj:
+                    if msg is None:
                         break
 
-                    msg = "data: {}\n\n".format(payload)
-                    _LOGGER.debug('STREAM %s WRITING %s', id(stop_obj),
+                    _LOGGER.debug('STREAM %s WRITING %s', id(subscription),
                                   msg.strip())
-                    yield msg.encode("UTF-8")
+                    yield msg
                 except queue.Empty:
-                    to_write.put(STREAM_PING_PAYLOAD)
+                    subscription.put(STREAM_PING_MESSAGE)
                 except GeneratorExit:
                     break
 
-            _LOGGER.debug('STREAM %s RESPONSE CLOSED', id(stop_obj))
-            self.hass.bus.remove_listener(MATCH_ALL, forward_events)
+            _LOGGER.debug('STREAM %s RESPONSE CLOSED', id(subscription))
+            self.hub.unsubscribe(subscription)
 
         return self.Response(stream(), mimetype='text/event-stream')
 
 
+class EventStreamHub(object):
+    """Serialize every event once for all event streams.
+
+    The last STREAM_BUFFER_SIZE events are kept with their id, so a client
+    that reconnects with a Last-Event-ID gets the events it missed. Event
+    ids restart with every run and are sent as <run id>:<event id>.
+    """
+
+    def __init__(self, hass):
+        """Initialize the hub and start listening for events."""
+        self._subscriptions = []
+        # Entries are [event id, event, message or None until serialized]
+        self._buffer = collections.deque(maxlen=STREAM_BUFFER_SIZE)
+        self.run_id = uuid.uuid4().hex
+        self._event_id = 0
+        self._lock = threading.Lock()
+
+        hass.bus.listen(MATCH_ALL, self._event_listener)
+
+    @property
+    def subscription_count(self):
+        """Return the number of connected streams."""
+        return len(self._subscriptions)
+
+    def subscribe(self, subscription, last_event_id=None, run_id=None):
+        """Start feeding a subscription, after the events it missed.
+
+        The missed events are only known if run_id is the current run.
+        """
+        with self._lock:
+            if last_event_id is not None and run_id == self.run_id:
+                for entry in self._buffer:
+                    if entry[0] > last_event_id and \
+                            subscription.matches(entry[1]) and \
+                            not subscription.put(self._message(entry)):
+                        _LOGGER.warning(
+                            'Closing event stream %s, it missed too many '
+                            'events', id(subscription))
+                        subscription.close()
+                        return
+
+            self._subscriptions.append(subscription)
+
+    def unsubscribe(self, subscription):
+        """Stop feeding a subscription."""
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+
+    def _event_listener(self, event):
+        """Pass an event to the subscriptions that want it."""
+        if event.event_type == EVENT_TIME_CHANGED:
+            return
+
+        with self._lock:
+            self._event_id += 1
+            entry = [self._event_id, event, None]
+            self._buffer.append(entry)
+
+            for subscription in list(self._subscriptions):
+                if event.event_type == EVENT_HOMEASSISTANT_STOP:
+                    subscription.close()
+                elif subscription.matches(event) and \
+                        not subscription.put(self._message(entry)):
+                    _LOGGER.warning(
+                        'Closing event stream %s, it is not keeping up',
+                        id(subscription))
+                    subscription.close()
+
+                if subscription.closed:
+                    self._subscriptions.remove(subscription)
+
+    def _message(self, entry):
+        """Return the encoded message of an event, serializing it once."""
+        if entry[2] is None:
+            entry[2] = 'id: {}:{}\ndata: {}\n\n'.format(
+                self.run_id, entry[0],
+                json.dumps(entry[1], cls=rem.JSONEncoder)).encode('UTF-8')
+
+        return entry[2]
+
+
+class EventStreamSubscription(object):
+    """The events one event stream wants and the messages it has to send."""
+
+    def __init__(self, event_types=None, entity_ids=None, domains=None):
+        """Initialize the subscription."""
+        self.event_types = event_types
+        self.entity_ids = entity_ids
+        self.domains = domains
+        self.queue = queue.Queue(STREAM_QUEUE_SIZE)
+        self.closed = False
+
+    def matches(self, event):
+        """Return if the stream wants the event."""
+        if self.event_types and event.event_type not in self.event_types:
+            return False
+
+        if not self.entity_ids and not self.domains:
+            return True
+
+        entity_ids = event.data.get(ATTR_ENTITY_ID)
+        if isinstance(entity_ids, str):
+            entity_ids = [entity_ids]
+        elif not isinstance(entity_ids, (list, tuple)):
+            return False
+
+        return any(
+            (self.entity_ids and entity_id in self.entity_ids) or
+            (self.domains and entity_id.split('.', 1)[0] in self.domains)
+            for entity_id in entity_ids if isinstance(entity_id, str))
+
+    def put(self, message):
+        """Queue a message, return False if the queue is full."""
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except queue.Full:
+            return False
+
+    def close(self):
+        """End the stream after the messages it has been sent."""
+        self.closed = True
+
+        # Make room for the end of stream if the queue is full
+        if not self.put(None):
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                pass
+            self.put(None)
+
+
 class APIConfigView(HomeAssistantView):
     """View to handle Config requests."""
 
@@ -163,8 +318,48 @@ class APIStatesView(HomeAssistantView):
     name = "api:states"
 
     def get(self, request):
-        """Get current states."""
-        return self.json(self.hass.states.all())
+        """Get current states, or the changes since a revision."""
+        since = request.args.get('since')
+
+        if since is None:
+            return self.json(self.hass.states.all())
+
+        run_id = self.hass.states.run_id
+
+        if since:
+            # Revisions are passed as <run id>:<revision>, a revision
+            # without the current run id gets all states.
+            since_run_id, _, revision = since.rpartition(':')
+
+            try:
+                revision = int(revision)
+            except ValueError:
+                return self.json_message(
+                    'Invalid revision: {}'.format(since), HTTP_BAD_REQUEST)
+
+            changes = self.hass.states.changes_since(revision, since_run_id)
+        else:
+            # A client syncing for the first time gets all states
+            changes = None
+
+        if changes is None:
+            # The changes since the revision are no longer known
+            return self.json({
+                'revision': '{}:{}'.format(run_id,
+                                           self.hass.states.revision),
+                'full': True,
+                'states': self.hass.states.all(),
+                'removed': [],
+            })
+
+        revision, states, removed = changes
+
+        return self.json({
+            'revision': '{}:{}'.format(run_id, revision),
+            'full': False,
+            'states': states,
+            'removed': removed,
+        })
 
 
 class APIEntityStateView(HomeAssistantView):
@@ -239,18 +434,38 @@ class APIEventView(HomeAssistantView):
             return self.json_message('Event data should be a JSON object',
                                      HTTP_BAD_REQUEST)
 
-        # Special case handling for event STATE_CHANGED
-        # We will try to convert state dicts back to State objects
-        if event_type == ha.EVENT_STATE_CHANGED and event_data:
-            for key in ('old_state', 'new_state'):
-                state = ha.State.from_dict(event_data.get(key))
+        self.hass.bus.fire(event_type, _restore_event_data(
+            event_type, event_data), ha.EventOrigin.remote)
 
-                if state:
-                    event_data[key] = state
+        return self.json_message("Event {} fired.".format(event_type))
 
-        self.hass.bus.fire(event_type, event_data, ha.EventOrigin.remote)
 
-        return self.json_message("Event {} fired.".format(event_type))
+class APIEventBatchView(HomeAssistantView):
+    """View to handle requests that fire multiple events."""
+
+    url = URL_API_EVENT_BATCH
+    name = "api:event-batch"
+
+    def post(self, request):
+        """Fire a list of events in order."""
+        events = request.json
+
+        if not isinstance(events, list) or not all(
+                isinstance(event, dict) and
+                isinstance(event.get('event_type'), str) and
+                isinstance(event.get('event_data', {}), (dict, type(None)))
+                for event in events):
+            return self.json_message(
+                'Events should be a list of objects with an event_type and '
+                'optional event_data object', HTTP_BAD_REQUEST)
+
+        for event in events:
+            event_type = event['event_type']
+
+            self.hass.bus.fire(event_type, _restore_event_data(
+                event_type, event.get('event_data')), ha.EventOrigin.remote)
+
+        return self.json_message("Fired {} events.".format(len(events)))
 
 
 class APIServicesView(HomeAssistantView):
@@ -288,6 +503,13 @@ class APIEventForwardingView(HomeAssistantView):
     name = "api:event-forward"
     event_forwarder = None
 
+    def get(self, request):
+        """Get the forwarding metrics per target."""
+        if self.event_forwarder is None:
+            return self.json({})
+
+        return self.json(self.event_forwarder.as_dict())
+
     def post(self, request):
         """Setup an event forwarder."""
         data = request.json
@@ -355,6 +577,17 @@ class APIComponentsView(HomeAssistantView):
         return self.json(self.hass.config.components)
 
 
+class APIPoolView(HomeAssistantView):
+    """View to handle worker pool requests."""
+
+    url = URL_API_POOL
+    name = "api:pool"
+
+    def get(self, request):
+        """Get the workers, pending jobs and job timings of the pool."""
+        return self.json(self.hass.pool.as_dict())
+
+
 class APIErrorLogView(HomeAssistantView):
     """View to handle ErrorLog requests."""
 
@@ -392,3 +625,15 @@ def events_json(hass):
     """Generate event data to JSONify."""
     return [{"event": key, "listener_count": value}
             for key, value in hass.bus.listeners.items()]
+
+
+def _restore_event_data(event_type, event_data):
+    """Convert the state dicts of a state changed event to State objects."""
+    if event_type == ha.EVENT_STATE_CHANGED and event_data:
+        for key in ('old_state', 'new_state'):
+            state = ha.State.from_dict(event_data.get(key))
+
+            if state:
+                event_data[key] = state
+
+    return event_data
@@ -8,7 +8,7 @@ import voluptuous as vol
 
 import homeassistant.util.dt as dt_util
 from homeassistant.const import (
-    EVENT_STATE_CHANGED, EVENT_TIME_CHANGED, MATCH_ALL, CONF_PLATFORM)
+    EVENT_STATE_CHANGED, MATCH_ALL, CONF_PLATFORM)
 from homeassistant.helpers.event import track_state_change, track_point_in_time
 import homeassistant.helpers.config_validation as cv
 
@@ -68,8 +68,7 @@ def trigger(hass, config, action):
             """Fire on changes and cancel for listener if changed."""
             if inner_to_s.state == to_s.state:
                 return
-            hass.bus.remove_listener(EVENT_TIME_CHANGED,
-                                     attached_state_for_listener)
+            hass.scheduler.cancel(attached_state_for_listener)
             hass.bus.remove_listener(EVENT_STATE_CHANGED,
                                      attached_state_for_cancel)
 
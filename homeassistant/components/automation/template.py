@@ -8,9 +8,8 @@ import logging
 
 import voluptuous as vol
 
-from homeassistant.const import (
-    CONF_VALUE_TEMPLATE, CONF_PLATFORM, MATCH_ALL)
-from homeassistant.helpers import condition
+from homeassistant.const import CONF_VALUE_TEMPLATE, CONF_PLATFORM
+from homeassistant.helpers import condition, template
 from homeassistant.helpers.event import track_state_change
 import homeassistant.helpers.config_validation as cv
 
@@ -49,5 +48,6 @@ def trigger(hass, config, action):
         elif not template_result:
             already_triggered = False
 
-    track_state_change(hass, MATCH_ALL, state_changed_listener)
+    track_state_change(hass, template.extract_entities(value_template),
+                       state_changed_listener)
     return True
@@ -10,7 +10,7 @@ from homeassistant.components.binary_sensor import (BinarySensorDevice,
                                                     ENTITY_ID_FORMAT,
                                                     SENSOR_CLASSES)
 from homeassistant.const import (ATTR_FRIENDLY_NAME, CONF_VALUE_TEMPLATE,
-                                 ATTR_ENTITY_ID, MATCH_ALL)
+                                 ATTR_ENTITY_ID)
 from homeassistant.exceptions import TemplateError
 from homeassistant.helpers.entity import generate_entity_id
 from homeassistant.helpers import template
@@ -53,7 +53,8 @@ def setup_platform(hass, config, add_devices, discovery_info=None):
                 'Missing %s for sensor %s', CONF_VALUE_TEMPLATE, device)
             continue
 
-        entity_ids = device_config.get(ATTR_ENTITY_ID, MATCH_ALL)
+        entity_ids = device_config.get(ATTR_ENTITY_ID) or \
+            template.extract_entities(value_template)
 
         sensors.append(
             BinarySensorTemplate(
@@ -84,7 +85,7 @@ class BinarySensorTemplate(BinarySensorDevice):
                                             hass=hass)
         self._name = friendly_name
         self._sensor_class = sensor_class
-        self._template = value_template
+        self._template = template.Template(value_template, hass)
         self._state = None
 
         self.update()
@@ -119,8 +120,7 @@ class BinarySensorTemplate(BinarySensorDevice):
     def update(self):
         """Get the latest data and update the state."""
         try:
-            self._state = template.render(self.hass,
-                                          self._template).lower() == 'true'
+            self._state = self._template.render().lower() == 'true'
         except TemplateError as ex:
             if ex.args and ex.args[0].startswith(
                     "UndefinedError: 'None' has no attribute"):
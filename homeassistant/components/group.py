@@ -4,8 +4,10 @@ Provides functionality to group entities.
 For more details about this component, please refer to the documentation at
 https://home-assistant.io/components/group/
 """
+import logging
 import threading
-from collections import OrderedDict
+import weakref
+from collections import OrderedDict, defaultdict
 
 import voluptuous as vol
 
@@ -30,6 +32,12 @@ ATTR_AUTO = 'auto'
 ATTR_ORDER = 'order'
 ATTR_VIEW = 'view'
 
+_LOGGER = logging.getLogger(__name__)
+
+# Membership index per Home Assistant instance
+_INDEXES = weakref.WeakKeyDictionary()
+_INDEXES_LOCK = threading.Lock()
+
 
 def _conf_preprocess(value):
     """Preprocess alternative configuration formats."""
@@ -91,33 +99,7 @@ def is_on(hass, entity_id):
 
 def expand_entity_ids(hass, entity_ids):
     """Return entity_ids with group entity ids replaced by their members."""
-    found_ids = []
-
-    for entity_id in entity_ids:
-        if not isinstance(entity_id, str):
-            continue
-
-        entity_id = entity_id.lower()
-
-        try:
-            # If entity_id points at a group, expand it
-            domain, _ = split_entity_id(entity_id)
-
-            if domain == DOMAIN:
-                found_ids.extend(
-                    ent_id for ent_id
-                    in expand_entity_ids(hass, get_entity_ids(hass, entity_id))
-                    if ent_id not in found_ids)
-
-            else:
-                if entity_id not in found_ids:
-                    found_ids.append(entity_id)
-
-        except AttributeError:
-            # Raised by split_entity_id if entity_id is not a string
-            pass
-
-    return found_ids
+    return get_index(hass).expand(entity_ids)
 
 
 def get_entity_ids(hass, entity_id, domain_filter=None):
@@ -141,6 +123,195 @@ def get_entity_ids(hass, entity_id, domain_filter=None):
         return []
 
 
+def get_index(hass):
+    """Return the group membership index of a Home Assistant instance."""
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(hass)
+
+        if index is None:
+            index = _INDEXES[hass] = GroupIndex(hass)
+
+        return index
+
+
+class GroupIndex(object):
+    """Resolved members of the groups in the state machine.
+
+    The members of a group are taken from the entity_id attribute of its
+    state, or set by the Group entity that owns it. They are resolved once
+    and resolved again only when the members of the group or of one of its
+    nested groups change.
+    """
+
+    def __init__(self, hass):
+        """Initialize the index."""
+        self._hass = hass
+        self._lock = threading.Lock()
+        # Groups whose members are set by their Group entity
+        self._owned = set()
+        # Group => the entity_id attribute the members were taken from
+        self._sources = {}
+        # Group => lower cased direct members
+        self._members = {}
+        # Entity id => groups that have it as direct member
+        self._parents = defaultdict(set)
+        # Group => tuple of the entity ids it expands to
+        self._resolved = {}
+        # Group => the group and all groups nested in it
+        self._nested = {}
+        self._reported_cycles = set()
+
+    def members(self, group_id):
+        """Return the direct members of a group."""
+        with self._lock:
+            self._refresh(group_id)
+            return self._members[group_id]
+
+    def resolve(self, group_id):
+        """Return the entity ids a group expands to."""
+        with self._lock:
+            nested = self._nested.get(group_id, (group_id,))
+
+            for nested_id in nested:
+                self._refresh(nested_id)
+
+            if group_id not in self._resolved:
+                return self._resolve(group_id, [])[0]
+
+            return self._resolved[group_id]
+
+    def expand(self, entity_ids):
+        """Return entity_ids with groups replaced by their members."""
+        if isinstance(entity_ids, (list, tuple)) and \
+           len(entity_ids) == 1 and isinstance(entity_ids[0], str):
+            entity_id = entity_ids[0].lower()
+
+            if split_entity_id(entity_id)[0] == DOMAIN:
+                return list(self.resolve(entity_id))
+
+            return [entity_id]
+
+        found_ids = OrderedDict()
+
+        for entity_id in entity_ids:
+            if not isinstance(entity_id, str):
+                continue
+
+            entity_id = entity_id.lower()
+
+            if split_entity_id(entity_id)[0] == DOMAIN:
+                found_ids.update((ent_id, None) for ent_id
+                                 in self.resolve(entity_id))
+            else:
+                found_ids[entity_id] = None
+
+        return list(found_ids)
+
+    def set_members(self, group_id, entity_ids):
+        """Set the members of a group that is owned by a Group entity."""
+        with self._lock:
+            self._owned.add(group_id)
+            self._update(group_id, entity_ids)
+
+    def remove(self, group_id):
+        """Take the members of a group from its state again."""
+        with self._lock:
+            self._owned.discard(group_id)
+            self._refresh(group_id)
+
+    def _refresh(self, group_id):
+        """Update the members of a group if its state changed."""
+        if group_id in self._owned:
+            return
+
+        state = self._hass.states.get(group_id)
+        entity_ids = None if state is None else \
+            state.attributes.get(ATTR_ENTITY_ID)
+
+        if group_id not in self._members or \
+           self._sources[group_id] is not entity_ids:
+            self._update(group_id, entity_ids)
+
+    def _update(self, group_id, entity_ids):
+        """Store the members of a group and forget what depended on them."""
+        self._sources[group_id] = entity_ids
+        members = tuple(ent_id.lower() for ent_id in entity_ids or ()
+                        if isinstance(ent_id, str))
+        old_members = self._members.get(group_id)
+
+        if members == old_members:
+            return
+
+        for ent_id in old_members or ():
+            self._parents[ent_id].discard(group_id)
+
+        for ent_id in members:
+            self._parents[ent_id].add(group_id)
+
+        self._members[group_id] = members
+
+        # Forget the resolved members of the group and its ancestors
+        pending = [group_id]
+        seen = set()
+
+        while pending:
+            ent_id = pending.pop()
+
+            if ent_id in seen:
+                continue
+
+            seen.add(ent_id)
+            self._resolved.pop(ent_id, None)
+            self._nested.pop(ent_id, None)
+            pending.extend(self._parents.get(ent_id, ()))
+
+    def _resolve(self, group_id, path):
+        """Resolve a group, path holds the groups being resolved.
+
+        Returns the resolved entity ids, the nested groups and the groups
+        on path that were found to be members again. Results that depend
+        on such a cycle are not stored.
+        """
+        if group_id in self._resolved:
+            return self._resolved[group_id], self._nested[group_id], set()
+
+        self._refresh(group_id)
+        path.append(group_id)
+        found_ids = OrderedDict()
+        nested = OrderedDict([(group_id, None)])
+        cycles = set()
+
+        for ent_id in self._members[group_id]:
+            if split_entity_id(ent_id)[0] != DOMAIN:
+                found_ids[ent_id] = None
+                continue
+
+            if ent_id in path:
+                cycles.add(ent_id)
+
+                if ent_id not in self._reported_cycles:
+                    self._reported_cycles.add(ent_id)
+                    _LOGGER.warning('Group %s is a member of itself via %s',
+                                    ent_id, group_id)
+                continue
+
+            sub_ids, sub_nested, sub_cycles = self._resolve(ent_id, path)
+            found_ids.update((sub_id, None) for sub_id in sub_ids)
+            nested.update((sub_id, None) for sub_id in sub_nested)
+            cycles.update(sub_cycles)
+
+        path.pop()
+        cycles.discard(group_id)
+        found_ids = tuple(found_ids)
+        nested = tuple(nested)
+
+        if not cycles:
+            self._resolved[group_id] = found_ids
+            self._nested[group_id] = nested
+
+        return found_ids, nested, cycles
+
+
 def setup(hass, config):
     """Setup all groups found definded in the configuration."""
     for object_id, conf in config.get(DOMAIN, {}).items():
@@ -176,6 +347,7 @@ class Group(Entity):
         self.group_off = None
         self._assumed_state = False
         self._lock = threading.Lock()
+        self._state_listener = None
 
         if entity_ids is not None:
             self.update_tracked_entity_ids(entity_ids)
@@ -230,6 +402,7 @@ class Group(Entity):
         self.stop()
         self.tracking = tuple(ent_id.lower() for ent_id in entity_ids)
         self.group_on, self.group_off = None, None
+        get_index(self.hass).set_members(self.entity_id, self.tracking)
 
         self.update_ha_state(True)
 
@@ -237,15 +410,18 @@ class Group(Entity):
 
     def start(self):
         """Start tracking members."""
-        track_state_change(
+        self._state_listener = track_state_change(
             self.hass, self.tracking, self._state_changed_listener)
 
     def stop(self):
         """Unregister the group from Home Assistant."""
         self.hass.states.remove(self.entity_id)
+        get_index(self.hass).remove(self.entity_id)
 
-        self.hass.bus.remove_listener(
-            ha.EVENT_STATE_CHANGED, self._state_changed_listener)
+        if self._state_listener is not None:
+            self.hass.bus.remove_listener(
+                ha.EVENT_STATE_CHANGED, self._state_listener)
+            self._state_listener = None
 
     def update(self):
         """Query all members and determine current group state."""
@@ -262,7 +438,7 @@ class Group(Entity):
         """The states that the group is tracking."""
         states = []
 
-        for entity_id in self.tracking:
+        for entity_id in get_index(self.hass).members(self.entity_id):
             state = self.hass.states.get(entity_id)
 
             if state is not None:
@@ -4,15 +4,19 @@ Provide pre-made queries on top of the recorder component.
 For more details about this component, please refer to the documentation at
 https://home-assistant.io/components/history/
 """
+import json
 import re
 from collections import defaultdict
 from datetime import timedelta
 from itertools import groupby
+from operator import attrgetter
 
+import homeassistant.core as ha
 import homeassistant.util.dt as dt_util
 from homeassistant.components import recorder, script
 from homeassistant.components.frontend import register_built_in_panel
 from homeassistant.components.http import HomeAssistantView
+from homeassistant.remote import JSONEncoder
 
 DOMAIN = 'history'
 DEPENDENCIES = ['recorder', 'http']
@@ -23,6 +27,16 @@ IGNORE_DOMAINS = ('zone', 'scene',)
 URL_HISTORY_PERIOD = re.compile(
     r'/api/history/period(?:/(?P<date>\d{4}-\d{1,2}-\d{1,2})|)')
 
+# Number of rows fetched from the database at once while streaming
+STREAM_CHUNK_SIZE = 1000
+
+# Columns of the states table needed to build a state
+STATE_COLUMNS = ('entity_id', 'domain', 'state', 'attributes',
+                 'last_changed', 'last_updated')
+
+STATE_JSON = ('{{"attributes": {}, "entity_id": {}, "last_changed": {}, '
+              '"last_updated": {}, "state": {}}}')
+
 
 def last_5_states(entity_id):
     """Return the last 5 states for entity_id."""
@@ -44,12 +58,26 @@ def get_significant_states(start_time, end_time=None, entity_id=None):
     as well as all states from certain domains (for instance
     thermostat so that we get current temperature in our graphs).
     """
+    states = (_row_to_state(row) for row in
+              stream_significant_rows(start_time, end_time, entity_id))
+
+    return states_to_json(states, start_time, entity_id)
+
+
+def stream_significant_rows(start_time, end_time=None, entity_id=None):
+    """Yield the significant state rows during a UTC period.
+
+    Rows are plain tuples with the STATE_COLUMNS, ordered by entity_id and
+    last_updated. They are fetched in chunks of STREAM_CHUNK_SIZE and the
+    attributes stay encoded as JSON.
+    """
     states = recorder.get_model('States')
-    query = recorder.query('States').filter(
-        (states.domain.in_(SIGNIFICANT_DOMAINS) |
-         (states.last_changed == states.last_updated)) &
-        ((~states.domain.in_(IGNORE_DOMAINS)) &
-         (states.last_updated > start_time)))
+    query = recorder.query(
+        *[getattr(states, column) for column in STATE_COLUMNS]).filter(
+            (states.domain.in_(SIGNIFICANT_DOMAINS) |
+             (states.last_changed == states.last_updated)) &
+            ((~states.domain.in_(IGNORE_DOMAINS)) &
+             (states.last_updated > start_time)))
 
     if end_time is not None:
         query = query.filter(states.last_updated < end_time)
@@ -57,12 +85,59 @@ def get_significant_states(start_time, end_time=None, entity_id=None):
     if entity_id is not None:
         query = query.filter_by(entity_id=entity_id.lower())
 
-    states = (
-        state for state in recorder.execute(
-            query.order_by(states.entity_id, states.last_updated))
-        if _is_significant(state))
+    query = query.order_by(states.entity_id, states.last_updated)
 
-    return states_to_json(states, start_time, entity_id)
+    for row in query.yield_per(STREAM_CHUNK_SIZE):
+        if _is_significant_row(row):
+            yield row
+
+
+def stream_significant_states_json(start_time, end_time=None,
+                                   entity_id=None):
+    """Yield the JSON of get_significant_states in chunks.
+
+    The result is a list with a list of states per entity. Attributes are
+    copied from the database without decoding them.
+    """
+    entity_ids = [entity_id] if entity_id is not None else None
+    initial_states = {}
+
+    for state in get_states(start_time, entity_ids):
+        state.last_changed = start_time
+        state.last_updated = start_time
+        initial_states[state.entity_id] = state
+
+    rows = stream_significant_rows(start_time, end_time, entity_id)
+    separator = '['
+
+    for entity_id, group in groupby(rows, attrgetter('entity_id')):
+        chunk = []
+
+        if entity_id in initial_states:
+            chunk.append(_state_to_json(initial_states.pop(entity_id)))
+
+        yield separator + '['
+        separator = ','
+        row_separator = ''
+
+        for row in group:
+            chunk.append(_row_to_json(row))
+
+            if len(chunk) >= STREAM_CHUNK_SIZE:
+                yield row_separator + ','.join(chunk)
+                row_separator = ','
+                chunk = []
+
+        if chunk:
+            yield row_separator + ','.join(chunk)
+
+        yield ']'
+
+    for state in initial_states.values():
+        yield separator + '[' + _state_to_json(state) + ']'
+        separator = ','
+
+    yield '[]' if separator == '[' else ']'
 
 
 def state_changes_during_period(start_time, end_time=None, entity_id=None):
@@ -189,15 +264,49 @@ class HistoryPeriodView(HomeAssistantView):
         end_time = start_time + one_day
         entity_id = request.args.get('filter_entity_id')
 
-        return self.json(
-            get_significant_states(start_time, end_time, entity_id).values())
+        return self.Response(
+            stream_significant_states_json(start_time, end_time, entity_id),
+            mimetype='application/json')
 
 
-def _is_significant(state):
-    """Test if state is significant for history charts.
+def _is_significant_row(row):
+    """Test if a state row is significant, decoding only script attributes."""
+    return (row.domain != 'script' or
+            json.loads(row.attributes).get(script.ATTR_CAN_CANCEL))
 
-    Will only test for things that are not filtered out in SQL.
-    """
-    # scripts that are not cancellable will never change state
-    return (state.domain != 'script' or
-            state.attributes.get(script.ATTR_CAN_CANCEL))
+
+def _row_to_state(row):
+    """Convert a state row into a state object."""
+    return ha.State(
+        row.entity_id, row.state, json.loads(row.attributes),
+        _process_timestamp(row.last_changed),
+        _process_timestamp(row.last_updated))
+
+
+def _row_to_json(row):
+    """Convert a state row into the JSON of its state object."""
+    last_updated = '"{}"'.format(
+        _process_timestamp(row.last_updated).isoformat())
+
+    if row.last_changed == row.last_updated:
+        last_changed = last_updated
+    else:
+        last_changed = '"{}"'.format(
+            _process_timestamp(row.last_changed).isoformat())
+
+    return STATE_JSON.format(
+        row.attributes, json.dumps(row.entity_id), last_changed,
+        last_updated, json.dumps(row.state))
+
+
+def _state_to_json(state):
+    """Convert a state object into JSON."""
+    return json.dumps(state, sort_keys=True, cls=JSONEncoder)
+
+
+def _process_timestamp(timestamp):
+    """Return a timestamp read from the database as UTC datetime."""
+    if timestamp.tzinfo is None:
+        return timestamp.replace(tzinfo=dt_util.UTC)
+
+    return dt_util.as_utc(timestamp)
@@ -494,11 +494,7 @@ class HomeAssistantView(object):
 
     def json(self, result, status_code=200):
         """Return a JSON response."""
-        msg = json.dumps(
-            result,
-            sort_keys=True,
-            cls=rem.JSONEncoder
-        ).encode('UTF-8')
+        msg = rem.json_dumps(result).encode('UTF-8')
         return self.Response(msg, mimetype="application/json",
                              status=status_code)
 
@@ -201,12 +201,7 @@ def setup(hass, config):
             service_fun = 'toggle'
 
         if service_fun:
-            for light in target_lights:
-                getattr(light, service_fun)(**params)
-
-            for light in target_lights:
-                if light.should_poll:
-                    light.update_ha_state(True)
+            component.command_entities(target_lights, service_fun, **params)
             return
 
         # Processing extra data for turn light on request.
@@ -221,12 +216,7 @@ def setup(hass, config):
         if color_name is not None:
             params[ATTR_RGB_COLOR] = color_util.color_name_to_rgb(color_name)
 
-        for light in target_lights:
-            light.turn_on(**params)
-
-        for light in target_lights:
-            if light.should_poll:
-                light.update_ha_state(True)
+        component.command_entities(target_lights, 'turn_on', **params)
 
     # Listen for light on and light off service calls.
     descriptions = load_yaml_config_file(
@@ -138,7 +138,8 @@ def setup_bridge(host, hass, add_devices_callback, filename,
             if light_id not in lights:
                 lights[light_id] = HueLight(int(light_id), info,
                                             bridge, update_lights,
-                                            bridge_type, allow_unreachable)
+                                            bridge_type, allow_unreachable,
+                                            lights)
                 new_lights.append(lights[light_id])
             else:
                 lights[light_id].info = info
@@ -182,13 +183,15 @@ class HueLight(Light):
 
     # pylint: disable=too-many-arguments
     def __init__(self, light_id, info, bridge, update_lights,
-                 bridge_type, allow_unreachable):
+                 bridge_type, allow_unreachable, bridge_lights=None):
         """Initialize the light."""
         self.light_id = light_id
         self.info = info
         self.bridge = bridge
         self.update_lights = update_lights
         self.bridge_type = bridge_type
+        # Dict of light id => HueLight of all lights on the bridge
+        self.bridge_lights = {} if bridge_lights is None else bridge_lights
 
         self.allow_unreachable = allow_unreachable
 
@@ -228,8 +231,54 @@ class HueLight(Light):
         else:
             return self.info['state']['reachable'] and self.info['state']['on']
 
+    @classmethod
+    def turn_on_many(cls, lights, **kwargs):
+        """Turn on all lights of a bridge with one group command.
+
+        Returns the lights that have to be turned on one by one.
+        """
+        return cls._command_bridges(
+            lights, lambda light: light._turn_on_command(kwargs))
+
+    @classmethod
+    def turn_off_many(cls, lights, **kwargs):
+        """Turn off all lights of a bridge with one group command.
+
+        Returns the lights that have to be turned off one by one.
+        """
+        return cls._command_bridges(
+            lights, lambda light: light._turn_off_command(kwargs))
+
+    @staticmethod
+    def _command_bridges(lights, get_command):
+        """Send a command to group 0 of every bridge whose lights all got it.
+
+        Group 0 holds all lights of a bridge.
+        """
+        by_bridge = {}
+
+        for light in lights:
+            by_bridge.setdefault(id(light.bridge), []).append(light)
+
+        remaining = []
+
+        for bridge_lights in by_bridge.values():
+            light = bridge_lights[0]
+
+            if len(bridge_lights) > 1 and \
+               len(bridge_lights) == len(light.bridge_lights):
+                light.bridge.set_group(0, get_command(light))
+            else:
+                remaining.extend(bridge_lights)
+
+        return remaining
+
     def turn_on(self, **kwargs):
         """Turn the specified or all lights on."""
+        self.bridge.set_light(self.light_id, self._turn_on_command(kwargs))
+
+    def _turn_on_command(self, kwargs):
+        """Return the command that turns on the light."""
         command = {'on': True}
 
         if ATTR_TRANSITION in kwargs:
@@ -268,10 +317,15 @@ class HueLight(Light):
         elif self.bridge_type == 'hue':
             command['effect'] = 'none'
 
-        self.bridge.set_light(self.light_id, command)
+        return command
 
     def turn_off(self, **kwargs):
         """Turn the specified or all lights off."""
+        self.bridge.set_light(self.light_id, self._turn_off_command(kwargs))
+
+    @staticmethod
+    def _turn_off_command(kwargs):
+        """Return the command that turns off the light."""
         command = {'on': False}
 
         if ATTR_TRANSITION in kwargs:
@@ -279,7 +333,7 @@ class HueLight(Light):
             # 900 seconds.
             command['transitiontime'] = min(9000, kwargs[ATTR_TRANSITION] * 10)
 
-        self.bridge.set_light(self.light_id, command)
+        return command
 
     def update(self):
         """Synchronize state with bridge."""
@@ -74,6 +74,8 @@ def setup(hass, config):
         message = template.render(hass, message)
         log_entry(hass, name, message, domain, entity_id)
 
+    recorder.add_batch_handler(_save_entries)
+
     hass.wsgi.register_view(LogbookView)
 
     register_built_in_panel(hass, 'logbook', 'Logbook',
@@ -101,13 +103,30 @@ class LogbookView(HomeAssistantView):
         start_day = dt_util.as_utc(start_day)
         end_day = start_day + timedelta(days=1)
 
-        events = recorder.get_model('Events')
-        query = recorder.query('Events').filter(
-            (events.time_fired > start_day) &
-            (events.time_fired < end_day))
-        events = recorder.execute(query)
+        entries = recorder.get_model('LogbookEntries')
+        first_entry = recorder.execute(recorder.query(
+            'LogbookEntries').order_by(entries.when).limit(1))
+        # Events recorded before the first entry, when the logbook entries
+        # table did not exist yet, are humanified from the events table
+        entries_start = first_entry[0].when if first_entry else end_day
+        result = []
+
+        if start_day < entries_start:
+            events = recorder.get_model('Events')
+            query = recorder.query('Events').filter(
+                (events.time_fired > start_day) &
+                (events.time_fired < min(end_day, entries_start)))
+            result.extend(humanify(recorder.execute(query)))
+
+        if entries_start < end_day:
+            query = recorder.query('LogbookEntries').filter(
+                (entries.when > start_day) &
+                (entries.when < end_day)).order_by(entries.when)
+            result.extend(
+                Entry(entry.when, entry.name, entry.message, entry.domain,
+                      entry.entity_id) for entry in recorder.execute(query))
 
-        return self.json(humanify(events))
+        return self.json(result)
 
 
 class Entry(object):
@@ -182,34 +201,14 @@ def humanify(events):
         # Yield entries
         for event in events_batch:
             if event.event_type == EVENT_STATE_CHANGED:
-
-                # Do not report on new entities
-                if 'old_state' not in event.data:
-                    continue
-
-                to_state = State.from_dict(event.data.get('new_state'))
-
-                # If last_changed != last_updated only attributes have changed
-                # we do not report on that yet. Also filter auto groups.
-                if not to_state or \
-                   to_state.last_changed != to_state.last_updated or \
-                   to_state.domain == 'group' and \
-                   to_state.attributes.get('auto', False):
-                    continue
-
-                domain = to_state.domain
+                entry = _entry_from_state_changed(event)
 
                 # Skip all but the last sensor state
-                if domain == 'sensor' and \
-                   event != last_sensor_event[to_state.entity_id]:
+                if entry is None or entry.domain == 'sensor' and \
+                   event != last_sensor_event[entry.entity_id]:
                     continue
 
-                yield Entry(
-                    event.time_fired,
-                    name=to_state.name,
-                    message=_entry_message_from_state(domain, to_state),
-                    domain=domain,
-                    entity_id=to_state.entity_id)
+                yield entry
 
             elif event.event_type == EVENT_HOMEASSISTANT_START:
                 if start_stop_events.get(event.time_fired.minute) == 2:
@@ -230,18 +229,112 @@ def humanify(events):
                     domain=HA_DOMAIN)
 
             elif event.event_type.lower() == EVENT_LOGBOOK_ENTRY:
-                domain = event.data.get(ATTR_DOMAIN)
-                entity_id = event.data.get(ATTR_ENTITY_ID)
-                if domain is None and entity_id is not None:
-                    try:
-                        domain = split_entity_id(str(entity_id))[0]
-                    except IndexError:
-                        pass
+                yield _entry_from_logbook_entry(event)
 
-                yield Entry(
-                    event.time_fired, event.data.get(ATTR_NAME),
-                    event.data.get(ATTR_MESSAGE), domain,
-                    entity_id)
+
+def _save_entries(session, events):
+    """Store the entries of recorded events in the logbook entries table.
+
+    Applies the grouping of humanify incrementally: a sensor entry replaces
+    the entry of the same sensor in its GROUP_BY_MINUTES window, and a start
+    in the minute Home Assistant stopped turns the stop into a restart.
+    """
+    entries = recorder.get_model('LogbookEntries')
+
+    for event in events:
+        if event.event_type == EVENT_STATE_CHANGED:
+            entry = _entry_from_state_changed(event)
+
+            if entry is None:
+                continue
+
+            if entry.domain == 'sensor':
+                when = entry.when
+                window_start = when.replace(
+                    minute=when.minute - when.minute % GROUP_BY_MINUTES,
+                    second=0, microsecond=0)
+                last_entry = session.query(entries).filter(
+                    (entries.entity_id == entry.entity_id) &
+                    (entries.when >= window_start)).first()
+
+                if last_entry is not None:
+                    last_entry.when = entry.when
+                    last_entry.name = entry.name
+                    last_entry.message = entry.message
+                    continue
+
+        elif event.event_type in (EVENT_HOMEASSISTANT_START,
+                                  EVENT_HOMEASSISTANT_STOP):
+            minute_start = event.time_fired.replace(second=0, microsecond=0)
+            last_entry = session.query(entries).filter(
+                (entries.when >= minute_start) &
+                (entries.domain == HA_DOMAIN) &
+                (entries.message.in_(('stopped', 'restarted')))).first()
+
+            if last_entry is not None:
+                if event.event_type == EVENT_HOMEASSISTANT_START:
+                    last_entry.message = 'restarted'
+                continue
+
+            entry = Entry(
+                event.time_fired, "Home Assistant",
+                'started' if event.event_type == EVENT_HOMEASSISTANT_START
+                else 'stopped', domain=HA_DOMAIN)
+
+        elif event.event_type.lower() == EVENT_LOGBOOK_ENTRY:
+            entry = _entry_from_logbook_entry(event)
+
+        else:
+            continue
+
+        session.add(entries(
+            when=entry.when, name=entry.name, message=entry.message,
+            domain=entry.domain, entity_id=entry.entity_id))
+
+
+def _entry_from_state_changed(event):
+    """Return the entry of a state changed event, None to skip it."""
+    # Do not report on new entities
+    if 'old_state' not in event.data:
+        return None
+
+    to_state = event.data.get('new_state')
+
+    if not isinstance(to_state, State):
+        to_state = State.from_dict(to_state)
+
+    # If last_changed != last_updated only attributes have changed
+    # we do not report on that yet. Also filter auto groups.
+    if not to_state or \
+       to_state.last_changed != to_state.last_updated or \
+       to_state.domain == 'group' and \
+       to_state.attributes.get('auto', False):
+        return None
+
+    domain = to_state.domain
+
+    return Entry(
+        event.time_fired,
+        name=to_state.name,
+        message=_entry_message_from_state(domain, to_state),
+        domain=domain,
+        entity_id=to_state.entity_id)
+
+
+def _entry_from_logbook_entry(event):
+    """Return the entry of a logbook entry event."""
+    domain = event.data.get(ATTR_DOMAIN)
+    entity_id = event.data.get(ATTR_ENTITY_ID)
+    if domain is None and entity_id is not None:
+        try:
+            domain = split_entity_id(str(entity_id))[0]
+        except IndexError:
+            pass
+
+    return Entry(
+        event.time_fired, event.data.get(ATTR_NAME),
+        event.data.get(ATTR_MESSAGE), domain,
+        entity_id)
 
 
 def _entry_message_from_state(domain, state):
@@ -295,11 +295,8 @@ def setup(hass, config):
         """Map services to methods on MediaPlayerDevice."""
         method = SERVICE_TO_METHOD[service.service]
 
-        for player in component.extract_from_service(service):
-            getattr(player, method)()
-
-            if player.should_poll:
-                player.update_ha_state(True)
+        component.command_entities(
+            component.extract_from_service(service), method)
 
     for service in SERVICE_TO_METHOD:
         hass.services.register(DOMAIN, service, media_player_service_handler,
@@ -310,11 +307,9 @@ def setup(hass, config):
         """Set specified volume on the media player."""
         volume = service.data.get(ATTR_MEDIA_VOLUME_LEVEL)
 
-        for player in component.extract_from_service(service):
-            player.set_volume_level(volume)
-
-            if player.should_poll:
-                player.update_ha_state(True)
+        component.command_entities(
+            component.extract_from_service(service), 'set_volume_level',
+            volume)
 
     hass.services.register(DOMAIN, SERVICE_VOLUME_SET, volume_set_service,
                            descriptions.get(SERVICE_VOLUME_SET),
@@ -324,11 +319,8 @@ def setup(hass, config):
         """Mute (true) or unmute (false) the media player."""
         mute = service.data.get(ATTR_MEDIA_VOLUME_MUTED)
 
-        for player in component.extract_from_service(service):
-            player.mute_volume(mute)
-
-            if player.should_poll:
-                player.update_ha_state(True)
+        component.command_entities(
+            component.extract_from_service(service), 'mute_volume', mute)
 
     hass.services.register(DOMAIN, SERVICE_VOLUME_MUTE, volume_mute_service,
                            descriptions.get(SERVICE_VOLUME_MUTE),
@@ -338,11 +330,8 @@ def setup(hass, config):
         """Seek to a position."""
         position = service.data.get(ATTR_MEDIA_SEEK_POSITION)
 
-        for player in component.extract_from_service(service):
-            player.media_seek(position)
-
-            if player.should_poll:
-                player.update_ha_state(True)
+        component.command_entities(
+            component.extract_from_service(service), 'media_seek', position)
 
     hass.services.register(DOMAIN, SERVICE_MEDIA_SEEK, media_seek_service,
                            descriptions.get(SERVICE_MEDIA_SEEK),
@@ -352,11 +341,9 @@ def setup(hass, config):
         """Change input to selected source."""
         input_source = service.data.get(ATTR_INPUT_SOURCE)
 
-        for player in component.extract_from_service(service):
-            player.select_source(input_source)
-
-            if player.should_poll:
-                player.update_ha_state(True)
+        component.command_entities(
+            component.extract_from_service(service), 'select_source',
+            input_source)
 
     hass.services.register(DOMAIN, SERVICE_SELECT_SOURCE,
                            select_source_service,
@@ -373,11 +360,9 @@ def setup(hass, config):
             ATTR_MEDIA_ENQUEUE: enqueue,
         }
 
-        for player in component.extract_from_service(service):
-            player.play_media(media_type, media_id, **kwargs)
-
-            if player.should_poll:
-                player.update_ha_state(True)
+        component.command_entities(
+            component.extract_from_service(service), 'play_media',
+            media_type, media_id, **kwargs)
 
     hass.services.register(DOMAIN, SERVICE_PLAY_MEDIA, play_media_service,
                            descriptions.get(SERVICE_PLAY_MEDIA),
@@ -4,15 +4,18 @@ Support for MQTT message handling.
 For more details about this component, please refer to the documentation at
 https://home-assistant.io/components/mqtt/
 """
+import functools as ft
 import logging
 import os
 import socket
+import threading
 import time
 
 import voluptuous as vol
 
 from homeassistant.bootstrap import prepare_setup_platform
 from homeassistant.config import load_yaml_config_file
+from homeassistant.core import JobPriority
 from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers import template
 import homeassistant.helpers.config_validation as cv
@@ -25,6 +28,7 @@ _LOGGER = logging.getLogger(__name__)
 DOMAIN = "mqtt"
 
 MQTT_CLIENT = None
+SUBSCRIPTIONS = None
 
 SERVICE_PUBLISH = 'publish'
 EVENT_MQTT_MESSAGE_RECEIVED = 'mqtt_message_received'
@@ -162,13 +166,7 @@ def publish_template(hass, topic, payload_template, qos=None, retain=None):
 
 def subscribe(hass, topic, callback, qos=DEFAULT_QOS):
     """Subscribe to an MQTT topic."""
-    def mqtt_topic_subscriber(event):
-        """Match subscribed MQTT topic."""
-        if _match_topic(topic, event.data[ATTR_TOPIC]):
-            callback(event.data[ATTR_TOPIC], event.data[ATTR_PAYLOAD],
-                     event.data[ATTR_QOS])
-
-    hass.bus.listen(EVENT_MQTT_MESSAGE_RECEIVED, mqtt_topic_subscriber)
+    SUBSCRIPTIONS.add(topic, callback)
     MQTT_CLIENT.subscribe(topic, qos)
 
 
@@ -229,7 +227,7 @@ def setup(hass, config):
         certificate = os.path.join(os.path.dirname(__file__),
                                    'addtrustexternalcaroot.crt')
 
-    global MQTT_CLIENT
+    global MQTT_CLIENT, SUBSCRIPTIONS
     try:
         MQTT_CLIENT = MQTT(hass, broker, port, client_id, keepalive,
                            username, password, certificate, client_key,
@@ -267,6 +265,33 @@ def setup(hass, config):
             return
         MQTT_CLIENT.publish(msg_topic, payload, qos, retain)
 
+    SUBSCRIPTIONS = TopicTrie()
+
+    def message_received(event):
+        """Pass a received message to the matching subscriptions.
+
+        Every callback but the first gets its own pool job, so a slow
+        callback does not delay the others.
+        """
+        topic = event.data[ATTR_TOPIC]
+        payload = event.data[ATTR_PAYLOAD]
+        qos = event.data[ATTR_QOS]
+
+        callbacks = SUBSCRIPTIONS.match(topic)
+
+        if not callbacks:
+            return
+
+        for callback in callbacks[1:]:
+            hass.pool.add_job(JobPriority.EVENT_DEFAULT,
+                              (ft.partial(callback, topic, payload), qos))
+
+        try:
+            callbacks[0](topic, payload, qos)
+        except Exception:  # pylint: disable=broad-except
+            _LOGGER.exception('Error handling message on %s', topic)
+
+    hass.bus.listen(EVENT_MQTT_MESSAGE_RECEIVED, message_received)
     hass.bus.listen_once(EVENT_HOMEASSISTANT_START, start_mqtt)
 
     descriptions = load_yaml_config_file(
@@ -442,14 +467,68 @@ def _raise_on_error(result):
         raise HomeAssistantError('Error talking to MQTT: {}'.format(result))
 
 
-def _match_topic(subscription, topic):
-    """Test if topic matches subscription."""
-    if subscription.endswith('#'):
-        return (subscription[:-2] == topic or
-                topic.startswith(subscription[:-1]))
+class TopicTrie(object):
+    """Subscriptions to MQTT topics, stored per topic level.
+
+    Matching a topic only visits the levels of the topic, instead of
+    comparing it against every subscription.
+    """
+
+    def __init__(self):
+        """Initialize the trie."""
+        self._root = _TopicNode()
+        self._lock = threading.Lock()
+
+    def add(self, subscription, callback):
+        """Call callback for messages on topics matching subscription."""
+        with self._lock:
+            node = self._root
+
+            for level in subscription.split('/'):
+                node = node.children.setdefault(level, _TopicNode())
+
+            node.callbacks.append(callback)
+
+    def match(self, topic):
+        """Return the callbacks of the subscriptions matching topic."""
+        callbacks = []
+        nodes = [self._root]
+
+        for level in topic.split('/'):
+            next_nodes = []
+
+            for node in nodes:
+                wildcard = node.children.get('#')
+                if wildcard is not None:
+                    callbacks.extend(wildcard.callbacks)
+
+                for key in (level, '+'):
+                    child = node.children.get(key)
+                    if child is not None:
+                        next_nodes.append(child)
+
+            nodes = next_nodes
+
+            if not nodes:
+                return callbacks
+
+        for node in nodes:
+            callbacks.extend(node.callbacks)
+
+            # A subscription to a/# also matches a
+            wildcard = node.children.get('#')
+            if wildcard is not None:
+                callbacks.extend(wildcard.callbacks)
+
+        return callbacks
+
+
+class _TopicNode(object):
+    """A level in the topic trie."""
 
-    sub_parts = subscription.split('/')
-    topic_parts = topic.split('/')
+    __slots__ = ['children', 'callbacks']
 
-    return (len(sub_parts) == len(topic_parts) and
-            all(a == b for a, b in zip(sub_parts, topic_parts) if a != '+'))
+    def __init__(self):
+        """Initialize the node."""
+        self.children = {}
+        self.callbacks = []
@@ -15,10 +15,12 @@ from datetime import timedelta
 
 import voluptuous as vol
 
+import homeassistant.helpers.config_validation as cv
 import homeassistant.util.dt as dt_util
 from homeassistant.const import (EVENT_HOMEASSISTANT_START,
                                  EVENT_HOMEASSISTANT_STOP, EVENT_STATE_CHANGED,
                                  EVENT_TIME_CHANGED, MATCH_ALL)
+from homeassistant.helpers.entity import split_entity_id
 from homeassistant.helpers.event import track_point_in_utc_time
 
 DOMAIN = "recorder"
@@ -30,17 +32,41 @@ DEFAULT_DB_FILE = "home-assistant_v2.db"
 
 CONF_DB_URL = "db_url"
 CONF_PURGE_DAYS = "purge_days"
+CONF_COMMIT_INTERVAL = "commit_interval"
+CONF_MAX_BATCH_SIZE = "max_batch_size"
+CONF_INCLUDE = "include"
+CONF_EXCLUDE = "exclude"
+CONF_DOMAINS = "domains"
+CONF_ENTITIES = "entities"
+CONF_EVENT_TYPES = "event_types"
+
+DEFAULT_COMMIT_INTERVAL = 0
+DEFAULT_MAX_BATCH_SIZE = 100
 
 RETRIES = 3
 CONNECT_RETRY_WAIT = 10
 QUERY_RETRY_WAIT = 0.1
 
+FILTER_SCHEMA = vol.Schema({
+    vol.Optional(CONF_DOMAINS, default=[]):
+        vol.All(cv.ensure_list, [cv.string]),
+    vol.Optional(CONF_ENTITIES, default=[]): cv.entity_ids,
+    vol.Optional(CONF_EVENT_TYPES, default=[]):
+        vol.All(cv.ensure_list, [cv.string]),
+})
+
 CONFIG_SCHEMA = vol.Schema({
     DOMAIN: vol.Schema({
         vol.Optional(CONF_PURGE_DAYS): vol.All(vol.Coerce(int),
                                                vol.Range(min=1)),
         # pylint: disable=no-value-for-parameter
         vol.Optional(CONF_DB_URL): vol.Url(),
+        vol.Optional(CONF_COMMIT_INTERVAL, default=DEFAULT_COMMIT_INTERVAL):
+            vol.All(vol.Coerce(float), vol.Range(min=0)),
+        vol.Optional(CONF_MAX_BATCH_SIZE, default=DEFAULT_MAX_BATCH_SIZE):
+            vol.All(vol.Coerce(int), vol.Range(min=1)),
+        vol.Optional(CONF_INCLUDE, default={}): FILTER_SCHEMA,
+        vol.Optional(CONF_EXCLUDE, default={}): FILTER_SCHEMA,
     })
 }, extra=vol.ALLOW_EXTRA)
 
@@ -104,11 +130,46 @@ def setup(hass, config):
         db_url = DEFAULT_URL.format(
             hass_config_path=hass.config.path(DEFAULT_DB_FILE))
 
-    _INSTANCE = Recorder(hass, purge_days=purge_days, uri=db_url)
+    commit_interval = config.get(DOMAIN, {}).get(
+        CONF_COMMIT_INTERVAL, DEFAULT_COMMIT_INTERVAL)
+    max_batch_size = config.get(DOMAIN, {}).get(
+        CONF_MAX_BATCH_SIZE, DEFAULT_MAX_BATCH_SIZE)
+
+    include = config.get(DOMAIN, {}).get(CONF_INCLUDE, {})
+    exclude = config.get(DOMAIN, {}).get(CONF_EXCLUDE, {})
+
+    _INSTANCE = Recorder(hass, purge_days=purge_days, uri=db_url,
+                         commit_interval=commit_interval,
+                         max_batch_size=max_batch_size,
+                         include=include, exclude=exclude)
 
     return True
 
 
+def add_batch_handler(handler):
+    """Call handler(session, events) for every batch of saved events.
+
+    The handler runs in the recorder thread once the events are committed,
+    in a transaction of its own, so it can store data derived from them.
+    The transaction is rolled back if the handler raises.
+    """
+    _verify_instance()
+
+    _INSTANCE.batch_handlers.append(handler)
+
+
+def statistics():
+    """Return queue depth and commit latency of the running recorder."""
+    _verify_instance()
+
+    return {
+        'queue_depth': _INSTANCE.queue.qsize(),
+        'last_batch_size': _INSTANCE.last_batch_size,
+        'last_commit_latency': _INSTANCE.last_commit_latency,
+        'max_commit_latency': _INSTANCE.max_commit_latency,
+    }
+
+
 def query(model_name, *args):
     """Helper to return a query handle."""
     if isinstance(model_name, str):
@@ -142,18 +203,38 @@ class Recorder(threading.Thread):
     """A threaded recorder class."""
 
     # pylint: disable=too-many-instance-attributes
-    def __init__(self, hass, purge_days, uri):
+    def __init__(self, hass, purge_days, uri,
+                 commit_interval=DEFAULT_COMMIT_INTERVAL,
+                 max_batch_size=DEFAULT_MAX_BATCH_SIZE,
+                 include=None, exclude=None):
         """Initialize the recorder."""
+        # pylint: disable=too-many-arguments
         threading.Thread.__init__(self)
 
         self.hass = hass
         self.purge_days = purge_days
+        self.commit_interval = commit_interval
+        self.max_batch_size = max_batch_size
+        self.last_batch_size = 0
+        self.last_commit_latency = None
+        self.max_commit_latency = None
+
+        include = include or {}
+        exclude = exclude or {}
+        self.include_domains = set(include.get(CONF_DOMAINS, []))
+        self.include_entities = set(include.get(CONF_ENTITIES, []))
+        self.include_event_types = set(include.get(CONF_EVENT_TYPES, []))
+        self.exclude_domains = set(exclude.get(CONF_DOMAINS, []))
+        self.exclude_entities = set(exclude.get(CONF_ENTITIES, []))
+        self.exclude_event_types = set(exclude.get(CONF_EVENT_TYPES, []))
+        self.exclude_event_types.add(EVENT_TIME_CHANGED)
         self.queue = queue.Queue()
         self.quit_object = object()
         self.recording_start = dt_util.utcnow()
         self.db_url = uri
         self.db_ready = threading.Event()
         self.engine = None
+        self.batch_handlers = []
         self._run = None
 
         def start_recording(event):
@@ -166,7 +247,6 @@ class Recorder(threading.Thread):
 
     def run(self):
         """Start processing events to save."""
-        from homeassistant.components.recorder.models import Events, States
         import sqlalchemy.exc
 
         while True:
@@ -188,9 +268,14 @@ class Recorder(threading.Thread):
                                     dt_util.utcnow() + timedelta(minutes=5))
 
         while True:
-            event = self.queue.get()
+            batch, quit_requested = self._get_batch()
 
-            if event == self.quit_object:
+            if batch:
+                self._save_batch(batch)
+                for _ in batch:
+                    self.queue.task_done()
+
+            if quit_requested:
                 self._close_run()
                 self._close_connection()
                 # pylint: disable=global-statement
@@ -199,31 +284,138 @@ class Recorder(threading.Thread):
                 self.queue.task_done()
                 return
 
-            if event.event_type == EVENT_TIME_CHANGED:
-                self.queue.task_done()
-                continue
+    def _get_batch(self):
+        """Block for the next event and drain the queue into a batch.
 
-            dbevent = Events.from_event(event)
-            self._commit(dbevent)
+        Events that are already queued are collected without waiting. If a
+        commit interval is configured, keep collecting until it expires or
+        the batch is full. Returns the batch and whether to quit afterwards.
+        """
+        batch = []
+        event = self.queue.get()
+        deadline = time.time() + self.commit_interval
 
-            if event.event_type != EVENT_STATE_CHANGED:
-                self.queue.task_done()
-                continue
+        while True:
+            if event == self.quit_object:
+                return batch, True
+
+            batch.append(event)
+
+            if len(batch) >= self.max_batch_size:
+                return batch, False
+
+            try:
+                timeout = deadline - time.time()
+                if timeout > 0:
+                    event = self.queue.get(timeout=timeout)
+                else:
+                    event = self.queue.get_nowait()
+            except queue.Empty:
+                return batch, False
+
+    def _save_batch(self, batch):
+        """Write a batch of events and their states in one transaction."""
+        from homeassistant.components.recorder.models import Events, States
+
+        def _save(session):
+            pending = []
+            for event in batch:
+                dbevent = Events.from_event(event)
+                session.add(dbevent)
+                pending.append((event, dbevent))
+
+            # Flush to have the database assign the event ids
+            session.flush()
+
+            for event, dbevent in pending:
+                if event.event_type != EVENT_STATE_CHANGED:
+                    continue
+                dbstate = States.from_event(event)
+                dbstate.event_id = dbevent.event_id
+                session.add(dbstate)
+
+        start = time.time()
+        self._commit(_save)
+        latency = time.time() - start
 
-            dbstate = States.from_event(event)
-            dbstate.event_id = dbevent.event_id
-            self._commit(dbstate)
+        self._handle_batch(batch)
 
-            self.queue.task_done()
+        self.last_batch_size = len(batch)
+        self.last_commit_latency = latency
+        if self.max_commit_latency is None or \
+                latency > self.max_commit_latency:
+            self.max_commit_latency = latency
+
+        _LOGGER.debug("Committed %s events in %.3f seconds, %s queued",
+                      len(batch), latency, self.queue.qsize())
+
+    def _handle_batch(self, batch):
+        """Pass a saved batch to every batch handler in its own transaction.
+
+        A failing handler can not leave part of its data behind or have the
+        batch saved again.
+        """
+        session = Session()
+
+        for handler in self.batch_handlers:
+            try:
+                handler(session, batch)
+                session.commit()
+            except Exception:  # pylint: disable=broad-except
+                session.rollback()
+                _LOGGER.exception('Error handling recorded events')
 
     def event_listener(self, event):
         """Listen for new events and put them in the process queue."""
-        self.queue.put(event)
+        if event.event_type != EVENT_HOMEASSISTANT_STOP and \
+           self.should_record(event):
+            self.queue.put(event)
+
+    def should_record(self, event):
+        """Return if an event passes the include and exclude filters."""
+        event_type = event.event_type
+
+        if event_type in self.exclude_event_types:
+            return False
+
+        if self.include_event_types and \
+                event_type not in self.include_event_types:
+            return False
+
+        if event_type != EVENT_STATE_CHANGED:
+            return True
+
+        entity_id = event.data.get('entity_id')
+
+        if entity_id in self.include_entities:
+            return True
+
+        if entity_id in self.exclude_entities:
+            return False
+
+        domain = split_entity_id(entity_id)[0]
+
+        if domain in self.exclude_domains:
+            return False
+
+        if self.include_domains or self.include_entities:
+            return domain in self.include_domains
+
+        return True
 
     def shutdown(self, event):
         """Tell the recorder to shut down."""
+        # The stop event is queued here instead of by the event listener,
+        # which could run after this and queue it behind the quit object.
+        if self.should_record(event):
+            self.queue.put(event)
+
         self.queue.put(self.quit_object)
-        self.queue.join()
+
+        # Events fired while stopping can end up behind the quit object and
+        # will never be processed, so wait for the thread instead of them.
+        if self.is_alive():
+            self.join()
 
     def block_till_done(self):
         """Block till all events processed."""
@@ -253,10 +445,31 @@ class Recorder(threading.Thread):
             self.engine = create_engine(self.db_url, echo=False)
 
         models.Base.metadata.create_all(self.engine)
+        self._create_missing_indexes()
         session_factory = sessionmaker(bind=self.engine)
         Session = scoped_session(session_factory)
         self.db_ready.set()
 
+    def _create_missing_indexes(self):
+        """Add indexes that were added to existing tables after creation."""
+        import homeassistant.components.recorder.models as models
+        from sqlalchemy import inspect
+
+        inspector = inspect(self.engine)
+
+        for table in models.Base.metadata.sorted_tables:
+            existing = set(index['name']
+                           for index in inspector.get_indexes(table.name))
+
+            for index in table.indexes:
+                if index.name in existing:
+                    continue
+
+                _LOGGER.warning('Adding index %s to the %s table. This might '
+                                'take a while on a large database.',
+                                index.name, table.name)
+                index.create(self.engine)
+
     def _close_connection(self):
         """Close the connection."""
         # pylint: disable=global-statement
@@ -291,7 +504,8 @@ class Recorder(threading.Thread):
 
     def _purge_old_data(self):
         """Purge events and states older than purge_days ago."""
-        from homeassistant.components.recorder.models import Events, States
+        from homeassistant.components.recorder.models import (
+            Events, LogbookEntries, States)
 
         if not self.purge_days or self.purge_days < 1:
             _LOGGER.debug("purge_days set to %s, will not purge any old data.",
@@ -318,6 +532,15 @@ class Recorder(threading.Thread):
         if self._commit(_purge_events):
             _LOGGER.info("Purged events created before %s", purge_before)
 
+        def _purge_logbook_entries(session):
+            deleted_rows = session.query(LogbookEntries) \
+                                  .filter(LogbookEntries.when < purge_before) \
+                                  .delete(synchronize_session=False)
+            _LOGGER.debug("Deleted %s logbook entries", deleted_rows)
+
+        if self._commit(_purge_logbook_entries):
+            _LOGGER.info("Purged logbook entries before %s", purge_before)
+
         Session().expire_all()
 
         # Execute sqlite vacuum command to free up space on disk
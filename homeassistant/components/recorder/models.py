@@ -73,7 +73,11 @@ class States(Base):   # type: ignore
     __table_args__ = (Index('states__state_changes',
                             'last_changed', 'last_updated', 'entity_id'),
                       Index('states__significant_changes',
-                            'domain', 'last_updated', 'entity_id'), )
+                            'domain', 'last_updated', 'entity_id'),
+                      Index('states__entity_id_last_updated',
+                            'entity_id', 'last_updated'),
+                      Index('states__entity_id_created',
+                            'entity_id', 'created'), )
 
     @staticmethod
     def from_event(event):
@@ -114,6 +118,27 @@ class States(Base):   # type: ignore
             return None
 
 
+class LogbookEntries(Base):   # type: ignore
+    # pylint: disable=too-few-public-methods
+    """Human readable logbook entry, maintained while recording events."""
+
+    __tablename__ = 'logbook_entries'
+    entry_id = Column(Integer, primary_key=True)
+    when = Column(DateTime(timezone=True), index=True)
+    name = Column(String(255))
+    message = Column(Text)
+    domain = Column(String(64))
+    entity_id = Column(String(255))
+
+    __table_args__ = (Index('logbook_entries__entity_id_when',
+                            'entity_id', 'when'), )
+
+    def to_native(self):
+        """Return self, native format is this model."""
+        self.when = _process_timestamp(self.when)
+        return self
+
+
 class RecorderRuns(Base):   # type: ignore
     # pylint: disable=too-few-public-methods
     """Representation of recorder run."""
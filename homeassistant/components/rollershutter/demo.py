@@ -5,7 +5,6 @@ For more details about this platform, please refer to the documentation
 https://home-assistant.io/components/demo/
 """
 from homeassistant.components.rollershutter import RollershutterDevice
-from homeassistant.const import EVENT_TIME_CHANGED
 from homeassistant.helpers.event import track_utc_time_change
 
 
@@ -63,7 +62,7 @@ class DemoRollershutter(RollershutterDevice):
     def stop(self, **kwargs):
         """Stop the roller shutter."""
         if self._listener is not None:
-            self.hass.bus.remove_listener(EVENT_TIME_CHANGED, self._listener)
+            self.hass.scheduler.cancel(self._listener)
             self._listener = None
 
     def _listen(self):
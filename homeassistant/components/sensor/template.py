@@ -9,7 +9,7 @@ import logging
 from homeassistant.components.sensor import ENTITY_ID_FORMAT
 from homeassistant.const import (
     ATTR_FRIENDLY_NAME, ATTR_UNIT_OF_MEASUREMENT, CONF_VALUE_TEMPLATE,
-    ATTR_ENTITY_ID, MATCH_ALL)
+    ATTR_ENTITY_ID)
 from homeassistant.exceptions import TemplateError
 from homeassistant.helpers.entity import Entity, generate_entity_id
 from homeassistant.helpers import template
@@ -46,7 +46,8 @@ def setup_platform(hass, config, add_devices, discovery_info=None):
                 "Missing %s for sensor %s", CONF_VALUE_TEMPLATE, device)
             continue
 
-        entity_ids = device_config.get(ATTR_ENTITY_ID, MATCH_ALL)
+        entity_ids = device_config.get(ATTR_ENTITY_ID) or \
+            template.extract_entities(state_template)
 
         sensors.append(
             SensorTemplate(
@@ -76,7 +77,7 @@ class SensorTemplate(Entity):
                                             hass=hass)
         self._name = friendly_name
         self._unit_of_measurement = unit_of_measurement
-        self._template = state_template
+        self._template = template.Template(state_template, hass)
         self._state = None
 
         self.update()
@@ -111,7 +112,7 @@ class SensorTemplate(Entity):
     def update(self):
         """Get the latest data and update the states."""
         try:
-            self._state = template.render(self.hass, self._template)
+            self._state = self._template.render()
         except TemplateError as ex:
             if ex.args and ex.args[0].startswith(
                     "UndefinedError: 'None' has no attribute"):
@@ -0,0 +1,79 @@
+"""
+Support for showing the load of the Home Assistant worker pool.
+
+The state is the number of jobs waiting for a worker. The attributes hold
+the number of workers and the jobs that took the most time so far.
+"""
+import voluptuous as vol
+
+from homeassistant.const import CONF_NAME, CONF_PLATFORM
+from homeassistant.helpers.entity import Entity
+import homeassistant.helpers.config_validation as cv
+
+DEFAULT_NAME = 'Worker Pool'
+
+ATTR_WORKERS = 'workers'
+ATTR_MAX_WORKERS = 'max_workers'
+ATTR_CURRENT_JOBS = 'current_jobs'
+ATTR_SLOWEST_JOBS = 'slowest_jobs'
+
+# Number of jobs to show in the slowest jobs attribute
+SLOWEST_JOB_COUNT = 5
+
+PLATFORM_SCHEMA = vol.Schema({
+    vol.Required(CONF_PLATFORM): 'worker_pool',
+    vol.Optional(CONF_NAME): cv.string,
+})
+
+
+# pylint: disable=unused-argument
+def setup_platform(hass, config, add_devices, discovery_info=None):
+    """Setup the worker pool sensor."""
+    add_devices([WorkerPoolSensor(hass, config.get(CONF_NAME, DEFAULT_NAME))])
+
+
+class WorkerPoolSensor(Entity):
+    """Representation of the load of the worker pool."""
+
+    def __init__(self, hass, name):
+        """Initialize the sensor."""
+        self._pool = hass.pool
+        self._name = name
+        self._state = None
+        self._attributes = {}
+        self.update()
+
+    @property
+    def name(self):
+        """Return the name of the sensor."""
+        return self._name
+
+    @property
+    def state(self):
+        """Return the state of the sensor."""
+        return self._state
+
+    @property
+    def unit_of_measurement(self):
+        """Return the unit this state is expressed in."""
+        return 'jobs'
+
+    @property
+    def device_state_attributes(self):
+        """Return the state attributes."""
+        return self._attributes
+
+    def update(self):
+        """Get the latest numbers from the pool."""
+        pool = self._pool
+        self._state = pool.queue_size
+        self._attributes = {
+            ATTR_WORKERS: pool.worker_count,
+            ATTR_MAX_WORKERS: pool.max_worker_count,
+            ATTR_CURRENT_JOBS: len(pool.current_jobs),
+            ATTR_SLOWEST_JOBS: [
+                '{}: {} x, {:.3f}s total, {:.3f}s max'.format(
+                    name, timing['count'], timing['total'], timing['max'])
+                for name, timing
+                in pool.timings.slowest(SLOWEST_JOB_COUNT)],
+        }
@@ -79,16 +79,14 @@ def setup(hass, config):
         """Handle calls to the switch services."""
         target_switches = component.extract_from_service(service)
 
-        for switch in target_switches:
-            if service.service == SERVICE_TURN_ON:
-                switch.turn_on()
-            elif service.service == SERVICE_TOGGLE:
-                switch.toggle()
-            else:
-                switch.turn_off()
-
-            if switch.should_poll:
-                switch.update_ha_state(True)
+        if service.service == SERVICE_TURN_ON:
+            method = 'turn_on'
+        elif service.service == SERVICE_TOGGLE:
+            method = 'toggle'
+        else:
+            method = 'turn_off'
+
+        component.command_entities(target_switches, method)
 
     descriptions = load_yaml_config_file(
         os.path.join(os.path.dirname(__file__), 'services.yaml'))
@@ -13,7 +13,7 @@ import voluptuous as vol
 from homeassistant.components.light import is_on, turn_on
 from homeassistant.components.sun import next_setting, next_rising
 from homeassistant.components.switch import DOMAIN, SwitchDevice
-from homeassistant.const import CONF_NAME, CONF_PLATFORM, EVENT_TIME_CHANGED
+from homeassistant.const import CONF_NAME, CONF_PLATFORM
 from homeassistant.helpers.event import track_utc_time_change
 from homeassistant.util.color import color_temperature_to_rgb as temp_to_rgb
 from homeassistant.util.color import color_RGB_to_xy
@@ -125,7 +125,9 @@ class FluxSwitch(SwitchDevice):
     def turn_off(self, **kwargs):
         """Turn off flux."""
         self._state = False
-        self.hass.bus.remove_listener(EVENT_TIME_CHANGED, self.tracker)
+        if self.tracker is not None:
+            self.hass.scheduler.cancel(self.tracker)
+            self.tracker = None
         self.update_ha_state()
 
     # pylint: disable=too-many-locals
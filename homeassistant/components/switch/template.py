@@ -9,7 +9,7 @@ import logging
 from homeassistant.components.switch import ENTITY_ID_FORMAT, SwitchDevice
 from homeassistant.const import (
     ATTR_FRIENDLY_NAME, CONF_VALUE_TEMPLATE, STATE_OFF, STATE_ON,
-    ATTR_ENTITY_ID, MATCH_ALL)
+    ATTR_ENTITY_ID)
 from homeassistant.exceptions import TemplateError
 from homeassistant.helpers.entity import generate_entity_id
 from homeassistant.helpers.script import Script
@@ -59,7 +59,8 @@ def setup_platform(hass, config, add_devices, discovery_info=None):
                 "Missing action for switch %s", device)
             continue
 
-        entity_ids = device_config.get(ATTR_ENTITY_ID, MATCH_ALL)
+        entity_ids = device_config.get(ATTR_ENTITY_ID) or \
+            template.extract_entities(state_template)
 
         switches.append(
             SwitchTemplate(
@@ -89,7 +90,7 @@ class SwitchTemplate(SwitchDevice):
         self.entity_id = generate_entity_id(ENTITY_ID_FORMAT, device_id,
                                             hass=hass)
         self._name = friendly_name
-        self._template = state_template
+        self._template = template.Template(state_template, hass)
         self._on_script = Script(hass, on_action)
         self._off_script = Script(hass, off_action)
         self._state = False
@@ -134,7 +135,7 @@ class SwitchTemplate(SwitchDevice):
     def update(self):
         """Update the state from the template."""
         try:
-            state = template.render(self.hass, self._template).lower()
+            state = self._template.render().lower()
 
             if state in _VALID_STATES:
                 self._state = state in ('true', STATE_ON)
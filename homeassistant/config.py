@@ -7,18 +7,21 @@ import voluptuous as vol
 
 from homeassistant.const import (
     CONF_LATITUDE, CONF_LONGITUDE, CONF_NAME, CONF_TEMPERATURE_UNIT,
-    CONF_TIME_ZONE, CONF_CUSTOMIZE, CONF_ELEVATION, TEMP_FAHRENHEIT,
+    CONF_TIME_ZONE, CONF_CUSTOMIZE, CONF_ELEVATION, CONF_DISPATCH_PER_EVENT,
+    CONF_MIN_WORKER_THREADS, CONF_MAX_WORKER_THREADS, TEMP_FAHRENHEIT,
     TEMP_CELSIUS, __version__)
 from homeassistant.exceptions import HomeAssistantError
 from homeassistant.util.yaml import load_yaml
 import homeassistant.helpers.config_validation as cv
 from homeassistant.helpers.entity import valid_entity_id, set_customize
-from homeassistant.util import dt as date_util, location as loc_util
+from homeassistant.util import (
+    dt as date_util, location as loc_util, profile)
 
 _LOGGER = logging.getLogger(__name__)
 
 YAML_CONFIG_FILE = 'configuration.yaml'
 VERSION_FILE = '.HA_VERSION'
+YAML_CACHE_FILE = '.yaml_cache'
 CONFIG_DIR_NAME = '.homeassistant'
 
 DEFAULT_CONFIG = (
@@ -60,7 +63,18 @@ def _valid_customize(value):
 
     return value
 
-CORE_CONFIG_SCHEMA = vol.Schema({
+
+def _valid_worker_threads(config):
+    """Validate that the minimum number of workers is not above the max."""
+    if config.get(CONF_MIN_WORKER_THREADS, 0) > \
+       config.get(CONF_MAX_WORKER_THREADS, float('inf')):
+        raise vol.Invalid('{} cannot be above {}'.format(
+            CONF_MIN_WORKER_THREADS, CONF_MAX_WORKER_THREADS))
+
+    return config
+
+
+CORE_CONFIG_SCHEMA = vol.All(vol.Schema({
     CONF_NAME: vol.Coerce(str),
     CONF_LATITUDE: cv.latitude,
     CONF_LONGITUDE: cv.longitude,
@@ -68,7 +82,10 @@ CORE_CONFIG_SCHEMA = vol.Schema({
     CONF_TEMPERATURE_UNIT: cv.temperature_unit,
     CONF_TIME_ZONE: cv.time_zone,
     vol.Required(CONF_CUSTOMIZE, default=dict): _valid_customize,
-})
+    CONF_DISPATCH_PER_EVENT: cv.boolean,
+    CONF_MIN_WORKER_THREADS: vol.All(vol.Coerce(int), vol.Range(min=1)),
+    CONF_MAX_WORKER_THREADS: vol.All(vol.Coerce(int), vol.Range(min=1)),
+}), _valid_worker_threads)
 
 
 def get_default_config_dir():
@@ -157,7 +174,8 @@ def find_config_file(config_dir):
 
 def load_yaml_config_file(config_path):
     """Parse a YAML configuration file."""
-    conf_dict = load_yaml(config_path)
+    with profile.timed('config', 'load_yaml'):
+        conf_dict = load_yaml(config_path)
 
     if not isinstance(conf_dict, dict):
         msg = 'The configuration file {} does not contain a dictionary'.format(
@@ -227,6 +245,14 @@ def process_ha_core_config(hass, config):
     if CONF_TEMPERATURE_UNIT in config:
         hac.temperature_unit = config[CONF_TEMPERATURE_UNIT]
 
+    if CONF_DISPATCH_PER_EVENT in config:
+        hass.bus.dispatch_per_event = config[CONF_DISPATCH_PER_EVENT]
+
+    if CONF_MIN_WORKER_THREADS in config or \
+       CONF_MAX_WORKER_THREADS in config:
+        hass.pool.set_worker_limits(config.get(CONF_MIN_WORKER_THREADS),
+                                    config.get(CONF_MAX_WORKER_THREADS))
+
     # Shortcut if no auto-detection necessary
     if None not in (hac.latitude, hac.longitude, hac.temperature_unit,
                     hac.time_zone, hac.elevation):
@@ -27,6 +27,7 @@ CONF_BEFORE = 'before'
 CONF_BELOW = 'below'
 CONF_CONDITION = 'condition'
 CONF_CUSTOMIZE = 'customize'
+CONF_DISPATCH_PER_EVENT = 'dispatch_per_event'
 CONF_ELEVATION = 'elevation'
 CONF_ENTITY_ID = 'entity_id'
 CONF_ENTITY_NAMESPACE = 'entity_namespace'
@@ -37,6 +38,8 @@ CONF_HOSTS = 'hosts'
 CONF_ICON = 'icon'
 CONF_LATITUDE = 'latitude'
 CONF_LONGITUDE = 'longitude'
+CONF_MAX_WORKER_THREADS = 'max_worker_threads'
+CONF_MIN_WORKER_THREADS = 'min_worker_threads'
 CONF_MONITORED_CONDITIONS = 'monitored_conditions'
 CONF_NAME = 'name'
 CONF_OFFSET = 'offset'
@@ -206,10 +209,12 @@ URL_API_EVENTS_EVENT = "/api/events/{}"
 URL_API_SERVICES = "/api/services"
 URL_API_SERVICES_SERVICE = "/api/services/{}/{}"
 URL_API_EVENT_FORWARD = "/api/event_forwarding"
+URL_API_EVENT_BATCH = "/api/event_batch"
 URL_API_COMPONENTS = "/api/components"
 URL_API_ERROR_LOG = "/api/error_log"
 URL_API_LOG_OUT = "/api/log_out"
 URL_API_TEMPLATE = "/api/template"
+URL_API_POOL = "/api/pool"
 
 HTTP_OK = 200
 HTTP_CREATED = 201
@@ -7,12 +7,18 @@ of entities and react to changes.
 
 import enum
 import functools as ft
+import heapq
+import itertools
+import json
 import logging
 import os
 import signal
 import threading
 import enum
 import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
 
 import voluptuous as vol
 
@@ -30,7 +36,7 @@ from homeassistant.const import (
     SERVICE_HOMEASSISTANT_RESTART, SERVICE_HOMEASSISTANT_STOP, TEMP_CELSIUS,
     TEMP_FAHRENHEIT, __version__)
 from homeassistant.exceptions import (
-    HomeAssistantError, InvalidEntityFormatError)
+    HomeAssistantError, InvalidEntityFormatError, ServiceCallTimeout)
 from homeassistant.helpers.entity import split_entity_id, valid_entity_id
 from homeassistant.util.compat import MappingProxyType
 
@@ -44,9 +50,25 @@ SERVICE_CALL_LIMIT = 10  # seconds
 
 # Define number of MINIMUM worker threads.
 # During bootstrap of HA (see bootstrap._setup_component()) worker threads
-# will be added for each component that polls devices.
+# will be added for each component that polls devices. Configurable with
+# min_worker_threads in the homeassistant section.
 MIN_WORKER_THREAD = 2
 
+# Maximum number of worker threads. Workers above MIN_WORKER_THREAD and the
+# ones added during bootstrap are added when jobs have to wait in the queue
+# and removed again once they are idle. Configurable with max_worker_threads
+# in the homeassistant section.
+MAX_WORKER_THREAD = 20
+
+# Number of worker threads that run blocking entity updates. These threads
+# talk to devices and web services, so more are added when updates queue up.
+IO_WORKER_THREAD = 2
+MAX_IO_WORKER_THREAD = 20
+
+# Number of removed entities the state machine remembers so clients can
+# sync the states that changed since a revision
+MAX_REMOVED_STATES = 1000
+
 _LOGGER = logging.getLogger(__name__)
 
 
@@ -68,10 +90,14 @@ class HomeAssistant(object):
 
     def __init__(self):
         """Initialize new Home Assistant object."""
-        self.pool = pool = create_worker_pool()
+        self.pool = pool = create_worker_pool(
+            max_worker_count=MAX_WORKER_THREAD)
+        self.io_pool = create_worker_pool(
+            IO_WORKER_THREAD, max_worker_count=MAX_IO_WORKER_THREAD)
         self.bus = EventBus(pool)
         self.services = ServiceRegistry(self.bus, pool)
         self.states = StateMachine(self.bus)
+        self.scheduler = Scheduler(self.bus, pool)
         self.config = Config()
         self.state = CoreState.not_running
 
@@ -139,6 +165,7 @@ class HomeAssistant(object):
         self.state = CoreState.stopping
         self.bus.fire(EVENT_HOMEASSISTANT_STOP)
         self.pool.stop()
+        self.io_pool.stop()
         self.state = CoreState.not_running
 
 
@@ -221,45 +248,96 @@ class Event(object):
 
 
 class EventBus(object):
-    """Allows firing of and listening for events."""
+    """Allows firing of and listening for events.
+
+    The listener table is copy-on-write: it is only replaced, never mutated,
+    so fire can take a snapshot of it without acquiring the lock.
+    """
+
+    def __init__(self, pool=None, dispatch_per_event=False):
+        """Initialize a new event bus.
 
-    def __init__(self, pool=None):
-        """Initialize a new event bus."""
+        dispatch_per_event: add a single job per fired event to the pool that
+                            calls all listeners, instead of one job per
+                            listener.
+        """
         self._listeners = {}
+        self._state_listeners = {}
         self._lock = threading.Lock()
         self._pool = pool or create_worker_pool()
+        self.dispatch_per_event = dispatch_per_event
 
     @property
     def listeners(self):
         """Dict with events and the number of listeners."""
-        with self._lock:
-            return {key: len(self._listeners[key])
-                    for key in self._listeners}
+        listeners = {key: len(value) for key, value
+                     in self._listeners.items()}
+
+        state_count = sum(len(value) for value
+                          in self._state_listeners.values())
+
+        if state_count:
+            listeners[EVENT_STATE_CHANGED] = \
+                listeners.get(EVENT_STATE_CHANGED, 0) + state_count
+
+        return listeners
 
     def fire(self, event_type, event_data=None, origin=EventOrigin.local):
         """Fire an event."""
         if not self._pool.running:
             raise HomeAssistantError('Home Assistant has shut down.')
 
-        with self._lock:
-            # Copy the list of the current listeners because some listeners
-            # remove themselves as a listener while being executed which
-            # causes the iterator to be confused.
-            get = self._listeners.get
-            listeners = get(MATCH_ALL, []) + get(event_type, [])
+        # The table is never mutated, so listeners that remove themselves
+        # while being executed do not affect this snapshot.
+        get = self._listeners.get
+        listeners = get(MATCH_ALL, ()) + get(event_type, ())
 
-            event = Event(event_type, event_data, origin)
+        if event_type == EVENT_STATE_CHANGED and event_data:
+            listeners += self._state_listeners.get(
+                event_data.get('entity_id'), ())
 
-            if event_type != EVENT_TIME_CHANGED:
-                _LOGGER.info("Bus:Handling %s", event)
+        event = Event(event_type, event_data, origin)
 
-            if not listeners:
-                return
+        if event_type != EVENT_TIME_CHANGED:
+            _LOGGER.info("Bus:Handling %s", event)
+
+        if not listeners:
+            return
+
+        job_priority = JobPriority.from_event_type(event_type)
 
-            job_priority = JobPriority.from_event_type(event_type)
+        # Listeners get the state changes of an entity one at a time and
+        # in the order they happened
+        entity_id = event_data.get('entity_id') \
+            if event_type == EVENT_STATE_CHANGED and event_data else None
 
-            for func in listeners:
-                self._pool.add_job(job_priority, (func, event))
+        if self.dispatch_per_event:
+            self._pool.add_job(job_priority,
+                               (self._dispatch, (listeners, event)),
+                               entity_id, 'dispatch {}'.format(event_type))
+            return
+
+        for func in listeners:
+            self._pool.add_job(
+                job_priority, (func, event),
+                None if entity_id is None else (id(func), entity_id))
+
+    def _dispatch(self, listeners_and_event):
+        """Call all listeners for an event from within a worker."""
+        listeners, event = listeners_and_event
+        timings = getattr(self._pool, 'timings', None)
+
+        for func in listeners:
+            start = time.time()
+
+            try:
+                func(event)
+            except Exception:  # pylint: disable=broad-except
+                # One failing listener should not starve the others
+                _LOGGER.exception("BusHandler:Exception doing job")
+
+            if timings is not None:
+                timings.add(_job_name((func, event)), time.time() - start)
 
     def listen(self, event_type, listener):
         """Listen for all events or events of a specific type.
@@ -268,10 +346,26 @@ class EventBus(object):
         as event_type.
         """
         with self._lock:
-            if event_type in self._listeners:
-                self._listeners[event_type].append(listener)
-            else:
-                self._listeners[event_type] = [listener]
+            listeners = dict(self._listeners)
+            listeners[event_type] = \
+                listeners.get(event_type, ()) + (listener,)
+            self._listeners = listeners
+
+    def listen_state(self, entity_id, listener):
+        """Listen for state changed events of a specific entity.
+
+        Unlike listening for ``EVENT_STATE_CHANGED``, the listener will only
+        be called for state changes of entity_id.
+
+        Remove it again with remove_listener for ``EVENT_STATE_CHANGED``.
+        """
+        entity_id = entity_id.lower()
+
+        with self._lock:
+            listeners = dict(self._state_listeners)
+            listeners[entity_id] = \
+                listeners.get(entity_id, ()) + (listener,)
+            self._state_listeners = listeners
 
     def listen_once(self, event_type, listener):
         """Listen once for event of a specific type.
@@ -302,19 +396,66 @@ class EventBus(object):
         return onetime_listener
 
     def remove_listener(self, event_type, listener):
-        """Remove a listener of a specific event_type."""
+        """Remove a listener of a specific event_type.
+
+        Handles of the scheduler, which the time tracking helpers return
+        instead of listeners, are cancelled.
+        """
+        if isinstance(listener, ScheduledAction):
+            listener.scheduler.cancel(listener)
+            return
+
         with self._lock:
-            try:
-                self._listeners[event_type].remove(listener)
+            listeners = _remove_from_table(
+                self._listeners, event_type, listener)
+
+            if listeners is not None:
+                self._listeners = listeners
+                return
+
+            if event_type != EVENT_STATE_CHANGED:
+                return
+
+            # The listener might have been registered with listen_state,
+            # for every entity it was registered for and as often
+            listeners = self._state_listeners
+
+            for entity_id in list(listeners):
+                remaining = _remove_from_table(
+                    listeners, entity_id, listener, every=True)
+
+                if remaining is not None:
+                    listeners = remaining
 
-                # delete event_type list if empty
-                if not self._listeners[event_type]:
-                    self._listeners.pop(event_type)
+            self._state_listeners = listeners
 
-            except (KeyError, ValueError):
-                # KeyError is key event_type listener did not exist
-                # ValueError if listener did not exist within event_type
-                pass
+
+def _remove_from_table(table, key, listener, every=False):
+    """Return a copy of a listener table without listener under key.
+
+    Removes one occurrence of listener, or every one if every is True.
+    Returns None if listener is not registered under key.
+    """
+    current = table.get(key, ())
+
+    try:
+        index = current.index(listener)
+    except ValueError:
+        return None
+
+    table = dict(table)
+    if every:
+        remaining = tuple(item for item in current if item != listener)
+    else:
+        remaining = current[:index] + current[index + 1:]
+
+    # delete key if empty
+    if remaining:
+        table[key] = remaining
+    else:
+        table.pop(key)
+
+    return table
 
 
 class State(object):
@@ -325,10 +466,12 @@ class State(object):
     attributes: extra information on entity and state
     last_changed: last time the state was changed, not the attributes.
     last_updated: last time this object was updated.
+    domain and object_id: the parts of the entity id.
     """
 
     __slots__ = ['entity_id', 'state', 'attributes',
-                 'last_changed', 'last_updated']
+                 'last_changed', 'last_updated', 'domain', 'object_id',
+                 '_json']
 
     # pylint: disable=too-many-arguments
     def __init__(self, entity_id, state, attributes=None, last_changed=None,
@@ -340,21 +483,36 @@ class State(object):
                 "Format should be <domain>.<object_id>").format(entity_id))
 
         self.entity_id = entity_id.lower()
+        self.domain, self.object_id = split_entity_id(self.entity_id)
         self.state = str(state)
         self.attributes = MappingProxyType(attributes or {})
         self.last_updated = last_updated or dt_util.utcnow()
 
         self.last_changed = last_changed or self.last_updated
+        self._json = None
 
-    @property
-    def domain(self):
-        """Domain of this state."""
-        return split_entity_id(self.entity_id)[0]
+    @classmethod
+    def _from_known(cls, old_state, state, attributes, last_changed):
+        """Create the next state of the entity of old_state.
 
-    @property
-    def object_id(self):
-        """Object id of this state."""
-        return split_entity_id(self.entity_id)[1]
+        The entity id is not validated again. attributes is the attributes
+        mapping of old_state if they did not change, otherwise a dict.
+        """
+        new = cls.__new__(cls)
+        new.entity_id = old_state.entity_id
+        new.domain = old_state.domain
+        new.object_id = old_state.object_id
+        new.state = state
+
+        if attributes is old_state.attributes:
+            new.attributes = attributes
+        else:
+            new.attributes = MappingProxyType(attributes)
+
+        new.last_updated = dt_util.utcnow()
+        new.last_changed = last_changed or new.last_updated
+        new._json = None
+        return new
 
     @property
     def name(self):
@@ -375,6 +533,19 @@ class State(object):
                 'last_changed': self.last_changed,
                 'last_updated': self.last_updated}
 
+    def as_json(self):
+        """Return the JSON representation of the State.
+
+        It is serialized on first use and kept, a State does not change.
+        """
+        if self._json is None:
+            from homeassistant.remote import JSONEncoder
+
+            self._json = json.dumps(self.as_dict(), sort_keys=True,
+                                    cls=JSONEncoder)
+
+        return self._json
+
     @classmethod
     def from_dict(cls, json_dict):
         """Initialize a state from a dict.
@@ -423,6 +594,45 @@ class StateMachine(object):
         self._states = {}
         self._bus = bus
         self._lock = threading.Lock()
+        # Every change gets the next revision. Entity ids are kept in the
+        # order they last changed, removed ones until there are too many.
+        # Revisions restart with every run, so they are only compared
+        # together with the id of the run they belong to.
+        self.run_id = uuid.uuid4().hex
+        self._revision = self._oldest_revision = 0
+        self._changed = OrderedDict()
+        self._removed = OrderedDict()
+
+    @property
+    def revision(self):
+        """Return the revision of the last change."""
+        return self._revision
+
+    def changes_since(self, revision, run_id):
+        """Return the changes after revision of run run_id.
+
+        Returns a tuple of the current revision, the states that changed
+        and the entity ids that were removed, or None if the revision is
+        from another run or the changes are no longer known.
+        """
+        with self._lock:
+            if run_id != self.run_id or \
+                    not self._oldest_revision <= revision <= self._revision:
+                return None
+
+            states = []
+            for entity_id in reversed(self._changed):
+                if self._changed[entity_id] <= revision:
+                    break
+                states.append(self._states[entity_id])
+
+            removed = []
+            for entity_id in reversed(self._removed):
+                if self._removed[entity_id] <= revision:
+                    break
+                removed.append(entity_id)
+
+            return self._revision, states, removed
 
     def entity_ids(self, domain_filter=None):
         """List of entity ids that are being tracked."""
@@ -471,10 +681,18 @@ class StateMachine(object):
             if old_state is None:
                 return False
 
+            self._revision += 1
+            del self._changed[entity_id]
+            self._removed[entity_id] = self._revision
+
+            if len(self._removed) > MAX_REMOVED_STATES:
+                _, self._oldest_revision = self._removed.popitem(last=False)
+
             event_data = {
                 'entity_id': entity_id,
                 'old_state': old_state,
                 'new_state': None,
+                'revision': self._revision,
             }
 
             self._bus.fire(EVENT_STATE_CHANGED, event_data)
@@ -507,18 +725,205 @@ class StateMachine(object):
             # If state did not exist or is different, set it
             last_changed = old_state.last_changed if same_state else None
 
-            state = State(entity_id, new_state, attributes, last_changed)
+            if is_existing:
+                # Keep the attributes mapping if only the state changed
+                if same_attr:
+                    attributes = old_state.attributes
+
+                state = State._from_known(old_state, new_state, attributes,
+                                          last_changed)
+            else:
+                state = State(entity_id, new_state, attributes, last_changed)
+
             self._states[entity_id] = state
 
+            self._revision += 1
+            self._changed.pop(entity_id, None)
+            self._removed.pop(entity_id, None)
+            self._changed[entity_id] = self._revision
+
             event_data = {
                 'entity_id': entity_id,
                 'old_state': old_state,
                 'new_state': state,
+                'revision': self._revision,
             }
 
             self._bus.fire(EVENT_STATE_CHANGED, event_data)
 
 
+class ScheduledAction(list):
+    """Handle of an action of the scheduler.
+
+    Holds [due, counter, action] or [due, counter, action, pattern] so it
+    can be kept in a heap. The action is None once it is cancelled or done.
+    """
+
+    __slots__ = ['scheduler']
+
+    def __init__(self, scheduler, items):
+        """Initialize the handle of an action of scheduler."""
+        super(ScheduledAction, self).__init__(items)
+        self.scheduler = scheduler
+
+
+class Scheduler(object):
+    """Calls actions when a point in time has passed or a pattern matches.
+
+    Pending actions are kept in heaps ordered by the time they are due. A
+    single EVENT_TIME_CHANGED listener pops the actions that are due, so the
+    cost of a time tick does not grow with the number of pending actions.
+    """
+
+    def __init__(self, bus, pool=None):
+        """Initialize the scheduler."""
+        self._heap = []
+        # Patterns are tracked per frame (UTC or local) on the wall clock
+        self._pattern_heaps = {False: [], True: []}
+        self._last_walls = {False: None, True: None}
+        self._lock = threading.Lock()
+        self._pool = pool or create_worker_pool()
+        self._counter = itertools.count()
+        self._cancelled = 0
+        bus.listen(EVENT_TIME_CHANGED, self._time_changed_listener)
+
+    @property
+    def pending(self):
+        """Number of point in time actions waiting to be called."""
+        with self._lock:
+            return len(self._heap) - self._cancelled
+
+    def schedule(self, point_in_time, action):
+        """Call action with the current time once point_in_time has passed.
+
+        point_in_time has to be a timezone aware datetime. Returns a handle
+        that can be passed to cancel.
+        """
+        # The counter breaks ties so actions themselves are never compared
+        entry = ScheduledAction(
+            self, (point_in_time, next(self._counter), action))
+
+        with self._lock:
+            heapq.heappush(self._heap, entry)
+
+        return entry
+
+    def schedule_pattern(self, pattern, action, local=False):
+        """Call action with the current time whenever it matches pattern.
+
+        pattern needs a matches and a next_match method, like
+        helpers.event.TimePattern. Set local to match against local instead
+        of UTC time. Returns a handle that can be passed to cancel.
+        """
+        # datetime.min makes it due on the next tick, where it is matched
+        # and the time of its next match is calculated.
+        entry = ScheduledAction(
+            self, (datetime.min, next(self._counter), action, pattern))
+
+        with self._lock:
+            heapq.heappush(self._pattern_heaps[local], entry)
+
+        return entry
+
+    def cancel(self, entry):
+        """Cancel a scheduled action.
+
+        Returns boolean to indicate if the action was still pending.
+        """
+        with self._lock:
+            if entry[2] is None:
+                return False
+
+            entry[2] = None
+
+            # Cancelled patterns are dropped once they are due
+            if len(entry) > 3:
+                return True
+
+            # Cancelled entries are skipped when they reach the top of the
+            # heap. Rebuild it once they make up half of it.
+            self._cancelled += 1
+
+            if self._cancelled * 2 > len(self._heap):
+                self._heap = [item for item in self._heap
+                              if item[2] is not None]
+                heapq.heapify(self._heap)
+                self._cancelled = 0
+
+            return True
+
+    def _time_changed_listener(self, event):
+        """Add a job to the pool for every action that is due."""
+        now = event.data[ATTR_NOW]
+        utc_now = now if now.tzinfo is not None else dt_util.UTC.localize(now)
+        due = []
+
+        with self._lock:
+            heap = self._heap
+
+            while heap and heap[0][0] <= utc_now:
+                entry = heapq.heappop(heap)
+                action = entry[2]
+
+                if action is None:
+                    self._cancelled -= 1
+                    continue
+
+                # Mark as done so it can never be called or cancelled again
+                entry[2] = None
+                due.append((action, now))
+
+            for local in (False, True):
+                self._pop_due_patterns(now, local, due)
+
+        for job in due:
+            self._pool.add_job(JobPriority.EVENT_TIME, job)
+
+    def _pop_due_patterns(self, now, local, due):
+        """Collect the actions of patterns matching now."""
+        heap = self._pattern_heaps[local]
+
+        if not heap:
+            return
+
+        if local:
+            now = dt_util.as_local(now)
+        elif now.tzinfo is not None:
+            now = dt_util.as_utc(now)
+
+        wall = now.replace(tzinfo=None, microsecond=0)
+        last_wall = self._last_walls[local]
+        self._last_walls[local] = wall
+
+        # Next matches were calculated from the last tick. If time did not
+        # move forward, all patterns have to be matched against this tick.
+        if last_wall is not None and wall <= last_wall:
+            for entry in heap:
+                entry[0] = datetime.min
+            heapq.heapify(heap)
+
+        one_second = timedelta(seconds=1)
+
+        while heap and heap[0][0] <= wall:
+            entry = heapq.heappop(heap)
+            action, pattern = entry[2], entry[3]
+
+            if action is None:
+                continue
+
+            if pattern.matches(wall):
+                due.append((action, now))
+
+            entry[0] = pattern.next_match(wall + one_second)
+
+            if entry[0] is None:
+                # The pattern will never match again
+                entry[2] = None
+                continue
+
+            heapq.heappush(heap, entry)
+
+
 # pylint: disable=too-few-public-methods
 class Service(object):
     """Represents a callable service."""
@@ -545,7 +950,7 @@ class Service(object):
             if self.schema:
                 call.data = self.schema(call.data)
 
-            self.func(call)
+            return self.func(call)
         except vol.MultipleInvalid as ex:
             _LOGGER.error('Invalid service data for %s.%s: %s',
                           call.domain, call.service, ex)
@@ -573,6 +978,32 @@ class ServiceCall(object):
             return "<ServiceCall {}.{}>".format(self.domain, self.service)
 
 
+class ServiceCallFuture(object):
+    """The outcome of a blocking service call, set once it is executed."""
+
+    __slots__ = ['_done', 'result', 'exception']
+
+    def __init__(self):
+        """Initialize a service call future."""
+        self._done = threading.Event()
+        self.result = None
+        self.exception = None
+
+    def set_result(self, result):
+        """Set the value the service returned."""
+        self.result = result
+        self._done.set()
+
+    def set_exception(self, exception):
+        """Set the exception the service raised."""
+        self.exception = exception
+        self._done.set()
+
+    def wait(self, timeout):
+        """Wait till the service is executed, return False on timeout."""
+        return self._done.wait(timeout)
+
+
 class ServiceRegistry(object):
     """Offers services over the eventbus."""
 
@@ -582,8 +1013,11 @@ class ServiceRegistry(object):
         self._lock = threading.Lock()
         self._pool = pool or create_worker_pool()
         self._bus = bus
-        self._cur_id = 0
+        self._call_ids = itertools.count(1)
+        # Dict of call id => ServiceCallFuture of the blocking calls
+        self._pending = {}
         bus.listen(EVENT_CALL_SERVICE, self._event_to_service_call)
+        bus.listen(EVENT_SERVICE_EXECUTED, self._event_to_service_executed)
 
     @property
     def services(self):
@@ -621,7 +1055,8 @@ class ServiceRegistry(object):
                 EVENT_SERVICE_REGISTERED,
                 {ATTR_DOMAIN: domain, ATTR_SERVICE: service})
 
-    def call(self, domain, service, service_data=None, blocking=False):
+    def call(self, domain, service, service_data=None, blocking=False,
+             return_result=False):
         """
         Call a service.
 
@@ -629,7 +1064,13 @@ class ServiceRegistry(object):
         Waits a maximum of SERVICE_CALL_LIMIT.
 
         If blocking = True, will return boolean if service executed
-        succesfully within SERVICE_CALL_LIMIT.
+        succesfully within SERVICE_CALL_LIMIT. Exceptions raised by the
+        service are logged.
+
+        Specify return_result=True to wait like blocking=True and return
+        what the service returned instead. Exceptions raised by the service
+        are raised again and ServiceCallTimeout is raised if the service
+        did not execute within SERVICE_CALL_LIMIT.
 
         This method will fire an event to call the service.
         This event will be picked up by this ServiceRegistry and any
@@ -647,23 +1088,35 @@ class ServiceRegistry(object):
             ATTR_SERVICE_CALL_ID: call_id,
         }
 
-        if blocking:
-            executed_event = threading.Event()
+        if not blocking and not return_result:
+            self._bus.fire(EVENT_CALL_SERVICE, event_data)
+            return
 
-            def service_executed(call):
-                """Callback method that is called when service is executed."""
-                if call.data[ATTR_SERVICE_CALL_ID] == call_id:
-                    executed_event.set()
+        future = self._pending[call_id] = ServiceCallFuture()
 
-            self._bus.listen(EVENT_SERVICE_EXECUTED, service_executed)
+        try:
+            self._bus.fire(EVENT_CALL_SERVICE, event_data)
+            executed = future.wait(SERVICE_CALL_LIMIT)
+        finally:
+            self._pending.pop(call_id, None)
 
-        self._bus.fire(EVENT_CALL_SERVICE, event_data)
+        if return_result:
+            if not executed:
+                raise ServiceCallTimeout(
+                    'Service {}.{} not executed within {} seconds'.format(
+                        domain, service, SERVICE_CALL_LIMIT))
 
-        if blocking:
-            success = executed_event.wait(SERVICE_CALL_LIMIT)
-            self._bus.remove_listener(
-                EVENT_SERVICE_EXECUTED, service_executed)
-            return success
+            if future.exception is not None:
+                raise future.exception
+
+            return future.result
+
+        if executed and future.exception is not None:
+            _LOGGER.error('Error executing service %s.%s', domain, service,
+                          exc_info=future.exception)
+            return False
+
+        return executed
 
     def _event_to_service_call(self, event):
         """Callback for SERVICE_CALLED events from the event bus."""
@@ -678,24 +1131,51 @@ class ServiceRegistry(object):
         service_handler = self._services[domain][service]
         service_call = ServiceCall(domain, service, service_data, call_id)
 
-        # Add a job to the pool that calls _execute_service
+        # Add a job to the pool that calls _execute_service, timed by the
+        # service it executes
         self._pool.add_job(JobPriority.EVENT_SERVICE,
                            (self._execute_service,
-                            (service_handler, service_call)))
+                            (service_handler, service_call)),
+                           name='service {}.{}'.format(domain, service))
 
     def _execute_service(self, service_and_call):
-        """Execute a service and fires a SERVICE_EXECUTED event."""
+        """Execute a service and fires a SERVICE_EXECUTED event.
+
+        A caller of this registry waiting for the service is handed the
+        result directly. The event is for everybody else.
+        """
         service, call = service_and_call
-        service(call)
 
-        if call.call_id is not None:
-            self._bus.fire(
-                EVENT_SERVICE_EXECUTED, {ATTR_SERVICE_CALL_ID: call.call_id})
+        try:
+            result = service(call)
+        except Exception as err:  # pylint: disable=broad-except
+            future = self._pending.pop(call.call_id, None)
+
+            # Nobody waits for the exception, let the pool log it
+            if future is None:
+                raise
+
+            future.set_exception(err)
+        else:
+            future = self._pending.pop(call.call_id, None)
+
+            if future is not None:
+                future.set_result(result)
+        finally:
+            if call.call_id is not None:
+                self._bus.fire(EVENT_SERVICE_EXECUTED,
+                               {ATTR_SERVICE_CALL_ID: call.call_id})
+
+    def _event_to_service_executed(self, event):
+        """Callback for services executed by another registry."""
+        future = self._pending.pop(event.data.get(ATTR_SERVICE_CALL_ID), None)
+
+        if future is not None:
+            future.set_result(None)
 
     def _generate_unique_id(self):
         """Generate a unique service call id."""
-        self._cur_id += 1
-        return "{}-{}".format(id(self), self._cur_id)
+        return "{}-{}".format(id(self), next(self._call_ids))
 
 
 class Config(object):
@@ -714,6 +1194,9 @@ class Config(object):
         # List of loaded components
         self.components = []
 
+        # Seconds it took to setup each loaded component
+        self.component_setup_times = {}
+
         # Remote.API object pointing at local API
         self.api = None
 
@@ -821,8 +1304,25 @@ def create_timer(hass, interval=TIMER_INTERVAL):
     hass.bus.listen_once(EVENT_HOMEASSISTANT_START, start_timer)
 
 
-def create_worker_pool(worker_count=None):
-    """Create a worker pool."""
+def _job_name(job):
+    """Return the name to record the wall time of a pool job under."""
+    func = job[0]
+    func = getattr(func, 'func', func)  # functools.partial
+    name = getattr(func, '__qualname__', None) or \
+        getattr(func, '__name__', None)
+
+    if name is None:
+        return type(func).__name__
+
+    return '{}.{}'.format(getattr(func, '__module__', None), name)
+
+
+def create_worker_pool(worker_count=None, max_worker_count=None):
+    """Create a worker pool.
+
+    Passing max_worker_count allows the pool to add workers while jobs are
+    waiting too long to be picked up.
+    """
     if worker_count is None:
         worker_count = MIN_WORKER_THREAD
 
@@ -846,4 +1346,5 @@ def create_worker_pool(worker_count=None):
             _LOGGER.warning("WorkerPool:Current job from %s: %s",
                             dt_util.as_local(start).isoformat(), job)
 
-    return util.ThreadPool(job_handler, worker_count, busy_callback)
+    return util.ThreadPool(job_handler, worker_count, busy_callback,
+                           max_worker_count, _job_name)
@@ -19,6 +19,12 @@ class NoEntitySpecifiedError(HomeAssistantError):
     pass
 
 
+class ServiceCallTimeout(HomeAssistantError):
+    """When a service is not executed within the service call limit."""
+
+    pass
+
+
 class TemplateError(HomeAssistantError):
     """Error during template rendering."""
 
@@ -1,7 +1,11 @@
 """Helpers for components that manage entities."""
-from threading import Lock
+import logging
+import time
+from collections import OrderedDict, deque
+from threading import Condition, Lock
 
 from homeassistant.bootstrap import prepare_setup_platform
+from homeassistant.core import JobPriority
 from homeassistant.components import group
 from homeassistant.const import (
     ATTR_ENTITY_ID, CONF_SCAN_INTERVAL, CONF_ENTITY_NAMESPACE,
@@ -13,6 +17,18 @@ from homeassistant.helpers.service import extract_entity_ids
 
 DEFAULT_SCAN_INTERVAL = 15
 
+# Number of entities of one platform that update at the same time
+DEFAULT_PARALLEL_UPDATES = 4
+
+# Updates running longer than this no longer count towards the parallel
+# updates of their platform
+UPDATE_TIMEOUT = 10  # seconds
+
+# Number of entities a service call commands at the same time
+DEFAULT_PARALLEL_COMMANDS = 10
+
+_LOGGER = logging.getLogger(__name__)
+
 
 class EntityComponent(object):
     """Helper class that will help a component manage its entities."""
@@ -33,6 +49,7 @@ class EntityComponent(object):
         self.entities = {}
         self.group = None
         self.is_polling = False
+        self.parallel_commands = DEFAULT_PARALLEL_COMMANDS
 
         self.config = None
         self.lock = Lock()
@@ -75,6 +92,107 @@ class EntityComponent(object):
                     in extract_entity_ids(self.hass, service)
                     if entity_id in self.entities]
 
+    def command_entities(self, entities, method, *args, **kwargs):
+        """Call a method on entities and update the polling ones after.
+
+        The entities are commanded at the same time on the I/O pool, at
+        most parallel_commands at once. An entity class can implement
+        <method>_many as a classmethod that takes the entities of that
+        class, e.g. to send one group command. It returns the entities it
+        did not command, those are commanded one by one.
+
+        Entities are updated once all commands are done, so an update does
+        not fetch the state of a device before the other commands reached
+        it.
+        """
+        by_class = OrderedDict()
+
+        for entity in entities:
+            by_class.setdefault(type(entity), []).append(entity)
+
+        commanded = []
+        jobs = []
+
+        for entity_class, class_entities in by_class.items():
+            command_many = getattr(entity_class, method + '_many', None)
+            remaining = class_entities
+
+            if command_many is not None and len(class_entities) > 1:
+                try:
+                    remaining = command_many(
+                        class_entities, *args, **kwargs) or []
+                except Exception:  # pylint: disable=broad-except
+                    self.logger.exception(
+                        'Error calling %s_many on %s', method,
+                        ', '.join(entity.entity_id for entity
+                                  in class_entities))
+                    remaining = []
+
+                commanded.extend(entity for entity in class_entities
+                                 if entity not in remaining)
+
+            jobs.extend((self._command_entity,
+                         (entity, method, args, kwargs, commanded))
+                        for entity in remaining)
+
+        self._run_jobs(jobs)
+        self._run_jobs((self._update_entity, (entity,))
+                       for entity in commanded if entity.should_poll)
+
+    def _command_entity(self, entity, method, args, kwargs, commanded):
+        """Call a method on an entity, add it to commanded if it worked."""
+        try:
+            getattr(entity, method)(*args, **kwargs)
+        except Exception:  # pylint: disable=broad-except
+            self.logger.exception('Error calling %s on %s', method,
+                                  entity.entity_id)
+            return
+
+        commanded.append(entity)
+
+    def _update_entity(self, entity):
+        """Update the state of an entity."""
+        try:
+            entity.update_ha_state(True)
+        except Exception:  # pylint: disable=broad-except
+            self.logger.exception('Error updating %s', entity.entity_id)
+
+    def _run_jobs(self, jobs):
+        """Run (func, args) jobs on the I/O pool and wait till all are done.
+
+        At most parallel_commands jobs run at the same time. The calling
+        thread runs jobs too, so they get done even if the pool is busy.
+        """
+        jobs = deque(jobs)
+        remaining = [len(jobs)]
+        all_done = Condition()
+
+        def run_jobs(_=None):
+            """Run jobs till there are none left."""
+            while True:
+                try:
+                    func, args = jobs.popleft()
+                except IndexError:
+                    return
+
+                func(*args)
+
+                with all_done:
+                    remaining[0] -= 1
+
+                    if not remaining[0]:
+                        all_done.notify_all()
+
+        for _ in range(min(self.parallel_commands, len(jobs)) - 1):
+            self.hass.io_pool.add_job(JobPriority.EVENT_SERVICE,
+                                      (run_jobs, None))
+
+        run_jobs()
+
+        with all_done:
+            while remaining[0]:
+                all_done.wait()
+
     def _setup_platform(self, platform_type, platform_config,
                         discovery_info=None):
         """Setup a platform for this component."""
@@ -89,16 +207,22 @@ class EntityComponent(object):
             CONF_SCAN_INTERVAL,
             getattr(platform, 'SCAN_INTERVAL', self.scan_interval))
         entity_namespace = platform_config.get(CONF_ENTITY_NAMESPACE)
+        parallel_updates = getattr(
+            platform, 'PARALLEL_UPDATES', DEFAULT_PARALLEL_UPDATES)
+
+        platform_name = '{}.{}'.format(self.domain, platform_type)
+        start = time.time()
 
         try:
             platform.setup_platform(
                 self.hass, platform_config,
-                EntityPlatform(self, scan_interval,
-                               entity_namespace).add_entities,
+                EntityPlatform(self, scan_interval, entity_namespace,
+                               parallel_updates).add_entities,
                 discovery_info)
 
-            self.hass.config.components.append(
-                '{}.{}'.format(self.domain, platform_type))
+            self.hass.config.component_setup_times[platform_name] = \
+                time.time() - start
+            self.hass.config.components.append(platform_name)
         except Exception:  # pylint: disable=broad-except
             self.logger.exception(
                 'Error while setting up platform %s', platform_type)
@@ -139,15 +263,25 @@ class EntityComponent(object):
 class EntityPlatform(object):
     """Keep track of entities for a single platform."""
 
-    # pylint: disable=too-few-public-methods
-    def __init__(self, component, scan_interval, entity_namespace):
+    # pylint: disable=too-few-public-methods, too-many-instance-attributes
+    def __init__(self, component, scan_interval, entity_namespace,
+                 parallel_updates=DEFAULT_PARALLEL_UPDATES):
         """Initalize the entity platform."""
         self.component = component
         self.scan_interval = scan_interval
         self.entity_namespace = entity_namespace
+        self.parallel_updates = parallel_updates
         self.platform_entities = []
         self.is_polling = False
 
+        # Entity ids waiting for or running an update. Running updates map
+        # to their start time, the ones still waiting for a slot to None.
+        self._updating = {}
+        self._update_queue = deque()
+        self._running_updates = 0
+        self._timed_out = set()
+        self._update_lock = Lock()
+
     def add_entities(self, new_entities):
         """Add entities for a single platform."""
         with self.component.lock:
@@ -169,12 +303,65 @@ class EntityPlatform(object):
                 second=range(0, 60, self.scan_interval))
 
     def _update_entity_states(self, now):
-        """Update the states of all the polling entities."""
+        """Queue updates of all the polling entities on the I/O pool."""
         with self.component.lock:
             # We copy the entities because new entities might be detected
             # during state update causing deadlocks.
             entities = list(entity for entity in self.platform_entities
                             if entity.should_poll)
 
-        for entity in entities:
+        with self._update_lock:
+            self._release_timed_out_updates()
+
+            for entity in entities:
+                if entity.entity_id in self._updating:
+                    _LOGGER.warning(
+                        'Skipping update of %s, previous update is still '
+                        'in progress', entity.entity_id)
+                    continue
+
+                self._updating[entity.entity_id] = None
+                self._update_queue.append(entity)
+
+            self._start_updates()
+
+    def _release_timed_out_updates(self):
+        """Free the slots of updates that run longer than UPDATE_TIMEOUT."""
+        deadline = time.time() - UPDATE_TIMEOUT
+
+        for entity_id, start in self._updating.items():
+            if start is None or start > deadline or \
+               entity_id in self._timed_out:
+                continue
+
+            _LOGGER.warning('Update of %s is taking over %d seconds',
+                            entity_id, UPDATE_TIMEOUT)
+            self._timed_out.add(entity_id)
+            self._running_updates -= 1
+
+    def _start_updates(self):
+        """Hand queued updates to the I/O pool while slots are free."""
+        while self._update_queue and \
+                self._running_updates < self.parallel_updates:
+            entity = self._update_queue.popleft()
+            self._updating[entity.entity_id] = time.time()
+            self._running_updates += 1
+            self.component.hass.io_pool.add_job(
+                JobPriority.EVENT_DEFAULT, (self._update_entity, entity))
+
+    def _update_entity(self, entity):
+        """Update a single entity from within an I/O worker."""
+        try:
             entity.update_ha_state(True)
+        except Exception:  # pylint: disable=broad-except
+            _LOGGER.exception('Error updating %s', entity.entity_id)
+        finally:
+            with self._update_lock:
+                del self._updating[entity.entity_id]
+
+                if entity.entity_id in self._timed_out:
+                    self._timed_out.remove(entity.entity_id)
+                else:
+                    self._running_updates -= 1
+
+                self._start_updates()
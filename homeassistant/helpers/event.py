@@ -1,9 +1,11 @@
 """Helpers for listening to events."""
+import bisect
+import calendar
 import functools as ft
+from collections import OrderedDict
 from datetime import timedelta
 
-from ..const import (
-    ATTR_NOW, EVENT_STATE_CHANGED, EVENT_TIME_CHANGED, MATCH_ALL)
+from ..const import EVENT_STATE_CHANGED, MATCH_ALL
 from ..util import dt as dt_util
 
 
@@ -14,6 +16,9 @@ def track_state_change(hass, entity_ids, action, from_state=None,
     entity_ids, from_state and to_state can be string or list.
     Use list to match multiple.
 
+    Listeners for specific entity ids are registered with
+    hass.bus.listen_state so they are only called for those entities.
+
     Returns the listener that listens on the bus for EVENT_STATE_CHANGED.
     Pass the return value into hass.bus.remove_listener to remove it.
     """
@@ -26,15 +31,13 @@ def track_state_change(hass, entity_ids, action, from_state=None,
     elif isinstance(entity_ids, str):
         entity_ids = (entity_ids.lower(),)
     else:
-        entity_ids = tuple(entity_id.lower() for entity_id in entity_ids)
+        # Each entity once, so the listener is called once per change
+        entity_ids = tuple(OrderedDict.fromkeys(
+            entity_id.lower() for entity_id in entity_ids))
 
     @ft.wraps(action)
     def state_change_listener(event):
         """The listener that listens for specific state changes."""
-        if entity_ids != MATCH_ALL and \
-           event.data.get('entity_id') not in entity_ids:
-            return
-
         if event.data.get('old_state') is not None:
             old_state = event.data['old_state'].state
         else:
@@ -50,13 +53,21 @@ def track_state_change(hass, entity_ids, action, from_state=None,
                    event.data.get('old_state'),
                    event.data.get('new_state'))
 
-    hass.bus.listen(EVENT_STATE_CHANGED, state_change_listener)
+    if entity_ids == MATCH_ALL:
+        hass.bus.listen(EVENT_STATE_CHANGED, state_change_listener)
+    else:
+        for entity_id in entity_ids:
+            hass.bus.listen_state(entity_id, state_change_listener)
 
     return state_change_listener
 
 
 def track_point_in_time(hass, action, point_in_time):
-    """Add a listener that fires once after a spefic point in time."""
+    """Add a listener that fires once after a spefic point in time.
+
+    Returns a handle that must be passed to hass.scheduler.cancel to remove
+    the listener. Passing it to hass.bus.remove_listener works too.
+    """
     utc_point_in_time = dt_util.as_utc(point_in_time)
 
     @ft.wraps(action)
@@ -68,32 +79,15 @@ def track_point_in_time(hass, action, point_in_time):
 
 
 def track_point_in_utc_time(hass, action, point_in_time):
-    """Add a listener that fires once after a specific point in UTC time."""
+    """Add a listener that fires once after a specific point in UTC time.
+
+    Returns a handle that must be passed to hass.scheduler.cancel to remove
+    the listener. Passing it to hass.bus.remove_listener works too.
+    """
     # Ensure point_in_time is UTC
     point_in_time = dt_util.as_utc(point_in_time)
 
-    @ft.wraps(action)
-    def point_in_time_listener(event):
-        """Listen for matching time_changed events."""
-        now = event.data[ATTR_NOW]
-
-        if now >= point_in_time and \
-           not hasattr(point_in_time_listener, 'run'):
-
-            # Set variable so that we will never run twice.
-            # Because the event bus might have to wait till a thread comes
-            # available to execute this listener it might occur that the
-            # listener gets lined up twice to be executed. This will make
-            # sure the second time it does nothing.
-            point_in_time_listener.run = True
-
-            hass.bus.remove_listener(EVENT_TIME_CHANGED,
-                                     point_in_time_listener)
-
-            action(now)
-
-    hass.bus.listen(EVENT_TIME_CHANGED, point_in_time_listener)
-    return point_in_time_listener
+    return hass.scheduler.schedule(point_in_time, action)
 
 
 def track_sunrise(hass, action, offset=None):
@@ -143,49 +137,24 @@ def track_sunset(hass, action, offset=None):
 # pylint: disable=too-many-arguments
 def track_utc_time_change(hass, action, year=None, month=None, day=None,
                           hour=None, minute=None, second=None, local=False):
-    """Add a listener that will fire if time matches a pattern."""
-    # We do not have to wrap the function with time pattern matching logic
-    # if no pattern given
-    if all(val is None for val in (year, month, day, hour, minute, second)):
-        @ft.wraps(action)
-        def time_change_listener(event):
-            """Fire every time event that comes in."""
-            action(event.data[ATTR_NOW])
-
-        hass.bus.listen(EVENT_TIME_CHANGED, time_change_listener)
-        return time_change_listener
-
-    pmp = _process_time_match
-    year, month, day = pmp(year), pmp(month), pmp(day)
-    hour, minute, second = pmp(hour), pmp(minute), pmp(second)
-
-    @ft.wraps(action)
-    def pattern_time_change_listener(event):
-        """Listen for matching time_changed events."""
-        now = event.data[ATTR_NOW]
-
-        if local:
-            now = dt_util.as_local(now)
-        mat = _matcher
-
-        # pylint: disable=too-many-boolean-expressions
-        if mat(now.year, year) and \
-           mat(now.month, month) and \
-           mat(now.day, day) and \
-           mat(now.hour, hour) and \
-           mat(now.minute, minute) and \
-           mat(now.second, second):
+    """Add a listener that will fire if time matches a pattern.
 
-            action(now)
+    Returns a handle that must be passed to hass.scheduler.cancel to remove
+    the listener. Passing it to hass.bus.remove_listener works too.
+    """
+    pattern = TimePattern(year, month, day, hour, minute, second)
 
-    hass.bus.listen(EVENT_TIME_CHANGED, pattern_time_change_listener)
-    return pattern_time_change_listener
+    return hass.scheduler.schedule_pattern(pattern, action, local)
 
 
 # pylint: disable=too-many-arguments
 def track_time_change(hass, action, year=None, month=None, day=None,
                       hour=None, minute=None, second=None):
-    """Add a listener that will fire if UTC time matches a pattern."""
+    """Add a listener that will fire if local time matches a pattern.
+
+    Returns a handle that must be passed to hass.scheduler.cancel to remove
+    the listener. Passing it to hass.bus.remove_listener works too.
+    """
     return track_utc_time_change(hass, action, year, month, day, hour, minute,
                                  second, local=True)
 
@@ -212,6 +181,105 @@ def _process_time_match(parameter):
         return tuple(parameter)
 
 
+# Smallest and largest value of month, day, hour, minute and second
+_TIME_FIELD_RANGES = ((1, 12), (1, 31), (0, 23), (0, 59), (0, 59))
+
+# How many years to search ahead if the year is not restricted. Covers
+# patterns that only match on leap days.
+_YEAR_SEARCH_LIMIT = 8
+
+
+class TimePattern(object):
+    """A time pattern compiled for matching and finding the next match.
+
+    Every field is either None or MATCH_ALL to match all values, a value or
+    list of values to match, or a string '/x' to match multiples of x.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, year=None, month=None, day=None, hour=None,
+                 minute=None, second=None):
+        """Compile the pattern."""
+        self._year = _process_time_match(year)
+
+        # Sorted tuples with all allowed values for month through second
+        self._values = tuple(
+            _compile_time_field(_process_time_match(parameter), low, high)
+            for parameter, (low, high)
+            in zip((month, day, hour, minute, second), _TIME_FIELD_RANGES))
+        self._sets = tuple(frozenset(values) for values in self._values)
+
+    def matches(self, dattim):
+        """Return True if dattim matches the pattern."""
+        month, day, hour, minute, second = self._sets
+
+        # pylint: disable=too-many-boolean-expressions
+        return (_matcher(dattim.year, self._year) and
+                dattim.month in month and
+                dattim.day in day and
+                dattim.hour in hour and
+                dattim.minute in minute and
+                dattim.second in second)
+
+    def next_match(self, dattim):
+        """Return the first datetime at or after dattim matching the pattern.
+
+        Microseconds are ignored. Returns None if there is no such time.
+        """
+        dattim = dattim.replace(microsecond=0)
+        start = (dattim.month, dattim.day, dattim.hour, dattim.minute,
+                 dattim.second)
+
+        if isinstance(self._year, tuple):
+            years = sorted(year for year in self._year
+                           if isinstance(year, int) and year >= dattim.year)
+        else:
+            years = range(dattim.year, dattim.year + _YEAR_SEARCH_LIMIT)
+
+        for year in years:
+            if not _matcher(year, self._year):
+                continue
+
+            fields = self._search(year, (), start if year == dattim.year
+                                  else None)
+
+            if fields is not None:
+                return dattim.replace(year, *fields)
+
+        return None
+
+    def _search(self, year, prefix, start):
+        """Find the first allowed fields after prefix at or after start."""
+        index = len(prefix)
+
+        if index == len(self._values):
+            return prefix
+
+        values = self._values[index]
+        lower = start[index] if start is not None else None
+
+        if lower is not None:
+            values = values[bisect.bisect_left(values, lower):]
+
+        for value in values:
+            if index == 1 and value > calendar.monthrange(year, prefix[0])[1]:
+                break
+
+            fields = self._search(year, prefix + (value,),
+                                  start if value == lower else None)
+
+            if fields is not None:
+                return fields
+
+        return None
+
+
+def _compile_time_field(parameter, low, high):
+    """Return a sorted tuple of the values between low and high to match."""
+    return tuple(value for value in range(low, high + 1)
+                 if _matcher(value, parameter))
+
+
 def _matcher(subject, pattern):
     """Return True if subject matches the pattern.
 
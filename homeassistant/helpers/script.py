@@ -6,7 +6,7 @@ from itertools import islice
 import voluptuous as vol
 
 import homeassistant.util.dt as date_util
-from homeassistant.const import EVENT_TIME_CHANGED, CONF_CONDITION
+from homeassistant.const import CONF_CONDITION
 from homeassistant.helpers.event import track_point_in_utc_time
 from homeassistant.helpers import service, condition, template
 import homeassistant.helpers.config_validation as cv
@@ -135,8 +135,7 @@ class Script():
     def _remove_listener(self):
         """Remove point in time listener, if any."""
         if self._delay_listener:
-            self.hass.bus.remove_listener(EVENT_TIME_CHANGED,
-                                          self._delay_listener)
+            self.hass.scheduler.cancel(self._delay_listener)
             self._delay_listener = None
 
     def _log(self, msg):
@@ -2,12 +2,16 @@
 # pylint: disable=too-few-public-methods
 import json
 import logging
+import re
+import threading
+from collections import OrderedDict
 
 import jinja2
 from jinja2.sandbox import ImmutableSandboxedEnvironment
 
 from homeassistant.components import group
-from homeassistant.const import STATE_UNKNOWN, ATTR_LATITUDE, ATTR_LONGITUDE
+from homeassistant.const import (
+    STATE_UNKNOWN, ATTR_LATITUDE, ATTR_LONGITUDE, MATCH_ALL)
 from homeassistant.core import State
 from homeassistant.exceptions import TemplateError
 from homeassistant.helpers import location as loc_helper
@@ -17,6 +21,40 @@ _LOGGER = logging.getLogger(__name__)
 _SENTINEL = object()
 DATE_STR_FORMAT = "%Y-%m-%d %H:%M:%S"
 
+# Number of compiled templates to keep
+TEMPLATE_CACHE_SIZE = 512
+
+# Ways a template can read the state of a single entity
+_RE_ENTITY_REFERENCES = (
+    re.compile(r"\bstates\.(\w+\.\w+)"),
+    re.compile(r"\b(?:states|is_state|is_state_attr)\("
+               r"\s*['\"](\w+\.\w+)['\"]"),
+)
+
+# Anything else that reads states makes a template depend on all of them
+_RE_STATE_READS = re.compile(r"\b(?:states|is_state|is_state_attr|closest|"
+                             r"distance)\b")
+
+# Number of parsed JSON values to keep, entities subscribed to the same
+# MQTT topic render their templates with the same payload
+JSON_CACHE_SIZE = 64
+
+# Templates that only look up a value, like {{ value_json.temperature }}
+_RE_VALUE_PATH = re.compile(
+    r"^\{\{\s*(value|value_json(?:\.[A-Za-z_]\w*|\[\d+\]|"
+    r"\['[^'\]]*'\]|\[\"[^\"\]]*\"\])+)\s*\}\}$")
+_RE_VALUE_PATH_PART = re.compile(
+    r"\.([A-Za-z_]\w*)|\[(\d+)\]|\['([^'\]]*)'\]|\[\"([^\"\]]*)\"\]")
+
+# Types that render the same with str() as with Jinja
+_PLAIN_TYPES = (str, int, float, bool, type(None))
+
+_COMPILED = OrderedDict()
+_COMPILED_LOCK = threading.Lock()
+_JSON = OrderedDict()
+_JSON_LOCK = threading.Lock()
+_VALUE_PATHS = {}
+
 
 def render_with_possible_json_value(hass, template, value,
                                     error_value=_SENTINEL):
@@ -24,13 +62,20 @@ def render_with_possible_json_value(hass, template, value,
 
     If valid JSON will expose value_json too.
     """
+    value_json = _parse_json(value)
+    path = _value_path(template)
+
+    if path is not None:
+        result = _lookup_value_path(path, value, value_json)
+
+        if result is not _SENTINEL:
+            return result
+
     variables = {
         'value': value
     }
-    try:
-        variables['value_json'] = json.loads(value)
-    except ValueError:
-        pass
+    if value_json is not _SENTINEL:
+        variables['value_json'] = value_json
 
     try:
         return render(hass, template, variables)
@@ -39,29 +84,199 @@ def render_with_possible_json_value(hass, template, value,
         return value if error_value is _SENTINEL else error_value
 
 
+def _parse_json(value):
+    """Return the parsed JSON value, reusing recently parsed ones.
+
+    Returns _SENTINEL if the value is not valid JSON.
+    """
+    if not isinstance(value, str):
+        return _SENTINEL
+
+    with _JSON_LOCK:
+        if value in _JSON:
+            parsed = _JSON.pop(value)
+        else:
+            try:
+                parsed = json.loads(value)
+            except ValueError:
+                parsed = _SENTINEL
+
+            if len(_JSON) >= JSON_CACHE_SIZE:
+                _JSON.popitem(last=False)
+
+        _JSON[value] = parsed
+
+    return parsed
+
+
+def _value_path(template):
+    """Return the lookups of a template that only looks up a value.
+
+    Returns None for every other template. The lookups are a list of
+    (key, is_attribute) tuples to apply to value_json.
+    """
+    try:
+        return _VALUE_PATHS[template]
+    except KeyError:
+        pass
+
+    match = _RE_VALUE_PATH.match(template)
+
+    if match is None:
+        path = None
+    elif match.group(1) == 'value':
+        path = ()
+    else:
+        path = []
+
+        for part in _RE_VALUE_PATH_PART.finditer(match.group(1)):
+            attr, index, single, double = part.groups()
+
+            if attr is not None:
+                path.append((attr, True))
+            elif index is not None:
+                path.append((int(index), False))
+            else:
+                path.append((single if single is not None else double,
+                             False))
+
+    if len(_VALUE_PATHS) >= TEMPLATE_CACHE_SIZE:
+        _VALUE_PATHS.clear()
+
+    _VALUE_PATHS[template] = path
+    return path
+
+
+def _lookup_value_path(path, value, value_json):
+    """Look up a value path the way Jinja would render it.
+
+    Returns _SENTINEL if the template has to be rendered by Jinja, like
+    when a key is missing or the result is not a plain value.
+    """
+    if not path:
+        result = value
+    elif value_json is _SENTINEL:
+        return _SENTINEL
+    else:
+        result = value_json
+
+        for key, is_attribute in path:
+            # Jinja looks up attributes before items, dict.items and
+            # friends have to go through Jinja
+            if isinstance(result, dict):
+                if key not in result or \
+                        (is_attribute and hasattr(result, key)):
+                    return _SENTINEL
+            elif not isinstance(result, list) or is_attribute or \
+                    not isinstance(key, int) or key >= len(result):
+                return _SENTINEL
+
+            result = result[key]
+
+    if not isinstance(result, _PLAIN_TYPES):
+        return _SENTINEL
+
+    return str(result).strip()
+
+
 def render(hass, template, variables=None, **kwargs):
     """Render given template."""
-    if variables is not None:
-        kwargs.update(variables)
+    return Template(template, hass).render(variables, **kwargs)
+
+
+def extract_entities(template):
+    """Return the entity ids a template reads the state of.
+
+    Returns MATCH_ALL if the template can read states that can not be
+    determined without rendering it, like iterating over states, or if it
+    does not read any state and might depend on the time instead.
+    """
+    entity_ids = set()
+    references = 0
+
+    for regex in _RE_ENTITY_REFERENCES:
+        for match in regex.finditer(template):
+            entity_ids.add(match.group(1).lower())
+            references += 1
+
+    if not entity_ids or len(_RE_STATE_READS.findall(template)) > references:
+        return MATCH_ALL
+
+    return sorted(entity_ids)
+
+
+def compile_template(template):
+    """Return the compiled template, reusing recently compiled ones."""
+    with _COMPILED_LOCK:
+        compiled = _COMPILED.pop(template, None)
+
+        if compiled is None:
+            try:
+                compiled = ENV.from_string(template)
+            except jinja2.TemplateError as err:
+                raise TemplateError(err)
 
+            if len(_COMPILED) >= TEMPLATE_CACHE_SIZE:
+                _COMPILED.popitem(last=False)
+
+        _COMPILED[template] = compiled
+
+    return compiled
+
+
+class Template(object):
+    """A template string that renders with Home Assistant data.
+
+    Keep the object around to render the same template repeatedly, it
+    holds on to the globals that do not change between renders.
+    """
+
+    def __init__(self, template, hass):
+        """Initialize the template."""
+        self.template = template
+        self.hass = hass
+        self._globals = None
+
+    def extract_entities(self):
+        """Return the entity ids the template reads, or MATCH_ALL."""
+        return extract_entities(self.template)
+
+    def render(self, variables=None, **kwargs):
+        """Render the template."""
+        if variables is not None:
+            kwargs.update(variables)
+
+        compiled = compile_template(self.template)
+
+        if self._globals is None:
+            self._globals = _template_globals(self.hass)
+
+        context = dict(self._globals)
+        utcnow = dt_util.utcnow()
+        context['now'] = dt_util.as_local(utcnow)
+        context['utcnow'] = utcnow
+        context.update(kwargs)
+
+        try:
+            return compiled.render(context).strip()
+        except jinja2.TemplateError as err:
+            raise TemplateError(err)
+
+
+def _template_globals(hass):
+    """Return the globals that do not change between renders."""
     location_methods = LocationMethods(hass)
-    utcnow = dt_util.utcnow()
 
-    try:
-        return ENV.from_string(template, {
-            'closest': location_methods.closest,
-            'distance': location_methods.distance,
-            'float': forgiving_float,
-            'is_state': hass.states.is_state,
-            'is_state_attr': hass.states.is_state_attr,
-            'now': dt_util.as_local(utcnow),
-            'states': AllStates(hass),
-            'utcnow': utcnow,
-            'as_timestamp': dt_util.as_timestamp,
-            'relative_time': dt_util.get_age
-        }).render(kwargs).strip()
-    except jinja2.TemplateError as err:
-        raise TemplateError(err)
+    return {
+        'closest': location_methods.closest,
+        'distance': location_methods.distance,
+        'float': forgiving_float,
+        'is_state': hass.states.is_state,
+        'is_state_attr': hass.states.is_state_attr,
+        'states': AllStates(hass),
+        'as_timestamp': dt_util.as_timestamp,
+        'relative_time': dt_util.get_age
+    }
 
 
 class AllStates(object):
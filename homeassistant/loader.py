@@ -11,14 +11,15 @@ is checked to see if it contains a user provided version. If not available it
 will check the built-in components and platforms.
 """
 from future.utils import PY3
+import ast
 import importlib
+import json
 import logging
 import os
-import pkgutil
 import sys
 
 from homeassistant.const import PLATFORM_FORMAT
-from homeassistant.util import OrderedSet
+from homeassistant.util import OrderedSet, profile
 
 PREPARED = False
 
@@ -28,21 +29,35 @@ AVAILABLE_COMPONENTS = []
 # Dict of loaded components mapped name => module
 _COMPONENT_CACHE = {}
 
+# File in the config dir that caches what is known about the components
+MANIFEST_FILE = '.component_manifest.json'
+MANIFEST_VERSION = 1
+
+# Dict of available components mapped module path => manifest entry
+_MANIFEST = {}
+
 _LOGGER = logging.getLogger(__name__)
 
 
 def prepare(hass):
-    """Prepare the loading of components."""
+    """Prepare the loading of components.
+
+    The available components are read from the component manifest in the
+    config dir. Only the components whose files changed since the manifest
+    was written are scanned again.
+    """
     global PREPARED  # pylint: disable=global-statement
 
     # Load the built-in components
     import homeassistant.components as components
 
-    del AVAILABLE_COMPONENTS[:]
+    manifest_path = hass.config.path(MANIFEST_FILE)
+    manifest = _load_manifest(manifest_path)
+    dirs = {}
 
-    AVAILABLE_COMPONENTS.extend(
-        item[1] for item in
-        pkgutil.iter_modules(components.__path__, 'homeassistant.components.'))
+    for path in components.__path__:
+        dirs[path] = _scan_dir(
+            manifest, path, 'homeassistant.components.', False)
 
     # Look for available custom components
     custom_path = hass.config.path("custom_components")
@@ -55,23 +70,189 @@ def prepare(hass):
         # custom components might only contain a platform for a component.
         # ie custom_components/switch/some_platform.py. Using pkgutil would
         # not give us the switch component (and neither should it).
+        dirs[custom_path] = _scan_dir(
+            manifest, custom_path, 'custom_components.', True)
 
-        # Assumption: the custom_components dir only contains directories or
-        # python components. If this assumption is not true, HA won't break,
-        # just might output more errors.
-        for fil in os.listdir(custom_path):
-            if fil == '__pycache__':
-                continue
-            elif os.path.isdir(os.path.join(custom_path, fil)):
-                AVAILABLE_COMPONENTS.append('custom_components.{}'.format(fil))
-            else:
-                # For files we will strip out .py extension
-                AVAILABLE_COMPONENTS.append(
-                    'custom_components.{}'.format(fil[0:-3]))
+    _MANIFEST.clear()
+    for entries in dirs.values():
+        _MANIFEST.update(entries['components'])
+
+    del AVAILABLE_COMPONENTS[:]
+    AVAILABLE_COMPONENTS.extend(
+        name for path in dirs for name in sorted(dirs[path]['components']))
+
+    if dirs != manifest['dirs']:
+        _save_manifest(manifest_path, dirs)
 
     PREPARED = True
 
 
+def _load_manifest(manifest_path):
+    """Load the component manifest or return an empty one."""
+    try:
+        with open(manifest_path) as fil:
+            manifest = json.load(fil)
+    except (OSError, IOError, ValueError):
+        manifest = None
+
+    if not isinstance(manifest, dict) or \
+       manifest.get('version') != MANIFEST_VERSION:
+        return {'version': MANIFEST_VERSION, 'dirs': {}}
+
+    return manifest
+
+
+def _save_manifest(manifest_path, dirs):
+    """Write the component manifest to the config dir."""
+    try:
+        with open(manifest_path, 'w') as fil:
+            json.dump({'version': MANIFEST_VERSION, 'dirs': dirs}, fil,
+                      sort_keys=True)
+    except (OSError, IOError):
+        _LOGGER.warning('Unable to write component manifest %s',
+                        manifest_path)
+
+
+def _scan_dir(manifest, path, prefix, custom):
+    """Return the manifest of a directory holding components.
+
+    Entries are reused as long as the directory and the files of the
+    component did not change.
+    """
+    cached = manifest['dirs'].get(path, {})
+    cached_components = cached.get('components', {})
+    mtime = _mtime(path)
+
+    if cached.get('mtime') == mtime:
+        names = [name[len(prefix):] for name in cached_components]
+    else:
+        names = _list_components(path, custom)
+
+    found = {}
+
+    for name in names:
+        entry = cached_components.get(prefix + name)
+
+        if entry is None or _entry_changed(entry):
+            entry = _scan_component(os.path.join(path, name))
+
+        if entry is not None:
+            found[prefix + name] = entry
+
+    return {'mtime': mtime, 'components': found}
+
+
+def _list_components(path, custom):
+    """List the names of the components in a directory."""
+    names = []
+
+    for fil in os.listdir(path):
+        full_path = os.path.join(path, fil)
+
+        if fil == '__pycache__':
+            continue
+        elif os.path.isdir(full_path):
+            # Built-in components have to be packages. Assumption: the
+            # custom_components dir only contains directories or python
+            # components. If this assumption is not true, HA won't break,
+            # just might output more errors.
+            if custom or os.path.isfile(os.path.join(full_path,
+                                                     '__init__.py')):
+                names.append(fil)
+        elif custom:
+            # For files we will strip out .py extension
+            names.append(fil[0:-3])
+        elif fil.endswith('.py') and fil != '__init__.py':
+            names.append(fil[0:-3])
+
+    return names
+
+
+def _mtime(path):
+    """Return the modification time of a path or None if missing."""
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+def _entry_changed(entry):
+    """Return if the files of a manifest entry changed."""
+    if entry['path'] is not None and _mtime(entry['path']) != entry['mtime']:
+        return True
+
+    return entry['dir'] is not None and \
+        _mtime(entry['dir']) != entry['dir_mtime']
+
+
+def _scan_component(path):
+    """Return the manifest entry of the component at path.
+
+    The dependencies and requirements are read from the source without
+    importing it. They are None if they are not plain lists.
+    """
+    if os.path.isdir(path):
+        component_dir = path
+        source_path = os.path.join(path, '__init__.py')
+        platforms = sorted(
+            fil[0:-3] if fil.endswith('.py') else fil
+            for fil in os.listdir(path)
+            if fil != '__init__.py' and fil != '__pycache__' and
+            (fil.endswith('.py') or
+             os.path.isfile(os.path.join(path, fil, '__init__.py'))))
+    else:
+        component_dir = None
+        source_path = path + '.py'
+        platforms = None
+
+    entry = {
+        'path': source_path,
+        'mtime': _mtime(source_path),
+        'dir': component_dir,
+        'dir_mtime': component_dir and _mtime(component_dir),
+        'dependencies': [],
+        'requirements': [],
+        'platforms': platforms,
+    }
+
+    if entry['mtime'] is None:
+        # Directory without __init__.py, only holds platforms
+        if component_dir is None:
+            return None
+
+        entry['path'] = entry['dependencies'] = entry['requirements'] = None
+        return entry
+
+    try:
+        with open(source_path, 'rb') as fil:
+            tree = ast.parse(fil.read(), source_path)
+    except (SyntaxError, ValueError, OSError, IOError):
+        # Importing it will report the error
+        entry['dependencies'] = entry['requirements'] = None
+        return entry
+
+    for node in tree.body:
+        if not isinstance(node, ast.Assign) or len(node.targets) != 1 or \
+           not isinstance(node.targets[0], ast.Name):
+            continue
+
+        key = {'DEPENDENCIES': 'dependencies',
+               'REQUIREMENTS': 'requirements'}.get(node.targets[0].id)
+
+        if key is None:
+            continue
+
+        try:
+            value = ast.literal_eval(node.value)
+        except (TypeError, ValueError):
+            value = None
+
+        entry[key] = list(value) if isinstance(value, (list, tuple)) \
+            else None
+
+    return entry
+
+
 def set_component(comp_name, component):
     """Set a component in the cache."""
     _check_prepared()
@@ -103,21 +284,10 @@ def get_component(comp_name):
     # We do not want to silent the ImportErrors as they provide valuable
     # information to track down when debugging Home Assistant.
 
-    # First check custom, then built-in
-    potential_paths = ['custom_components.{}'.format(comp_name),
-                       'homeassistant.components.{}'.format(comp_name)]
-
-    for path in potential_paths:
-        # Validate here that root component exists
-        # If path contains a '.' we are specifying a sub-component
-        # Using rsplit we get the parent component from sub-component
-        root_comp = path.rsplit(".", 1)[0] if '.' in comp_name else path
-
-        if root_comp not in AVAILABLE_COMPONENTS:
-            continue
-
+    for path in _potential_paths(comp_name):
         try:
-            module = importlib.import_module(path)
+            with profile.timed('import', comp_name):
+                module = importlib.import_module(path)
 
             # In Python 3 you can import files from directories that do not
             # contain the file __init__.py. A directory is a valid module if
@@ -149,6 +319,66 @@ def get_component(comp_name):
     return None
 
 
+def _potential_paths(comp_name):
+    """Return the module paths comp_name can be imported from.
+
+    Checks custom first, then built-in. Paths the manifest knows cannot
+    hold the component or platform are left out.
+    """
+    paths = []
+
+    for path in ('custom_components.{}'.format(comp_name),
+                 'homeassistant.components.{}'.format(comp_name)):
+        # Validate here that root component exists
+        # If path contains a '.' we are specifying a sub-component
+        # Using rsplit we get the parent component from sub-component
+        root_comp = path.rsplit(".", 1)[0] if '.' in comp_name else path
+
+        if root_comp not in AVAILABLE_COMPONENTS:
+            continue
+
+        entry = _MANIFEST.get(root_comp)
+
+        if entry is not None:
+            if '.' in comp_name:
+                platforms = entry['platforms']
+
+                if platforms is not None and \
+                   comp_name.split('.', 1)[1] not in platforms:
+                    continue
+
+            # Directory without __init__.py only holds platforms
+            elif entry['dir'] is not None and entry['path'] is None:
+                continue
+
+        paths.append(path)
+
+    return paths
+
+
+def get_dependencies(comp_name):
+    """Return the dependencies of a component or None if not found.
+
+    Reads them from the component manifest if possible so the component
+    does not have to be imported yet.
+    """
+    if comp_name not in _COMPONENT_CACHE:
+        _check_prepared()
+
+        paths = _potential_paths(comp_name)
+        entry = _MANIFEST.get(paths[0]) if paths else None
+
+        if entry is not None and entry['dependencies'] is not None:
+            return entry['dependencies']
+
+    component = get_component(comp_name)
+
+    if component is None:
+        return None
+
+    return getattr(component, 'DEPENDENCIES', [])
+
+
 def load_order_components(components):
     """Take in a list of components we want to load.
 
@@ -190,15 +420,15 @@ def load_order_component(comp_name):
 
 def _load_order_component(comp_name, load_order, loading):
     """Recursive function to get load order of components."""
-    component = get_component(comp_name)
+    dependencies = get_dependencies(comp_name)
 
     # If None it does not exist, error already thrown by get_component.
-    if component is None:
+    if dependencies is None:
         return OrderedSet()
 
     loading.add(comp_name)
 
-    for dependency in getattr(component, 'DEPENDENCIES', []):
+    for dependency in dependencies:
         # Check not already loaded
         if dependency in load_order:
             continue
@@ -14,13 +14,15 @@ import logging
 import time
 import threading
 
+from future.moves import queue
 from future.moves.urllib.parse import urljoin
 import requests
 
 import homeassistant.bootstrap as bootstrap
 import homeassistant.core as ha
 from homeassistant.const import (
-    HTTP_HEADER_HA_AUTH, SERVER_PORT, URL_API, URL_API_EVENT_FORWARD,
+    HTTP_HEADER_HA_AUTH, SERVER_PORT, URL_API, URL_API_EVENT_BATCH,
+    URL_API_EVENT_FORWARD,
     URL_API_EVENTS, URL_API_EVENTS_EVENT, URL_API_SERVICES,
     URL_API_SERVICES_SERVICE, URL_API_STATES, URL_API_STATES_ENTITY,
     HTTP_HEADER_CONTENT_TYPE, CONTENT_TYPE_JSON)
@@ -30,6 +32,11 @@ METHOD_GET = "get"
 METHOD_POST = "post"
 METHOD_DELETE = "delete"
 
+# Number of events waiting to be forwarded to a target before new events
+# are dropped, and the number of events sent in one request
+FORWARD_QUEUE_SIZE = 1000
+FORWARD_BATCH_SIZE = 100
+
 _LOGGER = logging.getLogger(__name__)
 
 
@@ -61,6 +68,8 @@ class API(object):
         else:
             self.base_url = "http://{}:{}".format(host, self.port)
         self.status = None
+        # Reuse connections to the API between calls
+        self._session = requests.Session()
         self._headers = {
             HTTP_HEADER_CONTENT_TYPE: CONTENT_TYPE_JSON,
         }
@@ -75,19 +84,24 @@ class API(object):
 
         return self.status == APIStatus.OK
 
-    def __call__(self, method, path, data=None):
-        """Make a call to the Home Assistant API."""
+    def __call__(self, method, path, data=None, session=None):
+        """Make a call to the Home Assistant API.
+
+        session is the requests session to use instead of the one shared by
+        the callers of this API.
+        """
         if data is not None:
             data = json.dumps(data, cls=JSONEncoder)
 
         url = urljoin(self.base_url, path)
+        session = session or self._session
 
         try:
             if method == METHOD_GET:
-                return requests.get(
+                return session.get(
                     url, params=data, timeout=5, headers=self._headers)
             else:
-                return requests.request(
+                return session.request(
                     method, url, data=data, timeout=5, headers=self._headers)
 
         except requests.exceptions.ConnectionError:
@@ -119,10 +133,13 @@ class HomeAssistant(ha.HomeAssistant):
         self.remote_api = remote_api
 
         self.pool = pool = ha.create_worker_pool()
+        self.io_pool = ha.create_worker_pool(
+            ha.IO_WORKER_THREAD, max_worker_count=ha.MAX_IO_WORKER_THREAD)
 
         self.bus = EventBus(remote_api, pool)
         self.services = ha.ServiceRegistry(self.bus, pool)
         self.states = StateMachine(self.bus, self.remote_api)
+        self.scheduler = ha.Scheduler(self.bus, pool)
         self.config = ha.Config()
         self.state = ha.CoreState.not_running
 
@@ -164,6 +181,7 @@ class HomeAssistant(ha.HomeAssistant):
                       origin=ha.EventOrigin.remote)
 
         self.pool.stop()
+        self.io_pool.stop()
 
         # Disconnect master event forwarding
         disconnect_remote_events(self.remote_api, self.config.api)
@@ -220,32 +238,187 @@ class EventForwarder(object):
 
             key = (api.host, api.port)
 
-            self._targets[key] = api
+            old_target = self._targets.get(key)
+            if old_target is not None:
+                old_target.stop()
+
+            self._targets[key] = ForwardTarget(api)
 
     def disconnect(self, api):
         """Remove target from being forwarded to."""
         with self._lock:
             key = (api.host, api.port)
 
-            did_remove = self._targets.pop(key, None) is None
+            target = self._targets.pop(key, None)
+            if target is not None:
+                target.stop()
 
             if len(self._targets) == 0:
                 # Remove event listener if no forwarding targets present
                 self.hass.bus.remove_listener(ha.MATCH_ALL,
                                               self._event_listener)
 
-            return did_remove
+            return target is not None
+
+    def block_till_done(self):
+        """Block till the queued events are forwarded to every target."""
+        with self._lock:
+            targets = list(self._targets.values())
+
+        for target in targets:
+            target.block_till_done()
+
+    def as_dict(self):
+        """Return the forwarding metrics per target."""
+        with self._lock:
+            return {'{}:{}'.format(*key): target.as_dict()
+                    for key, target in self._targets.items()}
 
     def _event_listener(self, event):
-        """Listen and forward all events."""
+        """Listen and queue all events for the targets."""
+        # We don't forward time events or, if enabled, non-local events
+        if event.event_type == ha.EVENT_TIME_CHANGED or \
+           (self.restrict_origin and event.origin != self.restrict_origin):
+            return
+
         with self._lock:
-            # We don't forward time events or, if enabled, non-local events
-            if event.event_type == ha.EVENT_TIME_CHANGED or \
-               (self.restrict_origin and event.origin != self.restrict_origin):
+            targets = list(self._targets.values())
+
+        for target in targets:
+            target.put(event)
+
+
+class ForwardTarget(object):
+    """Forward events to an API in batches from a thread of its own.
+
+    Events are dropped when the API can not keep up and the queue is full,
+    so a slow target can not slow down the instance forwarding to it.
+    """
+
+    def __init__(self, api):
+        """Initialize the target and start forwarding."""
+        self.api = api
+        self.sent = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_batch_seconds = None
+        # Targets running an older version can only receive single events
+        self.batch_supported = True
+        # The forwarding thread does not share connections with other callers
+        self._session = requests.Session()
+        self._queue = queue.Queue(FORWARD_QUEUE_SIZE)
+        self._stopped = False
+
+        thread = threading.Thread(
+            target=self._forward_events,
+            name='EventForwarder {}:{}'.format(api.host, api.port))
+        thread.daemon = True
+        thread.start()
+
+    def put(self, event):
+        """Queue an event, drop it if the queue is full."""
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            if self.dropped % FORWARD_QUEUE_SIZE == 0:
+                _LOGGER.warning(
+                    'Dropping events for %s:%s, it is not keeping up',
+                    self.api.host, self.api.port)
+            self.dropped += 1
+
+    def stop(self):
+        """Stop forwarding, events still in the queue are dropped."""
+        self._stopped = True
+
+        # Wake up the thread if it is waiting for events
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass
+
+    def block_till_done(self):
+        """Block till the queued events are forwarded."""
+        self._queue.join()
+
+    def as_dict(self):
+        """Return the forwarding metrics."""
+        return {
+            'queued': self._queue.qsize(),
+            'max_queued': FORWARD_QUEUE_SIZE,
+            'sent': self.sent,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'batches': self.batches,
+            'last_batch_seconds': self.last_batch_seconds,
+        }
+
+    def _forward_events(self):
+        """Send the queued events until stopped."""
+        while True:
+            events = [self._queue.get()]
+
+            while len(events) < FORWARD_BATCH_SIZE:
+                try:
+                    events.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            if not self._stopped:
+                self._send(events)
+
+            for _ in events:
+                self._queue.task_done()
+
+            if self._stopped:
+                self._session.close()
+                return
+
+    def _send(self, events):
+        """Send a batch of events to the API."""
+        if self.batch_supported:
+            start = time.time()
+
+            try:
+                req = self.api(METHOD_POST, URL_API_EVENT_BATCH, [
+                    {'event_type': event.event_type,
+                     'event_data': event.data} for event in events],
+                               session=self._session)
+            except HomeAssistantError:
+                self.failed += len(events)
+                return
+
+            if req.status_code == 200:
+                self.sent += len(events)
+                self.batches += 1
+                self.last_batch_seconds = round(time.time() - start, 3)
+                return
+
+            if req.status_code != 404:
+                _LOGGER.error("Error firing events: %d - %s",
+                              req.status_code, req.text)
+                self.failed += len(events)
                 return
 
-            for api in self._targets.values():
-                fire_event(api, event.event_type, event.data)
+            _LOGGER.info('%s:%s does not support firing events in batches',
+                         self.api.host, self.api.port)
+            self.batch_supported = False
+
+        for event in events:
+            try:
+                req = self.api(
+                    METHOD_POST, URL_API_EVENTS_EVENT.format(event.event_type),
+                    event.data, session=self._session)
+            except HomeAssistantError:
+                self.failed += 1
+                continue
+
+            if req.status_code == 200:
+                self.sent += 1
+            else:
+                _LOGGER.error("Error firing event: %d - %s",
+                              req.status_code, req.text)
+                self.failed += 1
 
 
 class StateMachine(ha.StateMachine):
@@ -255,6 +428,9 @@ class StateMachine(ha.StateMachine):
         """Initalize the statemachine."""
         super(StateMachine, self).__init__(None)
         self._api = api
+        # Revision of the remote state machine we last synced with, as
+        # <run id>:<revision>. None until the first sync.
+        self.remote_revision = None
         self.mirror()
 
         bus.listen(ha.EVENT_STATE_CHANGED, self._state_changed_listener)
@@ -271,9 +447,29 @@ class StateMachine(ha.StateMachine):
         set_state(self._api, entity_id, new_state, attributes, force_update)
 
     def mirror(self):
-        """Discard current data and mirrors the remote state machine."""
-        self._states = {state.entity_id: state for state
-                        in get_states(self._api)}
+        """Sync the states that changed since the last sync.
+
+        Falls back to copying all states if the remote state machine does
+        not know the changes since then.
+        """
+        changes = get_state_changes(self._api, self.remote_revision)
+
+        if changes is None:
+            self._states = {state.entity_id: state for state
+                            in get_states(self._api)}
+            return
+
+        self.remote_revision, full, states, removed = changes
+
+        if full:
+            self._states = {state.entity_id: state for state in states}
+            return
+
+        for state in states:
+            self._states[state.entity_id] = state
+
+        for entity_id in removed:
+            self._states.pop(entity_id, None)
 
     def _state_changed_listener(self, event):
         """Listen for state changed events and applies them."""
@@ -310,6 +506,30 @@ class JSONEncoder(json.JSONEncoder):
                 return json.JSONEncoder.default(self, obj)
 
 
+def json_dumps(obj):
+    """Serialize obj to JSON with sorted keys.
+
+    States, lists of states and dicts holding them use the JSON each State
+    keeps, instead of serializing the states again.
+    """
+    if isinstance(obj, ha.State):
+        return obj.as_json()
+
+    elif isinstance(obj, (list, tuple)) and obj and \
+            all(isinstance(item, ha.State) for item in obj):
+        return '[{}]'.format(', '.join(item.as_json() for item in obj))
+
+    elif isinstance(obj, dict) and \
+            all(isinstance(key, str) for key in obj) and \
+            any(isinstance(value, (ha.State, list, tuple))
+                for value in obj.values()):
+        return '{{{}}}'.format(', '.join(
+            '{}: {}'.format(json.dumps(key), json_dumps(value))
+            for key, value in sorted(obj.items())))
+
+    return json.dumps(obj, sort_keys=True, cls=JSONEncoder)
+
+
 def validate_api(api):
     """Make a call to validate API."""
     try:
@@ -437,6 +657,34 @@ def get_states(api):
         return []
 
 
+def get_state_changes(api, since=None):
+    """Query given API for the states that changed since a revision.
+
+    Returns a tuple of the revision, if all states were returned, the
+    states and the removed entity ids. Pass since None to get all states
+    and the revision to sync from. Returns None if the API does not
+    support revisions or on error.
+    """
+    try:
+        req = api(METHOD_GET, '{}?since={}'.format(
+            URL_API_STATES, '' if since is None else since))
+
+        data = req.json()
+
+        if not isinstance(data, dict):
+            return None
+
+        return (data['revision'], data['full'],
+                [ha.State.from_dict(item) for item in data['states']],
+                data['removed'])
+
+    except (HomeAssistantError, ValueError, AttributeError, KeyError):
+        # ValueError if req.json() can't parse the json
+        _LOGGER.exception("Error fetching state changes")
+
+        return None
+
+
 def remove_state(api, entity_id):
     """Call API to remove state for entity_id.
 
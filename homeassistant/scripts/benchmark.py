@@ -0,0 +1,655 @@
+"""Script to run benchmarks."""
+import argparse
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import homeassistant.core as core
+from homeassistant.const import (
+    ATTR_NOW, EVENT_STATE_CHANGED, EVENT_TIME_CHANGED, MATCH_ALL)
+from homeassistant.helpers.event import TimePattern
+
+BENCHMARKS = {}
+
+
+def run(args):
+    """Handle benchmark commandline script."""
+    parser = argparse.ArgumentParser(
+        description=("Run a Home Assistant benchmark."))
+    parser.add_argument('name', choices=sorted(BENCHMARKS))
+
+    args = parser.parse_args(args)
+
+    # Keep the pool from logging that it is busy
+    logging.basicConfig(level=logging.ERROR)
+
+    bench = BENCHMARKS[args.name]
+    print('Using', bench.__name__)
+
+    for name, value in bench():
+        print('{}: {}'.format(name, value))
+
+    return 0
+
+
+def benchmark(func):
+    """Decorator to mark a benchmark."""
+    BENCHMARKS[func.__name__] = func
+    return func
+
+
+@benchmark
+def fire_events(event_count=2000, listener_count=60):
+    """Fire state changed events at a bus with many listeners.
+
+    Compares one pool job per listener with one pool job per event.
+    """
+    for dispatch_per_event in (False, True):
+        pool = core.create_worker_pool()
+        bus = core.EventBus(pool, dispatch_per_event=dispatch_per_event)
+
+        for idx in range(listener_count):
+            bus.listen(MATCH_ALL if idx % 2 else EVENT_STATE_CHANGED,
+                       lambda event: None)
+
+        start = time.time()
+
+        for _ in range(event_count):
+            bus.fire(EVENT_STATE_CHANGED, {'entity_id': 'light.kitchen'})
+
+        pool.block_till_done()
+        elapsed = time.time() - start
+        pool.stop()
+
+        mode = 'per event' if dispatch_per_event else 'per listener'
+        yield 'events/sec ({})'.format(mode), int(event_count / elapsed)
+
+
+@benchmark
+def time_pattern_ticks(tick_count=3600):
+    """Measure the cost of a time tick with many time pattern listeners."""
+    start_time = datetime(2016, 1, 1, 12, 0, 0)
+
+    for listener_count in (10, 1000, 10000):
+        pool = core.create_worker_pool()
+        scheduler = core.Scheduler(core.EventBus(pool), pool)
+
+        for idx in range(listener_count):
+            scheduler.schedule_pattern(
+                TimePattern(minute=idx % 60, second=0), lambda now: None)
+
+        ticks = [core.Event(EVENT_TIME_CHANGED,
+                            {ATTR_NOW: start_time + timedelta(seconds=sec)})
+                 for sec in range(tick_count)]
+
+        # The first tick calculates the next match of every pattern
+        # pylint: disable=protected-access
+        scheduler._time_changed_listener(ticks[0])
+
+        start = time.time()
+
+        for event in ticks[1:]:
+            scheduler._time_changed_listener(event)
+
+        elapsed = time.time() - start
+        pool.stop()
+
+        yield ('usec/tick ({} listeners)'.format(listener_count),
+               round(elapsed / (tick_count - 1) * 1000000, 1))
+
+
+@benchmark
+def history_period(row_count=2000000, entity_count=500):
+    """Query a day of history from a week long SQLite database.
+
+    Compares building state objects for every row with streaming the JSON.
+    """
+    from homeassistant.components import history, recorder
+    from homeassistant.remote import JSONEncoder
+    import homeassistant.util.dt as dt_util
+
+    tmp_dir = tempfile.mkdtemp()
+    hass = core.HomeAssistant()
+
+    try:
+        recorder.setup(hass, {recorder.DOMAIN: {
+            recorder.CONF_DB_URL: 'sqlite:///{}'.format(
+                os.path.join(tmp_dir, 'history.db'))}})
+        hass.start()
+        recorder._INSTANCE.block_till_db_ready()
+
+        end = recorder._INSTANCE.recording_start - timedelta(minutes=1)
+        start = end - timedelta(days=7)
+        step = (end - start) / row_count
+        engine = recorder._INSTANCE.engine
+        states_table = recorder.get_model('States').__table__
+
+        engine.execute(recorder.get_model('RecorderRuns').__table__.insert(),
+                       start=start - timedelta(hours=1), end=end,
+                       created=start)
+
+        rows = []
+
+        for idx in range(row_count):
+            entity_idx = idx % entity_count
+            domain = 'thermostat' if entity_idx % 10 == 0 else 'sensor'
+            timestamp = start + step * idx
+            rows.append({
+                'domain': domain,
+                'entity_id': '{}.entity_{}'.format(domain, entity_idx),
+                'state': str(idx // entity_count % 100),
+                'attributes': json.dumps({
+                    'friendly_name': 'Entity {}'.format(entity_idx),
+                    'unit_of_measurement': 'W'}),
+                'last_changed': timestamp,
+                'last_updated': timestamp,
+                'created': timestamp,
+            })
+
+            if len(rows) == 50000:
+                engine.execute(states_table.insert(), rows)
+                rows = []
+
+        if rows:
+            engine.execute(states_table.insert(), rows)
+
+        yield 'rows in database', row_count
+
+        start_time = dt_util.as_utc(end - timedelta(days=1))
+        end_time = dt_util.as_utc(end)
+
+        timer = time.time()
+        result = json.dumps(list(history.get_significant_states(
+            start_time, end_time).values()), cls=JSONEncoder)
+        yield 'seconds (state objects)', round(time.time() - timer, 2)
+        yield 'response bytes', len(result)
+        result = None
+
+        timer = time.time()
+        size = sum(len(chunk) for chunk in
+                   history.stream_significant_states_json(
+                       start_time, end_time))
+        yield 'seconds (streaming)', round(time.time() - timer, 2)
+        yield 'response bytes', size
+
+    finally:
+        hass.stop()
+        shutil.rmtree(tmp_dir)
+
+
+@benchmark
+def template_render(render_count=20000):
+    """Render a template sensor style template over and over.
+
+    Compares compiling the template on every render with reusing it.
+    """
+    from homeassistant.helpers import template
+
+    hass = core.HomeAssistant()
+    tpl = ('{% if is_state("switch.kitchen", "on") %}'
+           '{{ states.sensor.temperature.state | float + 1 }}'
+           '{% else %}off{% endif %}')
+
+    try:
+        hass.states.set('switch.kitchen', 'on')
+        hass.states.set('sensor.temperature', '21.5')
+
+        start = time.time()
+
+        for _ in range(render_count):
+            template.ENV.from_string(tpl, {
+                'is_state': hass.states.is_state,
+                'states': template.AllStates(hass),
+                'float': template.forgiving_float,
+            }).render().strip()
+
+        yield 'renders/sec (compile every time)', int(
+            render_count / (time.time() - start))
+
+        compiled = template.Template(tpl, hass)
+        start = time.time()
+
+        for _ in range(render_count):
+            compiled.render()
+
+        yield 'renders/sec (cached)', int(render_count / (time.time() - start))
+
+    finally:
+        hass.stop()
+
+
+@benchmark
+def json_value_templates(message_count=5000, entity_count=5):
+    """Render value templates for MQTT messages with a JSON payload.
+
+    Every message is rendered by several entities subscribed to its topic.
+    """
+    from homeassistant.helpers import template
+
+    hass = core.HomeAssistant()
+    templates = ['{{{{ value_json.sensor_{}.value }}}}'.format(idx)
+                 for idx in range(entity_count)]
+    payloads = [json.dumps({'sensor_{}'.format(idx): {'value': msg + idx}
+                            for idx in range(entity_count)})
+                for msg in range(message_count)]
+
+    try:
+        start = time.time()
+
+        for payload in payloads:
+            for tpl in templates:
+                template.render(hass, tpl, {
+                    'value': payload, 'value_json': json.loads(payload)})
+
+        yield 'messages/sec (Jinja)', int(
+            message_count / (time.time() - start))
+
+        start = time.time()
+
+        for payload in payloads:
+            for tpl in templates:
+                template.render_with_possible_json_value(hass, tpl, payload)
+
+        yield 'messages/sec (value paths)', int(
+            message_count / (time.time() - start))
+
+    finally:
+        hass.stop()
+
+
+@benchmark
+def mqtt_topics(subscription_count=1000, message_count=10000):
+    """Match MQTT messages against many subscriptions.
+
+    Compares splitting the topic for every subscription with the trie.
+    """
+    from homeassistant.components import mqtt
+
+    def match_topic(subscription, topic):
+        """Match a topic the way every subscription used to."""
+        if subscription.endswith('#'):
+            return (subscription[:-2] == topic or
+                    topic.startswith(subscription[:-1]))
+
+        sub_parts = subscription.split('/')
+        topic_parts = topic.split('/')
+
+        return (len(sub_parts) == len(topic_parts) and
+                all(a == b for a, b in zip(sub_parts, topic_parts)
+                    if a != '+'))
+
+    subscriptions = []
+
+    for idx in range(subscription_count):
+        if idx % 50 == 0:
+            subscriptions.append('tele/device_{}/#'.format(idx))
+        elif idx % 10 == 0:
+            subscriptions.append('stat/+/device_{}'.format(idx))
+        else:
+            subscriptions.append('zigbee2mqtt/device_{}'.format(idx))
+
+    topics = ['zigbee2mqtt/device_{}'.format(idx % subscription_count)
+              for idx in range(message_count)]
+
+    start = time.time()
+    matches = 0
+
+    for topic in topics:
+        for subscription in subscriptions:
+            if match_topic(subscription, topic):
+                matches += 1
+
+    elapsed = time.time() - start
+    yield 'messages/sec (match every subscription)', int(
+        message_count / elapsed)
+
+    trie = mqtt.TopicTrie()
+
+    for subscription in subscriptions:
+        trie.add(subscription, subscription)
+
+    start = time.time()
+    trie_matches = 0
+
+    for topic in topics:
+        trie_matches += len(trie.match(topic))
+
+    elapsed = time.time() - start
+    yield 'messages/sec (topic trie)', int(message_count / elapsed)
+    yield 'matches', '{} / {}'.format(matches, trie_matches)
+
+
+@benchmark
+def yaml_split_config(file_count=300, entity_count=10):
+    """Load a configuration split over many included files.
+
+    Compares the pure Python loader with the cached C loader.
+    """
+    import yaml
+    from homeassistant.util import yaml as yaml_util
+
+    tmp_dir = tempfile.mkdtemp()
+    include_dir = os.path.join(tmp_dir, 'sensors')
+    os.mkdir(include_dir)
+    config_path = os.path.join(tmp_dir, 'configuration.yaml')
+    mtime = time.time() - 60
+
+    try:
+        for idx in range(file_count):
+            path = os.path.join(include_dir, 'sensor_{}.yaml'.format(idx))
+
+            with open(path, 'w') as fil:
+                fil.write('sensor_{}:\n'.format(idx))
+
+                for entity in range(entity_count):
+                    fil.write('  - platform: template\n'
+                              '    name: Sensor {} {}\n'
+                              '    value_template: "{{{{ 1 + 1 }}}}"\n'
+                              '    unit_of_measurement: W\n'.format(
+                                  idx, entity))
+
+            os.utime(path, (mtime, mtime))
+
+        with open(config_path, 'w') as fil:
+            fil.write('sensor: !include_dir_merge_named sensors\n')
+
+        os.utime(config_path, (mtime, mtime))
+
+        def python_include(loader, node):
+            """Include a directory with the pure Python loader."""
+            mapping = {}
+            for fname in os.listdir(include_dir):
+                with open(os.path.join(include_dir, fname)) as fil:
+                    mapping.update(yaml.load(
+                        fil, Loader=yaml_util.SafeLineLoader))
+            return mapping
+
+        class PythonLoader(yaml_util.SafeLineLoader):
+            """Pure Python loader with the Home Assistant constructors."""
+
+        PythonLoader.add_constructor('!include_dir_merge_named',
+                                     python_include)
+
+        start = time.time()
+        with open(config_path) as fil:
+            expected = yaml.load(fil, Loader=PythonLoader)
+        yield 'seconds (pure Python)', round(time.time() - start, 3)
+
+        start = time.time()
+        result = yaml_util.load_yaml(config_path)
+        yield 'seconds (C loader)', round(time.time() - start, 3)
+
+        start = time.time()
+        result = yaml_util.load_yaml(config_path)
+        yield 'seconds (cached)', round(time.time() - start, 3)
+
+        yield 'same result', result == expected
+
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+@benchmark
+def blocking_service_calls(call_count=50, rounds=20):
+    """Make blocking service calls from many threads at the same time.
+
+    Like a scene or script turning on many lights one call at a time.
+    """
+    import threading
+
+    hass = core.HomeAssistant()
+    hass.services.register('light', 'turn_on', lambda call: None)
+
+    def call_service():
+        """Turn on a light and wait for it."""
+        hass.services.call('light', 'turn_on', {}, blocking=True)
+
+    try:
+        start = time.time()
+
+        for _ in range(rounds):
+            threads = [threading.Thread(target=call_service)
+                       for _ in range(call_count)]
+
+            for thread in threads:
+                thread.start()
+
+            for thread in threads:
+                thread.join()
+
+        elapsed = time.time() - start
+        yield 'calls/sec ({} concurrent)'.format(call_count), int(
+            call_count * rounds / elapsed)
+        yield 'pool jobs per call', round(
+            sum(timing['count'] for timing in
+                hass.pool.timings.as_dict().values()) /
+            (call_count * rounds), 1)
+
+    finally:
+        hass.stop()
+
+
+@benchmark
+def pool_queue(job_count=20000, key_count=100):
+    """Queue jobs on the worker pool.
+
+    Compares the priority only queue items the pool used to have with
+    first in, first out items and with jobs serialized per key.
+    """
+    import threading
+    from future.moves import queue
+    from homeassistant import util
+
+    class PriorityOnlyItem(object):
+        """Queue item that is only ordered by priority."""
+
+        # pylint: disable=too-few-public-methods
+        def __init__(self, priority, item):
+            """Initialize the item."""
+            self.priority = priority
+            self.item = item
+            self.queued = time.time()
+
+        def __lt__(self, other):
+            """Return the ordering."""
+            return self.priority < other.priority
+
+    for name, item_class in (('priority only', PriorityOnlyItem),
+                             ('priority + sequence', util.PriorityQueueItem)):
+        work_queue = queue.PriorityQueue()
+        start = time.time()
+
+        for idx in range(job_count):
+            work_queue.put(item_class(idx % 5, idx))
+
+        out_of_order = 0
+        last = [-1] * 5
+
+        while not work_queue.empty():
+            item = work_queue.get()
+            out_of_order += item.item < last[item.priority]
+            last[item.priority] = item.item
+
+        yield 'queue ops/sec ({})'.format(name), int(
+            job_count / (time.time() - start))
+        yield 'jobs out of order ({})'.format(name), out_of_order
+
+    for use_keys in (False, True):
+        lock = threading.Lock()
+        last = {}
+        out_of_order = [0]
+
+        def handler(job):
+            """Count the jobs that ran before an older job of their key."""
+            key, idx = job
+            with lock:
+                if idx < last.get(key, -1):
+                    out_of_order[0] += 1
+                last[key] = idx
+
+        pool = util.ThreadPool(handler, 4)
+        start = time.time()
+
+        for idx in range(job_count):
+            key = idx % key_count
+            pool.add_job(0, (key, idx), key if use_keys else None)
+
+        pool.block_till_done()
+        elapsed = time.time() - start
+        pool.stop()
+
+        mode = 'lanes per key' if use_keys else 'no keys'
+        yield 'pool jobs/sec ({})'.format(mode), int(job_count / elapsed)
+        yield 'jobs out of order ({})'.format(mode), out_of_order[0]
+
+
+@benchmark
+def group_expansion(expand_count=200, group_count=10, member_count=100):
+    """Expand a group of groups like a service call does.
+
+    Compares the recursive expansion that looked up the group states on
+    every call with the group membership index.
+    """
+    from homeassistant.components import group
+    from homeassistant.const import ATTR_ENTITY_ID
+
+    def recursive_expand(hass, entity_ids):
+        """Expand groups the way expand_entity_ids used to."""
+        found_ids = []
+
+        for entity_id in entity_ids:
+            entity_id = entity_id.lower()
+
+            if entity_id.split('.', 1)[0] == group.DOMAIN:
+                state = hass.states.get(entity_id)
+                members = state.attributes[ATTR_ENTITY_ID] if state else []
+                found_ids.extend(
+                    ent_id for ent_id in recursive_expand(hass, members)
+                    if ent_id not in found_ids)
+            elif entity_id not in found_ids:
+                found_ids.append(entity_id)
+
+        return found_ids
+
+    hass = core.HomeAssistant()
+
+    try:
+        sub_groups = []
+
+        for group_idx in range(group_count):
+            sub_groups.append(group.Group(
+                hass, 'lights {}'.format(group_idx),
+                ['light.light_{}_{}'.format(group_idx, idx)
+                 for idx in range(member_count)]).entity_id)
+
+        all_lights = group.Group(hass, 'all lights', sub_groups).entity_id
+
+        for name, expand in (('recursive', recursive_expand),
+                             ('index', group.expand_entity_ids)):
+            start = time.time()
+
+            for _ in range(expand_count):
+                entity_ids = expand(hass, [all_lights])
+
+            yield 'expansions/sec ({}, {} entities)'.format(
+                name, len(entity_ids)), int(
+                    expand_count / (time.time() - start))
+
+    finally:
+        hass.stop()
+
+
+@benchmark
+def state_machine_set(entity_count=1000, rounds=20):
+    """Set states of entities that are known to the state machine."""
+    hass = core.HomeAssistant()
+    # Only the state machine is measured, not the listeners
+    hass.bus.fire = lambda *args, **kwargs: None
+    entity_ids = ['light.light_{}'.format(idx) for idx in range(entity_count)]
+    attributes = {'brightness': 100, 'friendly_name': 'Light'}
+
+    try:
+        start = time.time()
+
+        for entity_id in entity_ids:
+            hass.states.set(entity_id, 'off', attributes)
+
+        yield 'new entities/sec', int(entity_count / (time.time() - start))
+
+        start = time.time()
+
+        for idx in range(rounds):
+            for entity_id in entity_ids:
+                hass.states.set(entity_id, 'on' if idx % 2 else 'off',
+                                dict(attributes))
+
+        yield 'state changes/sec', int(
+            entity_count * rounds / (time.time() - start))
+
+        start = time.time()
+
+        for idx in range(rounds):
+            for entity_id in entity_ids:
+                hass.states.set(entity_id, 'on', {'brightness': idx})
+
+        yield 'attribute changes/sec', int(
+            entity_count * rounds / (time.time() - start))
+
+        start = time.time()
+
+        for entity_id in entity_ids:
+            for _ in range(rounds):
+                hass.states.entity_ids('light')
+
+        yield 'entity_ids(domain) calls/sec', int(
+            entity_count * rounds / (time.time() - start))
+
+    finally:
+        hass.stop()
+
+
+@benchmark
+def api_states_dump(entity_count=10000, rounds=10):
+    """Serialize all states like a GET of /api/states does."""
+    import json
+    from homeassistant import remote
+
+    hass = core.HomeAssistant()
+
+    try:
+        for idx in range(entity_count):
+            hass.states.set('sensor.sensor_{}'.format(idx), idx, {
+                'unit_of_measurement': 'W',
+                'friendly_name': 'Sensor {}'.format(idx),
+            })
+
+        states = hass.states.all()
+
+        start = time.time()
+
+        for _ in range(rounds):
+            json.dumps(states, sort_keys=True, cls=remote.JSONEncoder)
+
+        yield 'dumps/sec (serialize every state)', round(
+            rounds / (time.time() - start), 1)
+
+        start = time.time()
+        remote.json_dumps(states)
+
+        yield 'dumps/sec (first with kept JSON)', round(
+            1 / (time.time() - start), 1)
+
+        start = time.time()
+
+        for _ in range(rounds):
+            remote.json_dumps(states)
+
+        yield 'dumps/sec (kept JSON)', round(
+            rounds / (time.time() - start), 1)
+
+    finally:
+        hass.stop()
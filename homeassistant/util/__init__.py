@@ -3,7 +3,7 @@ from datetime import datetime
 from functools import wraps
 from future.moves import queue
 from future.utils import PY3
-from itertools import chain
+from itertools import chain, count
 import collections
 import enum
 import inspect
@@ -13,6 +13,8 @@ import re
 import socket
 import string
 import threading
+import time
+from bisect import bisect_left
 from functools import wraps
 
 from .dt import as_local, utcnow
@@ -23,6 +25,18 @@ RE_SANITIZE_FILENAME = re.compile(r'(~|\.\.|/|\\)')
 RE_SANITIZE_PATH = re.compile(r'(~|\.(\.)+)')
 RE_SLUGIFY = re.compile(r'[^a-z0-9_]+')
 
+# Upper bounds in seconds of the job timing histogram buckets
+JOB_TIMING_BUCKETS = (0.01, 0.1, 1, 10)
+
+# Add a worker if a job waited longer than this in the queue
+POOL_SCALE_UP_LATENCY = 1  # seconds
+
+# Remove an added worker if it did not get a job for this long
+POOL_IDLE_TIMEOUT = 60  # seconds
+
+# Order of jobs with the same priority
+_JOB_SEQUENCE = count()
+
 
 def sanitize_filename(filename):
     r"""Sanitize a filename by removing .. / and \\."""
@@ -305,11 +319,61 @@ class Throttle(object):
         return wrapper
 
 
+class JobTimings(object):
+    """Histograms of job wall times, grouped by job name."""
+
+    def __init__(self, buckets=JOB_TIMING_BUCKETS):
+        """Initialize the timings."""
+        self.buckets = tuple(buckets)
+        self._timings = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, duration):
+        """Record that job name took duration seconds."""
+        with self._lock:
+            timing = self._timings.get(name)
+
+            if timing is None:
+                timing = self._timings[name] = {
+                    'count': 0,
+                    'total': 0.0,
+                    'max': 0.0,
+                    'histogram': [0] * (len(self.buckets) + 1),
+                }
+
+            timing['count'] += 1
+            timing['total'] += duration
+            timing['max'] = max(timing['max'], duration)
+            timing['histogram'][bisect_left(self.buckets, duration)] += 1
+
+    def as_dict(self):
+        """Return a dict with the timings per job name."""
+        labels = ['<{}s'.format(bound) for bound in self.buckets]
+        labels.append('>={}s'.format(self.buckets[-1]))
+
+        with self._lock:
+            return {
+                name: {
+                    'count': timing['count'],
+                    'total': timing['total'],
+                    'max': timing['max'],
+                    'histogram': dict(zip(labels, timing['histogram'])),
+                } for name, timing in self._timings.items()}
+
+    def slowest(self, count=5):
+        """Return the names and timings of the jobs with the highest total."""
+        timings = self.as_dict()
+
+        return sorted(timings.items(), key=lambda item: item[1]['total'],
+                      reverse=True)[:count]
+
+
 class ThreadPool(object):
     """A priority queue-based thread pool."""
 
-    # pylint: disable=too-many-instance-attributes
-    def __init__(self, job_handler, worker_count=0, busy_callback=None):
+    # pylint: disable=too-many-instance-attributes, too-many-arguments
+    def __init__(self, job_handler, worker_count=0, busy_callback=None,
+                 max_worker_count=None, job_name=None):
         """Initialize the pool.
 
         job_handler: method to be called from worker thread to handle job
@@ -317,14 +381,26 @@ class ThreadPool(object):
         busy_callback: method to be called when queue gets too big.
                        Parameters: worker_count, list of current_jobs,
                                    pending_jobs_count
+        max_worker_count: add workers up to this number when jobs have to
+                          wait too long. Added workers are removed again when
+                          they are idle. None disables scaling.
+        job_name: method that returns the name to record the wall time of a
+                  job under, for jobs added without a name. None disables
+                  timing those jobs.
         """
         self._job_handler = job_handler
         self._busy_callback = busy_callback
+        self._job_name = job_name
 
         self.worker_count = 0
+        self.min_worker_count = 0
+        self.max_worker_count = max_worker_count
         self.busy_warning_limit = 0
+        self.timings = JobTimings()
         self._work_queue = queue.PriorityQueue()
-        self.current_jobs = []
+        self._current_jobs = {}
+        # Dict of key => deque of the jobs waiting for the running job
+        self._lanes = {}
         self._lock = threading.RLock()
         self._quit_task = object()
 
@@ -333,20 +409,69 @@ class ThreadPool(object):
         for _ in range(worker_count):
             self.add_worker()
 
+    @property
+    def current_jobs(self):
+        """List of (start time, job) of the jobs that are being worked on."""
+        return [(start, job) for start, job, _
+                in list(self._current_jobs.values())]
+
+    @property
+    def queue_size(self):
+        """Number of jobs waiting to be picked up by a worker."""
+        return self._work_queue.qsize() + \
+            sum(len(lane) for lane in list(self._lanes.values()))
+
+    def as_dict(self):
+        """Return a dict describing the workers, queue and job timings."""
+        return {
+            'worker_count': self.worker_count,
+            'min_worker_count': self.min_worker_count,
+            'max_worker_count': self.max_worker_count,
+            'pending_jobs': self.queue_size,
+            'current_jobs': [
+                {'start': start.isoformat(), 'job': name or str(job)}
+                for start, job, name in list(self._current_jobs.values())],
+            'timings': self.timings.as_dict(),
+        }
+
     def add_worker(self):
         """Add worker to the thread pool and reset warning limit."""
         with self._lock:
             if not self.running:
                 raise RuntimeError("ThreadPool not running")
 
-            worker = threading.Thread(
-                target=self._worker,
-                name='ThreadPool Worker {}'.format(self.worker_count))
-            worker.daemon = True
-            worker.start()
+            self.min_worker_count += 1
+            self._start_worker()
 
-            self.worker_count += 1
-            self.busy_warning_limit = self.worker_count * 3
+    def set_worker_limits(self, min_worker_count=None,
+                          max_worker_count=None):
+        """Change the number of workers the pool keeps and scales up to.
+
+        Workers are added or removed to keep min_worker_count workers.
+        """
+        with self._lock:
+            if max_worker_count is not None:
+                self.max_worker_count = max_worker_count
+
+            if min_worker_count is None:
+                return
+
+            while self.min_worker_count < min_worker_count:
+                self.add_worker()
+
+            while self.min_worker_count > min_worker_count:
+                self.remove_worker()
+
+    def _start_worker(self):
+        """Start a worker thread."""
+        worker = threading.Thread(
+            target=self._worker,
+            name='ThreadPool Worker {}'.format(self.worker_count))
+        worker.daemon = True
+        worker.start()
+
+        self.worker_count += 1
+        self.busy_warning_limit = self.worker_count * 3
 
     def remove_worker(self):
         """Remove worker from the thread pool and reset warning limit."""
@@ -357,15 +482,30 @@ class ThreadPool(object):
             self._work_queue.put(PriorityQueueItem(0, self._quit_task))
 
             self.worker_count -= 1
+            self.min_worker_count = max(0, self.min_worker_count - 1)
             self.busy_warning_limit = self.worker_count * 3
 
-    def add_job(self, priority, job):
-        """Add a job to the queue."""
+    def add_job(self, priority, job, key=None, name=None):
+        """Add a job to the queue.
+
+        Jobs with the same priority are started in the order they were
+        added. Jobs with the same key are also run one at a time. The wall
+        time of the job is recorded under name if given.
+        """
         with self._lock:
             if not self.running:
                 raise RuntimeError("ThreadPool not running")
 
-            self._work_queue.put(PriorityQueueItem(priority, job))
+            queue_item = PriorityQueueItem(priority, job, key, name)
+
+            if key is None:
+                self._work_queue.put(queue_item)
+            elif key in self._lanes:
+                # Wait till the job with the same key is done
+                self._lanes[key].append(queue_item)
+            else:
+                self._lanes[key] = collections.deque()
+                self._work_queue.put(queue_item)
 
             # Check if our queue is getting too big.
             if self._work_queue.qsize() > self.busy_warning_limit \
@@ -381,8 +521,6 @@ class ThreadPool(object):
     def block_till_done(self):
         """Block till current work is done."""
         self._work_queue.join()
-        # import traceback
-        # traceback.print_stack()
 
     def stop(self):
         """Finish all the jobs and stops all the threads."""
@@ -401,39 +539,106 @@ class ThreadPool(object):
             # Wait till all workers have quit
             self.block_till_done()
 
+    def _scale_up(self):
+        """Add a worker if the maximum has not been reached yet."""
+        with self._lock:
+            if self.running and self.worker_count < self.max_worker_count:
+                self._start_worker()
+
+    def _scale_down(self):
+        """Return True if this worker is not needed and was removed."""
+        with self._lock:
+            if self.running and self.worker_count > self.min_worker_count:
+                self.worker_count -= 1
+                self.busy_warning_limit = self.worker_count * 3
+                return True
+
+            return False
+
     def _worker(self):
         """Handle jobs for the thread pool."""
+        scaling = self.max_worker_count is not None
+        timeout = POOL_IDLE_TIMEOUT if scaling else None
+        worker = threading.current_thread()
+
         while True:
             # Get new item from work_queue
-            job = self._work_queue.get().item
+            try:
+                queue_item = self._work_queue.get(timeout=timeout)
+            except queue.Empty:
+                if self._scale_down():
+                    return
+                continue
+
+            job = queue_item.item
 
             if job == self._quit_task:
                 self._work_queue.task_done()
                 return
 
+            if scaling and \
+               time.time() - queue_item.queued > POOL_SCALE_UP_LATENCY:
+                self._scale_up()
+
+            name = queue_item.name
+
+            if name is None and self._job_name is not None:
+                name = self._job_name(job)
+
             # Add to current running jobs
-            job_log = (utcnow(), job)
-            self.current_jobs.append(job_log)
+            self._current_jobs[worker] = (utcnow(), job, name)
+            start = time.time()
 
             # Do the job
             self._job_handler(job)
 
+            if name is not None:
+                self.timings.add(name, time.time() - start)
+
             # Remove from current running job
-            self.current_jobs.remove(job_log)
+            del self._current_jobs[worker]
+
+            if queue_item.key is not None:
+                self._next_in_lane(queue_item.key)
 
             # Tell work_queue the task is done
             self._work_queue.task_done()
 
+    def _next_in_lane(self, key):
+        """Queue the next job with key now the previous one is done."""
+        with self._lock:
+            lane = self._lanes[key]
+
+            if lane:
+                # Time spent waiting in the lane is not pool latency
+                queue_item = lane.popleft()
+                queue_item.queued = time.time()
+                self._work_queue.put(queue_item)
+            else:
+                del self._lanes[key]
+
 
 class PriorityQueueItem(object):
-    """Holds a priority and a value. Used within PriorityQueue."""
+    """Holds a priority and a value. Used within PriorityQueue.
+
+    Items with the same priority are ordered first in, first out.
+    """
+
+    __slots__ = ['priority', 'sequence', 'item', 'key', 'name', 'queued']
 
     # pylint: disable=too-few-public-methods
-    def __init__(self, priority, item):
+    def __init__(self, priority, item, key=None, name=None):
         """Initialize the queue."""
         self.priority = priority
+        self.sequence = next(_JOB_SEQUENCE)
         self.item = item
+        self.key = key
+        self.name = name
+        self.queued = time.time()
 
     def __lt__(self, other):
         """Return the ordering."""
+        if self.priority == other.priority:
+            return self.sequence < other.sequence
+
         return self.priority < other.priority
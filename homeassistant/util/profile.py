@@ -0,0 +1,111 @@
+"""Record where the startup time of Home Assistant goes.
+
+Profiling is off unless start() is called. The timed context manager is
+cheap to use while it is off.
+"""
+from collections import defaultdict
+from contextlib import contextmanager
+import json
+import threading
+import time
+
+# The startup profile being recorded, None if not profiling
+ACTIVE = None
+
+# Number of entries per category in the summary
+SUMMARY_COUNT = 10
+
+
+class StartupProfile(object):
+    """Timings collected while Home Assistant starts."""
+
+    def __init__(self):
+        """Initialize the profile."""
+        self.start = time.time()
+        self.milestones = {}
+        self.timings = defaultdict(dict)
+        self._lock = threading.Lock()
+
+    def add(self, category, name, seconds):
+        """Add the seconds spent on name to a category."""
+        with self._lock:
+            timings = self.timings[category]
+            timings[name] = timings.get(name, 0) + seconds
+
+    def mark(self, milestone):
+        """Record the seconds since the start at which milestone was hit."""
+        self.milestones[milestone] = time.time() - self.start
+
+    def as_dict(self):
+        """Return a dict representation of the profile."""
+        with self._lock:
+            return {
+                'milestones': dict(self.milestones),
+                'timings': {category: dict(timings) for category, timings
+                            in self.timings.items()},
+            }
+
+    def summary(self, count=SUMMARY_COUNT):
+        """Return a human readable summary of the profile."""
+        lines = ['Startup profile']
+
+        for milestone, seconds in sorted(self.milestones.items(),
+                                         key=lambda item: item[1]):
+            lines.append('  {:<28} {:8.3f}s'.format(milestone, seconds))
+
+        for category, timings in sorted(self.as_dict()['timings'].items()):
+            lines.append('{} ({} entries, {:.3f}s total)'.format(
+                category, len(timings), sum(timings.values())))
+
+            for name, seconds in sorted(timings.items(),
+                                        key=lambda item: item[1],
+                                        reverse=True)[:count]:
+                lines.append('  {:<28} {:8.3f}s'.format(name, seconds))
+
+        return '\n'.join(lines)
+
+    def write(self, path):
+        """Write the profile as JSON to path."""
+        with open(path, 'w') as fil:
+            json.dump(self.as_dict(), fil, indent=2, sort_keys=True)
+
+
+def start():
+    """Start recording a startup profile and return it."""
+    global ACTIVE  # pylint: disable=global-statement
+
+    ACTIVE = StartupProfile()
+    return ACTIVE
+
+
+def stop():
+    """Stop recording and return the recorded profile."""
+    global ACTIVE  # pylint: disable=global-statement
+
+    profile, ACTIVE = ACTIVE, None
+    return profile
+
+
+def mark(milestone):
+    """Record a milestone if profiling."""
+    profile = ACTIVE
+
+    if profile is not None:
+        profile.mark(milestone)
+
+
+@contextmanager
+def timed(category, name):
+    """Add the time spent in the with block to the profile if profiling."""
+    profile = ACTIVE
+
+    if profile is None:
+        yield
+        return
+
+    start_time = time.time()
+
+    try:
+        yield
+    finally:
+        profile.add(category, name, time.time() - start_time)
@@ -1,9 +1,12 @@
 """YAML utility functions."""
 from __future__ import absolute_import
-from collections import OrderedDict
+from collections import OrderedDict, namedtuple
 from io import open
+import json
 import logging
 import os
+import threading
+import time
 
 import glob
 import yaml
@@ -18,6 +21,22 @@ _LOGGER = logging.getLogger(__name__)
 _SECRET_NAMESPACE = 'homeassistant'
 _SECRET_YAML = 'secrets.yaml'
 
+# Files modified less than this many seconds ago are not cached because a
+# change within the same mtime tick would go unnoticed.
+CACHE_MIN_AGE = 2
+
+CACHE_VERSION = 2
+
+# Dict of file name => (mtime, size, has tags, parsed data as JSON)
+_CACHE = {}
+_CACHE_LOCK = threading.Lock()
+_CACHE_PATH = None
+_CACHE_DIRTY = False
+
+# Tags that depend on other files or the environment. They are resolved
+# every time a file is loaded, also when the file comes from the cache.
+DynamicTag = namedtuple('DynamicTag', 'tag value')
+
 
 # pylint: disable=too-many-ancestors
 class SafeLineLoader(yaml.SafeLoader):
@@ -31,18 +50,195 @@ class SafeLineLoader(yaml.SafeLoader):
         return node
 
 
+class CachingLoader(getattr(yaml, 'CSafeLoader', SafeLineLoader)):
+    """Loader that leaves the dynamic tags to be resolved after loading.
+
+    Uses the C parser of libyaml if available.
+    """
+
+    has_dynamic_tags = False
+
+
+class _TagContext(object):
+    """Stand-in for the loader when resolving the tags of a loaded file."""
+
+    def __init__(self, name):
+        """Initialize the context of the file name."""
+        self.name = name
+
+
 def load_yaml(fname):
-    """Load a YAML file."""
+    """Load a YAML file.
+
+    Files that did not change since they were parsed are loaded from the
+    cache. The !include, !secret and !env_var tags are always resolved
+    again.
+    """
+    global _CACHE_DIRTY  # pylint: disable=global-statement
+
+    try:
+        stat = os.stat(fname)
+        key = (stat.st_mtime, stat.st_size)
+    except OSError:
+        key = None
+
+    cached = _CACHE.get(fname)
+
+    data = None
+
+    if key is not None and cached is not None and cached[:2] == key:
+        has_dynamic_tags = cached[2]
+        try:
+            data = _decode(json.loads(cached[3]))
+        except (ValueError, TypeError, KeyError, IndexError):
+            cached = None
+    else:
+        cached = None
+
+    if cached is None:
+        has_dynamic_tags, data = _parse_yaml(fname)
+
+        if key is not None and time.time() - key[0] > CACHE_MIN_AGE:
+            try:
+                encoded = json.dumps(_encode(data))
+            except TypeError:
+                # Holds values that are not kept in the cache, like dates
+                encoded = None
+
+            if encoded is not None:
+                with _CACHE_LOCK:
+                    _CACHE[fname] = key + (has_dynamic_tags, encoded)
+                    _CACHE_DIRTY = True
+
+    if has_dynamic_tags:
+        data = _resolve_dynamic_tags(data, _TagContext(fname))
+
+    # If configuration file is empty YAML returns None
+    # We convert that to an empty dict
+    return data or {}
+
+
+def _parse_yaml(fname):
+    """Parse a YAML file, return if it has dynamic tags and the data."""
     try:
         with open(fname, encoding='utf-8') as conf_file:
-            # If configuration file is empty YAML returns None
-            # We convert that to an empty dict
-            return yaml.load(conf_file, Loader=SafeLineLoader) or {}
+            loader = CachingLoader(conf_file)
+            loader.name = fname
+
+            try:
+                data = loader.get_single_data()
+                return loader.has_dynamic_tags, data
+            finally:
+                loader.dispose()
     except yaml.YAMLError as exc:
         _LOGGER.error(exc)
         raise HomeAssistantError(exc)
 
 
+def _resolve_dynamic_tags(data, context):
+    """Replace the dynamic tags in the loaded data by their value."""
+    if isinstance(data, DynamicTag):
+        return _DYNAMIC_TAGS[data.tag](context, data)
+    elif isinstance(data, dict):
+        for key in list(data):
+            data[key] = _resolve_dynamic_tags(data[key], context)
+    elif isinstance(data, list):
+        data[:] = [_resolve_dynamic_tags(item, context) for item in data]
+
+    return data
+
+
+def _encode(data):
+    """Encode loaded data as plain JSON values.
+
+    Mappings become {"m": pairs, "f": file, "l": line}, dynamic tags
+    {"t": tag, "v": value} and sets {"s": items}. Raises TypeError for
+    other types.
+    """
+    if isinstance(data, (str, int, float)) or data is None:
+        return data
+    elif isinstance(data, list):
+        return [_encode(item) for item in data]
+    elif isinstance(data, DynamicTag):
+        return {'t': data.tag, 'v': data.value}
+    elif isinstance(data, dict):
+        return {
+            'm': [[_encode(key), _encode(value)]
+                  for key, value in data.items()],
+            'f': getattr(data, '__config_file__', None),
+            'l': getattr(data, '__line__', None),
+        }
+    elif isinstance(data, set):
+        return {'s': [_encode(item) for item in data]}
+
+    raise TypeError('Unable to cache {}'.format(type(data).__name__))
+
+
+def _decode(data):
+    """Decode data encoded by _encode."""
+    if isinstance(data, list):
+        return [_decode(item) for item in data]
+    elif not isinstance(data, dict):
+        return data
+    elif 'm' in data:
+        mapping = OrderedDict(
+            (_decode(key), _decode(value)) for key, value in data['m'])
+        mapping.__config_file__ = data['f']
+        mapping.__line__ = data['l']
+        return mapping
+    elif 't' in data:
+        return DynamicTag(data['t'], data['v'])
+
+    return set(_decode(item) for item in data['s'])
+
+
+def load_cache(path):
+    """Use the cache file at path to skip parsing unchanged files."""
+    global _CACHE_PATH  # pylint: disable=global-statement
+
+    _CACHE_PATH = path
+
+    # The cache holds plain JSON values only, loading a tampered cache
+    # file can not run code
+    try:
+        with open(path, encoding='utf-8') as cache_file:
+            cache = json.load(cache_file)
+    except (OSError, IOError, ValueError):
+        return
+
+    if not isinstance(cache, dict) or cache.get('version') != CACHE_VERSION \
+            or not isinstance(cache.get('files'), dict):
+        return
+
+    with _CACHE_LOCK:
+        for fname, entry in cache['files'].items():
+            if isinstance(entry, list) and len(entry) == 4:
+                _CACHE.setdefault(fname, tuple(entry))
+
+
+def save_cache():
+    """Write the parsed files to the cache file if anything changed."""
+    global _CACHE_DIRTY  # pylint: disable=global-statement
+
+    with _CACHE_LOCK:
+        if _CACHE_PATH is None or not _CACHE_DIRTY:
+            return
+
+        files = {fname: entry for fname, entry in _CACHE.items()
+                 if os.path.isfile(fname)}
+        _CACHE_DIRTY = False
+
+    tmp_path = _CACHE_PATH + '.tmp'
+
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as cache_file:
+            cache_file.write(json.dumps(
+                {'version': CACHE_VERSION, 'files': files}))
+        os.rename(tmp_path, _CACHE_PATH)
+    except (OSError, IOError):
+        _LOGGER.warning('Unable to write YAML cache %s', _CACHE_PATH)
+
+
 def _include_yaml(loader, node):
     """Load another YAML file and embeds it using the !include tag.
 
@@ -104,11 +300,14 @@ def _ordered_dict(loader, node):
     seen = {}
     min_line = None
     for (key, _), (node, _) in zip(nodes, node.value):
-        line = getattr(node, '__line__', 'unknown')
-        if line != 'unknown' and (min_line is None or line < min_line):
+        # The C loader does not track lines, use the mark of the node then
+        line = getattr(node, '__line__', None)
+        if line is None and node.start_mark is not None:
+            line = node.start_mark.line + 1
+        if line is not None and (min_line is None or line < min_line):
             min_line = line
         if key in seen:
-            fname = getattr(loader.stream, 'name', '')
+            fname = getattr(loader, 'name', '')
             first_mark = yaml.Mark(fname, 0, seen[key], -1, None, None)
             second_mark = yaml.Mark(fname, 0, line, -1, None, None)
             raise yaml.MarkedYAMLError(
@@ -187,3 +386,25 @@ yaml.SafeLoader.add_constructor('!include_dir_merge_list',
 yaml.SafeLoader.add_constructor('!include_dir_named', _include_dir_named_yaml)
 yaml.SafeLoader.add_constructor('!include_dir_merge_named',
                                 _include_dir_merge_named_yaml)
+
+
+def _dynamic_tag(loader, node):
+    """Keep a dynamic tag to be resolved after loading."""
+    loader.has_dynamic_tags = True
+    return DynamicTag(node.tag, node.value)
+
+
+_DYNAMIC_TAGS = {
+    '!include': _include_yaml,
+    '!env_var': _env_var_yaml,
+    '!secret': _secret_yaml,
+    '!include_dir_list': _include_dir_list_yaml,
+    '!include_dir_merge_list': _include_dir_merge_list_yaml,
+    '!include_dir_named': _include_dir_named_yaml,
+    '!include_dir_merge_named': _include_dir_merge_named_yaml,
+}
+
+CachingLoader.add_constructor(
+    yaml.resolver.BaseResolver.DEFAULT_MAPPING_TAG, _ordered_dict)
+for _tag in _DYNAMIC_TAGS:
+    CachingLoader.add_constructor(_tag, _dynamic_tag)
@@ -5,6 +5,7 @@ from unittest import mock
 from homeassistant.const import EVENT_STATE_CHANGED, MATCH_ALL
 from homeassistant.components.binary_sensor import template
 from homeassistant.exceptions import TemplateError
+from homeassistant.helpers import template as template_helper
 
 from tests.common import get_test_home_assistant
 
@@ -85,7 +86,7 @@ class TestBinarySensorTemplate(unittest.TestCase):
         vs.update()
         self.assertFalse(vs.is_on)
 
-        vs._template = "{{ 2 > 1 }}"
+        vs._template = template_helper.Template("{{ 2 > 1 }}", hass)
         vs.update()
         self.assertTrue(vs.is_on)
 
@@ -6,6 +6,7 @@ try:
 except ImportError:
     import mock
 import socket
+import threading
 
 import voluptuous as vol
 
@@ -212,6 +213,35 @@ class TestMQTT(unittest.TestCase):
         self.assertEqual('test-topic', self.calls[0][0])
         self.assertEqual('test-payload', self.calls[0][1])
 
+    def test_subscribe_callback_error(self):
+        """Test an failing callback does not stop the other callbacks."""
+        mqtt.subscribe(self.hass, 'test-topic',
+                       mock.Mock(side_effect=ValueError))
+        mqtt.subscribe(self.hass, 'test-topic', self.record_calls)
+
+        fire_mqtt_message(self.hass, 'test-topic', 'test-payload')
+
+        self.hass.pool.block_till_done()
+        self.assertEqual(1, len(self.calls))
+
+    def test_subscribe_callbacks_run_concurrently(self):
+        """Test a slow callback does not delay the other callbacks."""
+        self.hass.pool.add_worker()
+        barrier = threading.Barrier(2, timeout=5)
+
+        def wait_for_other(topic, payload, qos):
+            """Wait till the other callback runs too."""
+            barrier.wait()
+            self.calls.append(topic)
+
+        mqtt.subscribe(self.hass, 'test-topic', wait_for_other)
+        mqtt.subscribe(self.hass, 'test-topic', wait_for_other)
+
+        fire_mqtt_message(self.hass, 'test-topic', 'test-payload')
+
+        self.hass.pool.block_till_done()
+        self.assertEqual(['test-topic', 'test-topic'], self.calls)
+
     def test_subscribe_topic_subtree_wildcard_no_match(self):
         """Test the subscription of wildcard topics."""
         mqtt.subscribe(self.hass, 'test-topic/#', self.record_calls)
@@ -326,3 +356,55 @@ class TestMQTTCallbacks(unittest.TestCase):
     def test_invalid_mqtt_topics(self):
         self.assertRaises(vol.Invalid, mqtt.valid_publish_topic, 'bad+topic')
         self.assertRaises(vol.Invalid, mqtt.valid_subscribe_topic, 'bad\0one')
+
+
+class TestTopicTrie(unittest.TestCase):
+    """Test matching topics to subscriptions."""
+
+    def setUp(self):  # pylint: disable=invalid-name
+        """Setup things to be run when tests are started."""
+        self.trie = mqtt.TopicTrie()
+
+    def subscribe(self, *subscriptions):
+        """Add subscriptions that have their own topic as callback."""
+        for subscription in subscriptions:
+            self.trie.add(subscription, subscription)
+
+    def test_exact_topic(self):
+        """Test matching a topic without wildcards."""
+        self.subscribe('home/kitchen/temp', 'home/kitchen', 'home/hall/temp')
+
+        self.assertEqual(['home/kitchen/temp'],
+                         self.trie.match('home/kitchen/temp'))
+        self.assertEqual(['home/kitchen'], self.trie.match('home/kitchen'))
+        self.assertEqual([], self.trie.match('home'))
+        self.assertEqual([], self.trie.match('home/kitchen/temp/set'))
+
+    def test_level_wildcard(self):
+        """Test matching a single level wildcard."""
+        self.subscribe('home/+/temp', '+/+')
+
+        self.assertEqual(['home/+/temp'], self.trie.match('home/hall/temp'))
+        self.assertEqual(['home/+/temp'], self.trie.match('home//temp'))
+        self.assertEqual(['+/+'], self.trie.match('home/hall'))
+        self.assertEqual([], self.trie.match('home/hall/humidity'))
+        self.assertEqual([], self.trie.match('home'))
+
+    def test_subtree_wildcard(self):
+        """Test matching a multi level wildcard."""
+        self.subscribe('home/#', '#')
+
+        self.assertEqual(['#', 'home/#'],
+                         sorted(self.trie.match('home/hall/temp')))
+        self.assertEqual(['#', 'home/#'], sorted(self.trie.match('home')))
+        self.assertEqual(['#'], self.trie.match('garden/light'))
+
+    def test_multiple_callbacks(self):
+        """Test every callback of a matching subscription is returned."""
+        self.trie.add('home/+/temp', 1)
+        self.trie.add('home/hall/temp', 2)
+        self.trie.add('home/hall/temp', 3)
+        self.trie.add('home/+/#', 4)
+
+        self.assertEqual([1, 2, 3, 4],
+                         sorted(self.trie.match('home/hall/temp')))
@@ -3,9 +3,11 @@
 import json
 from datetime import datetime, timedelta
 import unittest
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
-from homeassistant.const import MATCH_ALL
+import homeassistant.core as ha
+from homeassistant.const import (
+    EVENT_STATE_CHANGED, EVENT_TIME_CHANGED, MATCH_ALL)
 from homeassistant.components import recorder
 
 from tests.common import get_test_home_assistant
@@ -187,3 +189,105 @@ class TestRecorder(unittest.TestCase):
         # we should have all of our states still
         self.assertEqual(states.count(), 5)
         self.assertEqual(events.count(), 5)
+
+    def test_saving_batch_in_one_transaction(self):
+        """Test that a batch of events and states is committed at once."""
+        entity_id = 'test.recorder_batch'
+        events = [ha.Event('EVENT_TEST', {'idx': idx}) for idx in range(3)]
+        events.extend(
+            ha.Event(EVENT_STATE_CHANGED, {
+                'entity_id': entity_id,
+                'new_state': ha.State(entity_id, str(idx))})
+            for idx in range(3))
+
+        with patch.object(recorder._INSTANCE, '_commit',
+                          wraps=recorder._INSTANCE._commit) as mock_commit:
+            recorder._INSTANCE._save_batch(events)
+
+        self.assertEqual(1, mock_commit.call_count)
+        self.assertEqual(6, recorder._INSTANCE.last_batch_size)
+        self.assertIsNotNone(recorder.statistics()['last_commit_latency'])
+
+        db_states = recorder.query('States').filter_by(entity_id=entity_id)
+        self.assertEqual(3, db_states.count())
+        for db_state in db_states:
+            db_event = recorder.query('Events').filter_by(
+                event_id=db_state.event_id).one()
+            self.assertEqual(EVENT_STATE_CHANGED, db_event.event_type)
+
+    def test_failing_batch_handler_rolled_back(self):
+        """Test the data of a failing batch handler is not committed."""
+        def failing_handler(session, events):
+            """Add an event for every event, then fail."""
+            for event in events:
+                session.add(recorder.get_model('Events').from_event(
+                    ha.Event('EVENT_HANDLER', {})))
+            raise ValueError('fail')
+
+        recorder.add_batch_handler(failing_handler)
+        recorder._INSTANCE._save_batch([ha.Event('EVENT_BATCH', {})])
+
+        self.assertEqual(1, recorder.query('Events').filter_by(
+            event_type='EVENT_BATCH').count())
+        self.assertEqual(0, recorder.query('Events').filter_by(
+            event_type='EVENT_HANDLER').count())
+
+    def test_batch_drains_queue_up_to_max_size(self):
+        """Test that queued events are collected in bounded batches."""
+        rec = recorder.Recorder(MagicMock(), purge_days=None, uri='sqlite://',
+                                max_batch_size=3)
+        events = [ha.Event('EVENT_TEST', {'idx': idx}) for idx in range(5)]
+        for event in events:
+            rec.queue.put(event)
+
+        self.assertEqual((events[:3], False), rec._get_batch())
+        self.assertEqual((events[3:], False), rec._get_batch())
+
+        rec.queue.put(events[0])
+        rec.queue.put(rec.quit_object)
+        self.assertEqual(([events[0]], True), rec._get_batch())
+
+    def test_filters(self):
+        """Test that include and exclude filters are applied."""
+        rec = recorder.Recorder(
+            MagicMock(), purge_days=None, uri='sqlite://',
+            include={
+                recorder.CONF_DOMAINS: ['sensor', 'light'],
+                recorder.CONF_ENTITIES: ['switch.kept'],
+            },
+            exclude={
+                recorder.CONF_DOMAINS: ['light'],
+                recorder.CONF_ENTITIES: ['sensor.power_meter'],
+                recorder.CONF_EVENT_TYPES: ['chatty_event'],
+            })
+
+        def state_event(entity_id):
+            """Create a state changed event for entity_id."""
+            return ha.Event(EVENT_STATE_CHANGED, {
+                'entity_id': entity_id,
+                'new_state': ha.State(entity_id, 'on')})
+
+        self.assertTrue(rec.should_record(state_event('sensor.temperature')))
+        self.assertTrue(rec.should_record(state_event('switch.kept')))
+        self.assertFalse(rec.should_record(state_event('switch.other')))
+        self.assertFalse(rec.should_record(state_event('light.kitchen')))
+        self.assertFalse(rec.should_record(state_event('sensor.power_meter')))
+        self.assertTrue(rec.should_record(ha.Event('EVENT_TEST')))
+        self.assertFalse(rec.should_record(ha.Event('chatty_event')))
+        self.assertFalse(rec.should_record(ha.Event(EVENT_TIME_CHANGED)))
+
+        rec.event_listener(state_event('sensor.power_meter'))
+        rec.event_listener(state_event('sensor.temperature'))
+        self.assertEqual(1, rec.queue.qsize())
+
+    def test_missing_indexes_are_added(self):
+        """Test that indexes added after table creation are created."""
+        from sqlalchemy import inspect
+
+        engine = recorder._INSTANCE.engine
+        engine.execute('DROP INDEX states__entity_id_last_updated')
+
+        recorder._INSTANCE._create_missing_indexes()
+
+        self.assertIn('states__entity_id_last_updated', [
+            index['name'] for index in inspect(engine).get_indexes('states')])
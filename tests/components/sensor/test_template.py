@@ -1,5 +1,8 @@
 """The test for the Template sensor platform."""
+from unittest.mock import patch
+
 import homeassistant.components.sensor as sensor
+from homeassistant.helpers import template
 
 from tests.common import get_test_home_assistant
 
@@ -37,6 +40,55 @@ class TestTemplateSensor:
         state = self.hass.states.get('sensor.test_template_sensor')
         assert state.state == 'It Works.'
 
+    def test_template_tracks_referenced_entities(self):
+        """Test the sensor only updates for the entities it reads."""
+        assert sensor.setup(self.hass, {
+            'sensor': {
+                'platform': 'template',
+                'sensors': {
+                    'test_template_sensor': {
+                        'value_template':
+                            "{{ states.sensor.test_state.state }} "
+                            "{{ states.sensor | list | count }}"
+                    }
+                }
+            }
+        })
+
+        self.hass.states.set('sensor.test_state', 'Works')
+        self.hass.pool.block_till_done()
+        state = self.hass.states.get('sensor.test_template_sensor')
+        assert state.state == 'Works 2'
+
+        self.hass.states.set('sensor.other_state', 'Works')
+        self.hass.pool.block_till_done()
+        state = self.hass.states.get('sensor.test_template_sensor')
+        assert state.state == 'Works 3'
+
+    def test_template_only_referenced_entity(self):
+        """Test the sensor ignores entities it does not read."""
+        assert sensor.setup(self.hass, {
+            'sensor': {
+                'platform': 'template',
+                'sensors': {
+                    'test_template_sensor': {
+                        'value_template':
+                            "{{ states.sensor.test_state.state }}"
+                    }
+                }
+            }
+        })
+
+        with patch.object(template.Template, 'render',
+                          return_value='rendered') as mock_render:
+            self.hass.states.set('sensor.other_state', 'Works')
+            self.hass.pool.block_till_done()
+            assert not mock_render.called
+
+            self.hass.states.set('sensor.test_state', 'Works')
+            self.hass.pool.block_till_done()
+            assert mock_render.called
+
     def test_template_syntax_error(self):
         """Test templating syntax error."""
         assert sensor.setup(self.hass, {
@@ -0,0 +1,40 @@
+"""The test for the worker pool sensor platform."""
+import homeassistant.components.sensor as sensor
+
+from tests.common import get_test_home_assistant
+
+
+class TestWorkerPoolSensor:
+    """Test the worker pool sensor."""
+
+    def setup_method(self, method):
+        """Setup things to be run when tests are started."""
+        self.hass = get_test_home_assistant()
+
+    def teardown_method(self, method):
+        """Stop everything that was started."""
+        self.hass.stop()
+
+    def test_worker_pool(self):
+        """Test the sensor shows the pool load."""
+        assert sensor.setup(self.hass, {
+            'sensor': {
+                'platform': 'worker_pool',
+            }
+        })
+
+        state = self.hass.states.get('sensor.worker_pool')
+        assert state.state == '0'
+        assert state.attributes.get('workers') == self.hass.pool.worker_count
+        assert isinstance(state.attributes.get('slowest_jobs'), list)
+
+    def test_worker_pool_name(self):
+        """Test the name of the sensor can be configured."""
+        assert sensor.setup(self.hass, {
+            'sensor': {
+                'platform': 'worker_pool',
+                'name': 'Pool',
+            }
+        })
+
+        assert self.hass.states.get('sensor.pool') is not None
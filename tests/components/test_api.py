@@ -15,7 +15,9 @@ except ImportError:
 
 from homeassistant import bootstrap, const
 import homeassistant.core as ha
+from homeassistant.components import api
 import homeassistant.components.http as http
+import homeassistant.remote as remote
 
 from tests.common import get_test_instance_port, get_test_home_assistant
 
@@ -76,6 +78,75 @@ class TestAPI(unittest.TestCase):
 
         self.assertEqual(hass.states.all(), remote_data)
 
+    def test_api_list_state_changes(self):
+        """Test listing the states that changed since a revision."""
+        hass.states.set('test.since_changed', 'on')
+        hass.states.set('test.since_removed', 'on')
+        revision = '{}:{}'.format(hass.states.run_id, hass.states.revision)
+
+        hass.states.set('test.since_changed', 'off')
+        hass.states.remove('test.since_removed')
+
+        req = requests.get(_url(const.URL_API_STATES),
+                           params={'since': revision},
+                           headers=HA_HEADERS)
+        data = req.json()
+
+        self.assertEqual(200, req.status_code)
+        self.assertEqual(
+            '{}:{}'.format(hass.states.run_id, hass.states.revision),
+            data['revision'])
+        self.assertFalse(data['full'])
+        self.assertEqual([hass.states.get('test.since_changed')],
+                         [ha.State.from_dict(item) for item in data['states']])
+        self.assertEqual(['test.since_removed'], data['removed'])
+
+    def test_api_list_state_changes_first_sync(self):
+        """Test all states and the revision are listed for a first sync."""
+        req = requests.get(_url(const.URL_API_STATES),
+                           params={'since': ''},
+                           headers=HA_HEADERS)
+        data = req.json()
+
+        self.assertEqual(200, req.status_code)
+        self.assertTrue(data['full'])
+        self.assertEqual(
+            '{}:{}'.format(hass.states.run_id, hass.states.revision),
+            data['revision'])
+        self.assertEqual(hass.states.all(),
+                         [ha.State.from_dict(item) for item in data['states']])
+
+    def test_api_list_state_changes_unknown_revision(self):
+        """Test all states are listed if the changes are not known."""
+        req = requests.get(_url(const.URL_API_STATES),
+                           params={'since': 0},
+                           headers=HA_HEADERS)
+        data = req.json()
+
+        self.assertEqual(200, req.status_code)
+        self.assertTrue(data['full'])
+        self.assertEqual(hass.states.all(),
+                         [ha.State.from_dict(item) for item in data['states']])
+
+        # The same revision of a previous run
+        req = requests.get(_url(const.URL_API_STATES),
+                           params={'since': 'previous:{}'.format(
+                               hass.states.revision)},
+                           headers=HA_HEADERS)
+        data = req.json()
+
+        self.assertEqual(200, req.status_code)
+        self.assertTrue(data['full'])
+        self.assertEqual(
+            '{}:{}'.format(hass.states.run_id, hass.states.revision),
+            data['revision'])
+
+        req = requests.get(_url(const.URL_API_STATES),
+                           params={'since': 'abcd'},
+                           headers=HA_HEADERS)
+
+        self.assertEqual(400, req.status_code)
+
     def test_api_get_state(self):
         """Test if the debug interface allows us to get a state."""
         req = requests.get(
@@ -233,6 +304,75 @@ class TestAPI(unittest.TestCase):
         self.assertEqual(400, req.status_code)
         self.assertEqual(0, len(test_value))
 
+    def test_api_fire_event_batch(self):
+        """Test firing a batch of events in order."""
+        test_value = []
+
+        def listener(event):
+            """Record the events of the batch."""
+            test_value.append((event.event_type, event.data, event.origin))
+
+        hass.bus.listen("test_batch_1", listener)
+        hass.bus.listen("test_batch_2", listener)
+
+        req = requests.post(
+            _url(const.URL_API_EVENT_BATCH),
+            data=json.dumps([
+                {'event_type': 'test_batch_1'},
+                {'event_type': 'test_batch_2', 'event_data': {'test': 2}},
+            ]),
+            headers=HA_HEADERS)
+
+        hass.pool.block_till_done()
+        hass.bus.remove_listener("test_batch_1", listener)
+        hass.bus.remove_listener("test_batch_2", listener)
+
+        self.assertEqual(200, req.status_code)
+        self.assertEqual(
+            [('test_batch_1', {}, ha.EventOrigin.remote),
+             ('test_batch_2', {'test': 2}, ha.EventOrigin.remote)],
+            sorted(test_value))
+
+    def test_api_fire_event_batch_state_changed(self):
+        """Test state changed events in a batch get their states back."""
+        test_value = []
+
+        def listener(event):
+            """Record the new state of the test entity."""
+            if event.data.get('entity_id') == 'test.batch':
+                test_value.append(event.data['new_state'])
+
+        hass.bus.listen(const.EVENT_STATE_CHANGED, listener)
+
+        req = requests.post(
+            _url(const.URL_API_EVENT_BATCH),
+            data=json.dumps([{
+                'event_type': const.EVENT_STATE_CHANGED,
+                'event_data': {'entity_id': 'test.batch',
+                               'new_state': ha.State('test.batch',
+                                                     'on').as_dict()},
+            }], cls=remote.JSONEncoder),
+            headers=HA_HEADERS)
+
+        hass.pool.block_till_done()
+        hass.bus.remove_listener(const.EVENT_STATE_CHANGED, listener)
+
+        self.assertEqual(200, req.status_code)
+        self.assertEqual(1, len(test_value))
+        self.assertIsInstance(test_value[0], ha.State)
+        self.assertEqual('on', test_value[0].state)
+
+    def test_api_fire_event_batch_with_invalid_json(self):
+        """Test firing an invalid batch of events."""
+        for data in ({'event_type': 'test'}, [{'event_data': {}}],
+                     [{'event_type': 'test', 'event_data': [1]}], [1]):
+            req = requests.post(
+                _url(const.URL_API_EVENT_BATCH),
+                data=json.dumps(data),
+                headers=HA_HEADERS)
+
+            self.assertEqual(400, req.status_code)
+
     def test_api_get_config(self):
         """Test the return of the configuration."""
         req = requests.get(_url(const.URL_API_CONFIG),
@@ -245,6 +385,17 @@ class TestAPI(unittest.TestCase):
                            headers=HA_HEADERS)
         self.assertEqual(hass.config.components, req.json())
 
+    def test_api_get_pool(self):
+        """Test the return of the worker pool status."""
+        req = requests.get(_url(const.URL_API_POOL),
+                           headers=HA_HEADERS)
+        data = req.json()
+
+        self.assertEqual(hass.pool.worker_count, data['worker_count'])
+        self.assertEqual(hass.pool.max_worker_count,
+                         data['max_worker_count'])
+        self.assertIn('timings', data)
+
     def test_api_get_error_log(self):
         """Test the return of the error log."""
         test_content = 'Test String°'
@@ -326,6 +477,22 @@ class TestAPI(unittest.TestCase):
 
         self.assertEqual(1, len(test_value))
 
+    def test_api_call_service_that_fails(self):
+        """Test the API answers if the service raised."""
+        def fail(service_call):
+            """Service that fails."""
+            raise ValueError('fail')
+
+        hass.services.register("test_domain", "fail", fail)
+
+        req = requests.post(
+            _url(const.URL_API_SERVICES_SERVICE.format(
+                "test_domain", "fail")),
+            headers=HA_HEADERS)
+
+        self.assertEqual(200, req.status_code)
+        self.assertEqual([], req.json())
+
     def test_api_template(self):
         """Test the template API."""
         hass.states.set('sensor.temperature', 10)
@@ -426,11 +593,12 @@ class TestAPI(unittest.TestCase):
 
     def test_stream(self):
         """Test the stream."""
-        listen_count = self._listen_count()
+        subscription_count = self._subscription_count()
         with closing(requests.get(_url(const.URL_API_STREAM), timeout=3,
                                   stream=True, headers=HA_HEADERS)) as req:
             stream = req.iter_content(1)
-            self.assertEqual(listen_count + 1, self._listen_count())
+            self.assertEqual(subscription_count + 1,
+                             self._subscription_count())
 
             hass.bus.fire('test_event')
 
@@ -440,13 +608,14 @@ class TestAPI(unittest.TestCase):
 
     def test_stream_with_restricted(self):
         """Test the stream with restrictions."""
-        listen_count = self._listen_count()
+        subscription_count = self._subscription_count()
         url = _url('{}?restrict=test_event1,test_event3'.format(
             const.URL_API_STREAM))
         with closing(requests.get(url, stream=True, timeout=3,
                                   headers=HA_HEADERS)) as req:
             stream = req.iter_content(1)
-            self.assertEqual(listen_count + 1, self._listen_count())
+            self.assertEqual(subscription_count + 1,
+                             self._subscription_count())
 
             hass.bus.fire('test_event1')
             data = self._stream_next_event(stream)
@@ -458,8 +627,55 @@ class TestAPI(unittest.TestCase):
             data = self._stream_next_event(stream)
             self.assertEqual('test_event3', data['event_type'])
 
-    def _stream_next_event(self, stream):
-        """Read the stream for next event while ignoring ping."""
+    def test_stream_with_entity_filter(self):
+        """Test the stream with entity and domain filters."""
+        url = _url('{}?entity_id=light.stream_kitchen&domain=switch'.format(
+            const.URL_API_STREAM))
+        with closing(requests.get(url, stream=True, timeout=3,
+                                  headers=HA_HEADERS)) as req:
+            stream = req.iter_content(1)
+
+            hass.states.set('light.stream_hall', 'on')
+            hass.states.set('light.stream_kitchen', 'on')
+            data = self._stream_next_event(stream)
+            self.assertEqual('light.stream_kitchen',
+                             data['data']['entity_id'])
+
+            hass.bus.fire('test_event')
+            hass.states.set('switch.stream_kitchen', 'on')
+            data = self._stream_next_event(stream)
+            self.assertEqual('switch.stream_kitchen',
+                             data['data']['entity_id'])
+
+    def test_stream_resume(self):
+        """Test resuming the stream from the last event id."""
+        url = _url('{}?restrict=test_resume'.format(const.URL_API_STREAM))
+        with closing(requests.get(url, stream=True, timeout=3,
+                                  headers=HA_HEADERS)) as req:
+            stream = req.iter_content(1)
+
+            hass.bus.fire('test_resume', {'number': 1})
+            event_id, data = self._stream_next_message(stream)
+            self.assertEqual({'number': 1}, data['data'])
+
+        hass.bus.fire('test_resume', {'number': 2})
+        hass.bus.fire('test_resume', {'number': 3})
+        hass.pool.block_till_done()
+
+        headers = dict(HA_HEADERS)
+        headers['Last-Event-ID'] = event_id
+
+        with closing(requests.get(url, stream=True, timeout=3,
+                                  headers=headers)) as req:
+            stream = req.iter_content(1)
+
+            self.assertEqual(
+                [{'number': 2}, {'number': 3}],
+                sorted((self._stream_next_event(stream)['data']
+                        for _ in range(2)), key=lambda data: data['number']))
+
+    def _stream_next_message(self, stream):
+        """Read the stream for the next event id and event, skipping ping."""
         while True:
             data = b''
             last_new_line = False
@@ -469,13 +685,161 @@ class TestAPI(unittest.TestCase):
                 data += dat
                 last_new_line = dat == b'\n'
 
-            conv = data.decode('utf-8').strip()[6:]
+            fields = dict(line.split(': ', 1) for line
+                          in data.decode('utf-8').strip().split('\n'))
 
-            if conv != 'ping':
+            if fields['data'] != 'ping':
                 break
 
-        return json.loads(conv)
+        return fields['id'], json.loads(fields['data'])
+
+    def _stream_next_event(self, stream):
+        """Read the stream for next event while ignoring ping."""
+        return self._stream_next_message(stream)[1]
 
-    def _listen_count(self):
-        """Return number of event listeners."""
-        return sum(hass.bus.listeners.values())
+    def _subscription_count(self):
+        """Return number of connected event streams."""
+        return hass.wsgi.views['api:stream'].hub.subscription_count
+
+
+class TestEventStreamHub(unittest.TestCase):
+    """Test feeding event streams."""
+
+    def setUp(self):  # pylint: disable=invalid-name
+        """Setup things to be run when tests are started."""
+        self.hass = get_test_home_assistant()
+        self.hub = api.EventStreamHub(self.hass)
+
+    def tearDown(self):  # pylint: disable=invalid-name
+        """Stop everything that was started."""
+        self.hass.stop()
+
+    def messages(self, subscription):
+        """Return the queued messages of a subscription."""
+        messages = []
+        while not subscription.queue.empty():
+            messages.append(subscription.queue.get_nowait())
+        return messages
+
+    def event_ids(self, messages):
+        """Return the run id and event id of the messages."""
+        ids = []
+        for message in messages:
+            run_id, event_id = \
+                message.decode('utf-8').split('\n')[0][4:].split(':')
+            ids.append((run_id, int(event_id)))
+        return ids
+
+    def test_event_serialized_once(self):
+        """Test every stream gets the same message."""
+        subscriptions = [api.EventStreamSubscription() for _ in range(3)]
+        for subscription in subscriptions:
+            self.hub.subscribe(subscription)
+
+        with patch('homeassistant.components.api.json.dumps',
+                   return_value='{}') as mock_dumps:
+            self.hass.bus.fire('test_event')
+            self.hass.pool.block_till_done()
+
+        self.assertEqual(1, mock_dumps.call_count)
+        messages = [self.messages(subscription)
+                    for subscription in subscriptions]
+        self.assertEqual(1, len(messages[0]))
+        self.assertTrue(all(message[0] is messages[0][0]
+                            for message in messages))
+
+    @patch('homeassistant.components.api.STREAM_QUEUE_SIZE', 2)
+    def test_slow_stream_closed(self):
+        """Test a stream that does not keep up is closed."""
+        slow = api.EventStreamSubscription()
+        fast = api.EventStreamSubscription()
+        self.hub.subscribe(slow)
+        self.hub.subscribe(fast)
+
+        for _ in range(2):
+            self.hass.bus.fire('test_event')
+            self.hass.pool.block_till_done()
+            self.messages(fast)
+
+        self.assertEqual(2, self.hub.subscription_count)
+
+        self.hass.bus.fire('test_event')
+        self.hass.pool.block_till_done()
+
+        self.assertTrue(slow.closed)
+        self.assertFalse(fast.closed)
+        self.assertEqual(1, self.hub.subscription_count)
+        self.assertIsNone(self.messages(slow)[-1])
+
+    def test_stop_closes_streams(self):
+        """Test streams are closed when Home Assistant stops."""
+        subscription = api.EventStreamSubscription(['test_event'])
+        self.hub.subscribe(subscription)
+
+        self.hass.bus.fire(const.EVENT_HOMEASSISTANT_STOP)
+        self.hass.pool.block_till_done()
+
+        self.assertEqual([None], self.messages(subscription))
+        self.assertEqual(0, self.hub.subscription_count)
+
+    @patch('homeassistant.components.api.STREAM_BUFFER_SIZE', 2)
+    def test_resume_from_buffer(self):
+        """Test a stream gets the buffered events after its last event."""
+        self.hub = api.EventStreamHub(self.hass)
+        subscription = api.EventStreamSubscription()
+        self.hub.subscribe(subscription)
+
+        for number in range(3):
+            self.hass.bus.fire('test_event', {'number': number})
+            self.hass.pool.block_till_done()
+
+        ids = self.event_ids(self.messages(subscription))
+        self.assertEqual(3 * [self.hub.run_id], [run for run, _ in ids])
+
+        resumed = api.EventStreamSubscription()
+        self.hub.subscribe(resumed, ids[0][1], self.hub.run_id)
+
+        self.assertEqual(ids[1:], self.event_ids(self.messages(resumed)))
+
+    def test_resume_other_run(self):
+        """Test event ids of another run are not resumed."""
+        self.hass.bus.fire('test_event')
+        self.hass.pool.block_till_done()
+
+        resumed = api.EventStreamSubscription()
+        self.hub.subscribe(resumed, 0, 'previous run')
+
+        self.assertEqual([], self.messages(resumed))
+        self.assertEqual(1, self.hub.subscription_count)
+
+    @patch('homeassistant.components.api.STREAM_QUEUE_SIZE', 2)
+    def test_resume_too_many_missed(self):
+        """Test a stream that missed more events than it can queue."""
+        for _ in range(3):
+            self.hass.bus.fire('test_event')
+            self.hass.pool.block_till_done()
+
+        resumed = api.EventStreamSubscription()
+        self.hub.subscribe(resumed, 0, self.hub.run_id)
+
+        self.assertTrue(resumed.closed)
+        self.assertEqual(0, self.hub.subscription_count)
+        self.assertIsNone(self.messages(resumed)[-1])
+
+    def test_subscription_matches(self):
+        """Test the filters of a subscription."""
+        subscription = api.EventStreamSubscription(
+            None, ['light.kitchen'], ['switch'])
+
+        self.assertTrue(subscription.matches(
+            ha.Event('state_changed', {'entity_id': 'light.kitchen'})))
+        self.assertTrue(subscription.matches(
+            ha.Event('call_service', {'entity_id': ['switch.ac']})))
+        self.assertFalse(subscription.matches(
+            ha.Event('state_changed', {'entity_id': 'light.hall'})))
+        self.assertFalse(subscription.matches(ha.Event('test_event')))
+
+        subscription = api.EventStreamSubscription(['test_event'])
+
+        self.assertTrue(subscription.matches(ha.Event('test_event')))
+        self.assertFalse(subscription.matches(ha.Event('other_event')))
@@ -270,6 +270,55 @@ class TestComponentsGroup(unittest.TestCase):
             sorted(group.expand_entity_ids(self.hass,
                                            ['group.group_of_groups'])))
 
+    def test_expand_entity_ids_follows_member_changes(self):
+        """Test that expansion follows changed members of nested groups."""
+        light_group = group.Group(self.hass, 'light', ['light.test_1'])
+        group.Group(self.hass, 'group_of_groups', ['group.light'])
+
+        self.assertEqual(
+            ['light.test_1'],
+            group.expand_entity_ids(self.hass, ['group.group_of_groups']))
+
+        light_group.update_tracked_entity_ids(['light.test_1',
+                                               'light.Test_2'])
+
+        self.assertEqual(
+            ['light.test_1', 'light.test_2'],
+            group.expand_entity_ids(self.hass, ['group.group_of_groups']))
+
+        light_group.stop()
+
+        self.assertEqual(
+            [], group.expand_entity_ids(self.hass, ['group.group_of_groups']))
+
+    def test_expand_entity_ids_group_state_without_entity(self):
+        """Test expanding a group state that has no Group entity."""
+        self.hass.states.set('group.remote', STATE_ON, {
+            'entity_id': ['light.Bowl']})
+
+        self.assertEqual(
+            ['light.bowl'],
+            group.expand_entity_ids(self.hass, ['group.remote']))
+
+        self.hass.states.set('group.remote', STATE_ON, {
+            'entity_id': ['light.Bowl', 'light.Ceiling']})
+
+        self.assertEqual(
+            ['light.bowl', 'light.ceiling'],
+            group.expand_entity_ids(self.hass, ['group.remote']))
+
+    def test_expand_entity_ids_detects_cycles(self):
+        """Test that groups that contain themselves can be expanded."""
+        group.Group(self.hass, 'first', ['light.test_1', 'group.second'])
+        group.Group(self.hass, 'second', ['light.test_2', 'group.first'])
+
+        self.assertEqual(
+            ['light.test_1', 'light.test_2'],
+            group.expand_entity_ids(self.hass, ['group.first']))
+        self.assertEqual(
+            ['light.test_2', 'light.test_1'],
+            group.expand_entity_ids(self.hass, ['group.second']))
+
     def test_set_assumed_state_based_on_tracked(self):
         """Test assumed state."""
         self.hass.states.set('light.Bowl', STATE_ON)
@@ -1,6 +1,7 @@
 """The tests the History component."""
 # pylint: disable=protected-access,too-many-public-methods
 from datetime import timedelta
+import json
 import unittest
 try:
     from unittest.mock import patch, sentinel
@@ -10,6 +11,7 @@ except ImportError:
 import homeassistant.core as ha
 import homeassistant.util.dt as dt_util
 from homeassistant.components import history, recorder
+from homeassistant.remote import JSONEncoder
 
 from tests.common import (
     mock_http_component, mock_state_change_event, get_test_home_assistant)
@@ -206,3 +208,50 @@ class TestComponentHistory(unittest.TestCase):
 
         hist = history.get_significant_states(zero, four)
         assert states == hist
+
+    def test_stream_significant_states_json(self):
+        """Test that streamed history matches the significant states."""
+        self.init_recorder()
+        mp = 'media_player.test'
+        therm = 'thermostat.test'
+
+        def set_state(entity_id, state, **kwargs):
+            self.hass.states.set(entity_id, state, **kwargs)
+            self.wait_recording_done()
+
+        zero = dt_util.utcnow()
+        one = zero + timedelta(seconds=1)
+        two = one + timedelta(seconds=1)
+        three = two + timedelta(seconds=1)
+
+        with patch('homeassistant.components.recorder.dt_util.utcnow',
+                   return_value=zero):
+            set_state(mp, 'idle', attributes={'media_title': 'Start'})
+            set_state('light.kitchen', 'on')
+
+        with patch('homeassistant.components.recorder.dt_util.utcnow',
+                   return_value=two):
+            for temp in range(3):
+                set_state(therm, 20, attributes={'current_temperature': temp})
+            set_state(mp, 'YouTube', attributes={'media_title': 'Video'})
+
+        def by_entity(result):
+            return sorted(result, key=lambda states: states[0]['entity_id'])
+
+        expected = json.loads(json.dumps(
+            list(history.get_significant_states(one, three).values()),
+            cls=JSONEncoder))
+
+        with patch('homeassistant.components.history.STREAM_CHUNK_SIZE', 2):
+            streamed = json.loads(''.join(
+                history.stream_significant_states_json(one, three)))
+
+        assert 3 == len(streamed)
+        assert by_entity(expected) == by_entity(streamed)
+
+    def test_stream_significant_states_json_empty(self):
+        """Test streaming history of a period without states."""
+        self.init_recorder()
+
+        assert [] == json.loads(''.join(
+            history.stream_significant_states_json(dt_util.utcnow())))
@@ -1,13 +1,15 @@
 """The tests for the logbook component."""
 # pylint: disable=protected-access,too-many-public-methods
+import json
 import unittest
 from datetime import timedelta
+from unittest.mock import MagicMock, patch
 
 import homeassistant.core as ha
 from homeassistant.const import (
     EVENT_STATE_CHANGED, EVENT_HOMEASSISTANT_START, EVENT_HOMEASSISTANT_STOP)
 import homeassistant.util.dt as dt_util
-from homeassistant.components import logbook
+from homeassistant.components import logbook, recorder
 
 from tests.common import mock_http_component, get_test_home_assistant
 
@@ -19,12 +21,35 @@ class TestComponentLogbook(unittest.TestCase):
         """Setup things to be run when tests are started."""
         self.hass = get_test_home_assistant()
         mock_http_component(self.hass)
+        self.init_recorder()
         self.assertTrue(logbook.setup(self.hass, {}))
 
     def tearDown(self):
         """Stop everything that was started."""
         self.hass.stop()
 
+    def init_recorder(self):
+        """Initialize the recorder."""
+        db_uri = 'sqlite://'
+        with patch('homeassistant.core.Config.path', return_value=db_uri):
+            recorder.setup(self.hass, config={
+                "recorder": {
+                    "db_url": db_uri}})
+        self.hass.start()
+        recorder._INSTANCE.block_till_db_ready()
+        self.wait_recording_done()
+
+    def wait_recording_done(self):
+        """Block till recording is done."""
+        self.hass.pool.block_till_done()
+        recorder._INSTANCE.block_till_done()
+
+    def save_entries(self, *events):
+        """Store the logbook entries of events like the recorder does."""
+        session = recorder.Session()
+        logbook._save_entries(session, events)
+        session.commit()
+
     def test_service_call_create_logbook_entry(self):
         """Test if service call create log book entry."""
         calls = []
@@ -130,6 +155,95 @@ class TestComponentLogbook(unittest.TestCase):
             entries[0], name=name, message=message,
             domain='sun', entity_id=entity_id)
 
+    def test_entries_saved_while_recording(self):
+        """Test that recorded events are stored as logbook entries."""
+        self.hass.states.set('light.kitchen', 'on')
+        self.hass.states.set('light.kitchen', 'on', {'brightness': 100})
+        self.hass.states.set('light.kitchen', 'off')
+        self.wait_recording_done()
+
+        entries = recorder.execute(recorder.query('LogbookEntries'))
+
+        self.assertEqual(['turned on', 'turned off'],
+                         [entry.message for entry in entries])
+        self.assert_entry(entries[0], name='kitchen', domain='light',
+                          entity_id='light.kitchen')
+
+    def test_saved_sensor_entries_grouped(self):
+        """Test that sensor entries replace the last one in their window."""
+        entity_id = 'sensor.bla'
+
+        pointA = dt_util.utcnow().replace(minute=2, microsecond=0)
+        pointB = pointA.replace(minute=5)
+        pointC = pointA + timedelta(minutes=logbook.GROUP_BY_MINUTES)
+
+        for point, state in ((pointA, 10), (pointB, 20), (pointC, 30)):
+            self.save_entries(
+                self.create_state_changed_event(point, entity_id, state))
+
+        entries = recorder.execute(recorder.query('LogbookEntries'))
+
+        self.assertEqual(2, len(entries))
+        self.assert_entry(entries[0], pointB, 'bla', 'changed to 20',
+                          domain='sensor', entity_id=entity_id)
+        self.assert_entry(entries[1], pointC, 'bla', 'changed to 30',
+                          domain='sensor', entity_id=entity_id)
+
+    def test_saved_start_stop_grouped(self):
+        """Test that a start in the minute of a stop is saved as restart."""
+        self.save_entries(ha.Event(EVENT_HOMEASSISTANT_STOP))
+        self.save_entries(ha.Event(EVENT_HOMEASSISTANT_START))
+
+        entries = recorder.execute(recorder.query('LogbookEntries').filter_by(
+            domain=ha.DOMAIN))
+
+        self.assertEqual(1, len(entries))
+        self.assert_entry(entries[0], name='Home Assistant',
+                          message='restarted')
+
+    def test_view_reads_saved_entries(self):
+        """Test the logbook view returns the saved entries of a day."""
+        self.save_entries(ha.Event(logbook.EVENT_LOGBOOK_ENTRY, {
+            logbook.ATTR_NAME: 'Alarm',
+            logbook.ATTR_MESSAGE: 'is triggered',
+            logbook.ATTR_ENTITY_ID: 'switch.test_switch',
+        }))
+
+        response = logbook.LogbookView(self.hass).get(MagicMock())
+        entries = json.loads(response.get_data(as_text=True))
+
+        # Home Assistant started before the logbook was set up, its start
+        # is humanified from the events table
+        self.assertEqual(2, len(entries))
+        self.assertEqual('started', entries[0]['message'])
+        entries = entries[1:]
+        self.assertEqual('Alarm', entries[0]['name'])
+        self.assertEqual('switch', entries[0]['domain'])
+
+    def test_view_reads_events_before_first_entry(self):
+        """Test the view humanifies the events from before the entries."""
+        day = dt_util.start_of_local_day(dt_util.now() - timedelta(days=1))
+
+        def logbook_event(minutes, name):
+            """Create a logbook entry event minutes into the day."""
+            return ha.Event(logbook.EVENT_LOGBOOK_ENTRY, {
+                logbook.ATTR_NAME: name,
+                logbook.ATTR_MESSAGE: 'is triggered',
+            }, time_fired=dt_util.as_utc(day) + timedelta(minutes=minutes))
+
+        # Recorded before the logbook entries table existed
+        session = recorder.Session()
+        session.add(recorder.get_model('Events').from_event(
+            logbook_event(1, 'Before')))
+        session.commit()
+        self.save_entries(logbook_event(2, 'After'))
+
+        response = logbook.LogbookView(self.hass).get(MagicMock(), day.date())
+        entries = json.loads(response.get_data(as_text=True))
+
+        self.assertEqual(['Before', 'After'],
+                         [entry['name'] for entry in entries])
+
     def assert_entry(self, entry, when=None, name=None, message=None,
                      domain=None, entity_id=None):
         """Assert an entry is what is expected."""
@@ -2,6 +2,8 @@
 # pylint: disable=protected-access,too-many-public-methods
 from collections import OrderedDict
 import logging
+import threading
+import time
 import unittest
 try:
     from unittest.mock import patch, Mock
@@ -11,7 +13,8 @@ except ImportError:
 import homeassistant.core as ha
 import homeassistant.loader as loader
 from homeassistant.helpers.entity import Entity
-from homeassistant.helpers.entity_component import EntityComponent
+from homeassistant.helpers.entity_component import (
+    EntityComponent, EntityPlatform)
 from homeassistant.helpers import discovery
 import homeassistant.util.dt as dt_util
 
@@ -108,10 +111,108 @@ class TestHelpersEntityComponent(unittest.TestCase):
 
         fire_time_changed(self.hass, dt_util.utcnow().replace(second=0))
         self.hass.pool.block_till_done()
+        self.hass.io_pool.block_till_done()
 
         assert not no_poll_ent.update_ha_state.called
         assert poll_ent.update_ha_state.called
 
+    def test_polling_updates_in_parallel(self):
+        """Test that entities of one platform update in parallel."""
+        component = EntityComponent(_LOGGER, DOMAIN, self.hass, 20)
+        started = [threading.Event(), threading.Event()]
+        overlapped = []
+
+        def update(idx):
+            """Wait for the other entity to start updating as well."""
+            started[idx].set()
+            overlapped.append(started[1 - idx].wait(5))
+
+        entities = [EntityTest(should_poll=True) for _ in range(2)]
+
+        for idx, entity in enumerate(entities):
+            entity.update = lambda idx=idx: update(idx)
+
+        component.add_entities(entities)
+
+        fire_time_changed(self.hass, dt_util.utcnow().replace(second=0))
+        self.hass.pool.block_till_done()
+        self.hass.io_pool.block_till_done()
+
+        assert [True, True] == overlapped
+
+    def test_polling_skips_update_in_progress(self):
+        """Test that an overrunning update is skipped, not queued."""
+        component = EntityComponent(_LOGGER, DOMAIN, self.hass, 20)
+        release = threading.Event()
+        poll_ent = EntityTest(should_poll=True)
+        poll_ent.update = Mock(side_effect=lambda: release.wait(5))
+
+        component.add_entities([poll_ent])
+
+        fire_time_changed(self.hass, dt_util.utcnow().replace(second=0))
+        self.hass.pool.block_till_done()
+        fire_time_changed(self.hass, dt_util.utcnow().replace(second=20))
+        self.hass.pool.block_till_done()
+
+        release.set()
+        self.hass.io_pool.block_till_done()
+
+        assert 1 == poll_ent.update.call_count
+
+    def test_polling_limits_parallel_updates(self):
+        """Test that a platform does not run more updates than allowed."""
+        platform = EntityPlatform(
+            EntityComponent(_LOGGER, DOMAIN, self.hass), 20, None, 1)
+        release = threading.Event()
+        ent1 = EntityTest(should_poll=True)
+        ent1.update = Mock(side_effect=lambda: release.wait(5))
+        ent2 = EntityTest(should_poll=True)
+        ent2.update = Mock()
+
+        platform.add_entities([ent1, ent2])
+
+        fire_time_changed(self.hass, dt_util.utcnow().replace(second=0))
+        self.hass.pool.block_till_done()
+
+        assert not ent2.update.called
+
+        release.set()
+        self.hass.io_pool.block_till_done()
+
+        assert ent2.update.called
+
+    def test_polling_timeout_frees_slot(self):
+        """Test that an update running too long frees its platform slot."""
+        platform = EntityPlatform(
+            EntityComponent(_LOGGER, DOMAIN, self.hass), 20, None, 1)
+        release = threading.Event()
+        ent1 = EntityTest(should_poll=True)
+        ent1.update = Mock(side_effect=lambda: release.wait(5))
+        ent2 = EntityTest(should_poll=True)
+        ent2.update = Mock()
+
+        platform.add_entities([ent1, ent2])
+
+        fire_time_changed(self.hass, dt_util.utcnow().replace(second=0))
+        self.hass.pool.block_till_done()
+
+        with patch('homeassistant.helpers.entity_component.UPDATE_TIMEOUT',
+                   -1):
+            fire_time_changed(self.hass,
+                              dt_util.utcnow().replace(second=20))
+            self.hass.pool.block_till_done()
+
+        for _ in range(50):
+            if ent2.update.called:
+                break
+            time.sleep(0.02)
+
+        release.set()
+        self.hass.io_pool.block_till_done()
+
+        assert 1 == ent1.update.call_count
+        assert ent2.update.called
+
     def test_update_state_adds_entities(self):
         """Test if updating poll entities cause an entity to be added works."""
         component = EntityComponent(_LOGGER, DOMAIN, self.hass)
@@ -125,6 +226,7 @@ class TestHelpersEntityComponent(unittest.TestCase):
 
         fire_time_changed(self.hass, dt_util.utcnow().replace(second=0))
         self.hass.pool.block_till_done()
+        self.hass.io_pool.block_till_done()
 
         assert 2 == len(self.hass.states.entity_ids())
 
@@ -181,6 +283,129 @@ class TestHelpersEntityComponent(unittest.TestCase):
         assert ['test_domain.test_2'] == \
                [ent.entity_id for ent in component.extract_from_service(call)]
 
+    def test_command_entities_in_parallel(self):
+        """Test that a service call commands entities at the same time."""
+        component = EntityComponent(_LOGGER, DOMAIN, self.hass)
+        started = [threading.Event(), threading.Event()]
+        overlapped = []
+
+        def turn_on(idx):
+            """Wait for the other entity to be commanded as well."""
+            started[idx].set()
+            overlapped.append(started[1 - idx].wait(5))
+
+        entities = [EntityTest(should_poll=False) for _ in range(2)]
+
+        for idx, entity in enumerate(entities):
+            entity.turn_on = lambda idx=idx: turn_on(idx)
+
+        component.add_entities(entities)
+        component.command_entities(entities, 'turn_on')
+
+        assert [True, True] == overlapped
+
+    def test_command_entities_updates_polling_entities(self):
+        """Test that commanded entities that poll get updated."""
+        component = EntityComponent(_LOGGER, DOMAIN, self.hass)
+        poll_ent = EntityTest(should_poll=True)
+        poll_ent.turn_on = Mock()
+        no_poll_ent = EntityTest(should_poll=False)
+        no_poll_ent.turn_on = Mock()
+
+        component.add_entities([poll_ent, no_poll_ent])
+        poll_ent.update_ha_state = Mock()
+        no_poll_ent.update_ha_state = Mock()
+
+        component.command_entities([poll_ent, no_poll_ent], 'turn_on',
+                                   brightness=10)
+
+        poll_ent.turn_on.assert_called_once_with(brightness=10)
+        no_poll_ent.turn_on.assert_called_once_with(brightness=10)
+        poll_ent.update_ha_state.assert_called_once_with(True)
+        assert not no_poll_ent.update_ha_state.called
+
+    def test_command_entities_updates_after_all_commands(self):
+        """Test that entities are updated once all commands are done."""
+        component = EntityComponent(_LOGGER, DOMAIN, self.hass)
+        calls = []
+        entities = [EntityTest(should_poll=True) for _ in range(3)]
+
+        for idx, entity in enumerate(entities):
+            entity.turn_on = lambda idx=idx: calls.append(('command', idx))
+            entity.update = lambda idx=idx: calls.append(('update', idx))
+
+        component.add_entities(entities)
+        del calls[:]
+        component.command_entities(entities, 'turn_on')
+
+        self.assertEqual(
+            ['command'] * 3 + ['update'] * 3, [call[0] for call in calls])
+
+    def test_command_entities_runs_on_io_pool(self):
+        """Test that commands run on the I/O pool, not on new threads."""
+        component = EntityComponent(_LOGGER, DOMAIN, self.hass)
+        entities = [EntityTest(should_poll=False) for _ in range(3)]
+
+        for entity in entities:
+            entity.turn_on = Mock()
+
+        component.add_entities(entities)
+
+        with patch.object(self.hass.io_pool, 'add_job',
+                          wraps=self.hass.io_pool.add_job) as mock_add_job, \
+                patch('threading.Thread.start') as mock_start:
+            component.command_entities(entities, 'turn_on')
+
+        self.assertEqual(2, mock_add_job.call_count)
+        self.assertFalse(mock_start.called)
+
+        for entity in entities:
+            entity.turn_on.assert_called_once_with()
+
+    def test_command_entities_uses_many_method(self):
+        """Test that an entity class can command its entities at once."""
+        calls = []
+
+        class ManyEntity(EntityTest):
+            """Entity that commands all but the first entity at once."""
+
+            @classmethod
+            def turn_on_many(cls, entities, **kwargs):
+                """Turn on all but the first entity."""
+                calls.append((list(entities), kwargs))
+                return entities[:1]
+
+        component = EntityComponent(_LOGGER, DOMAIN, self.hass)
+        entities = [ManyEntity(should_poll=False) for _ in range(3)]
+
+        for entity in entities:
+            entity.turn_on = Mock()
+
+        component.add_entities(entities)
+        component.command_entities(entities, 'turn_on', brightness=10)
+
+        assert [(entities, {'brightness': 10})] == calls
+        entities[0].turn_on.assert_called_once_with(brightness=10)
+        assert not entities[1].turn_on.called
+        assert not entities[2].turn_on.called
+
+    def test_command_entities_continues_after_error(self):
+        """Test that one failing entity does not stop the others."""
+        component = EntityComponent(_LOGGER, DOMAIN, self.hass)
+        entities = [EntityTest(should_poll=False) for _ in range(3)]
+
+        for entity in entities:
+            entity.turn_on = Mock()
+
+        entities[0].turn_on.side_effect = ValueError
+
+        component.add_entities(entities)
+        component.parallel_commands = 1
+        component.command_entities(entities, 'turn_on')
+
+        assert entities[1].turn_on.called
+        assert entities[2].turn_on.called
+
     def test_setup_loads_platforms(self):
         """Test the loading of the platforms."""
         component_setup = Mock(return_value=True)
@@ -3,6 +3,7 @@
 # pylint: disable=too-few-public-methods
 import unittest
 from datetime import datetime, timedelta
+from unittest.mock import patch
 
 from astral import Astral
 
@@ -16,6 +17,7 @@ from homeassistant.helpers.event import (
     track_state_change,
     track_sunrise,
     track_sunset,
+    TimePattern,
 )
 from homeassistant.components import sun
 import homeassistant.util.dt as dt_util
@@ -89,6 +91,25 @@ class TestEventHelpers(unittest.TestCase):
         self.assertEqual(2, len(specific_runs))
         self.assertEqual(3, len(wildcard_runs))
 
+    def test_remove_time_listener(self):
+        """Test time tracking handles can be removed like bus listeners."""
+        runs = []
+        birthday_paulus = datetime(1986, 7, 9, 12, 0, 0, tzinfo=dt_util.UTC)
+
+        handles = [
+            track_point_in_utc_time(
+                self.hass, lambda x: runs.append(1), birthday_paulus),
+            track_utc_time_change(self.hass, lambda x: runs.append(1)),
+        ]
+
+        for handle in handles:
+            self.hass.bus.remove_listener(ha.EVENT_TIME_CHANGED, handle)
+
+        self._send_time_changed(birthday_paulus)
+        self.hass.pool.block_till_done()
+        self.assertEqual(0, len(runs))
+        self.assertEqual(0, self.hass.scheduler.pending)
+
     def test_track_state_change(self):
         """Test track_state_change."""
         # 2 lists to track how often our callbacks get called
@@ -162,6 +183,24 @@ class TestEventHelpers(unittest.TestCase):
         self.assertEqual(5, len(wildcard_runs))
         self.assertEqual(6, len(wildercard_runs))
 
+    def test_track_state_change_duplicate_entity_ids(self):
+        """Test an entity listed twice is tracked once."""
+        runs = []
+
+        listener = track_state_change(
+            self.hass, ['light.bowl', 'light.Bowl'],
+            lambda entity_id, old_s, new_s: runs.append(entity_id))
+
+        self.hass.states.set('light.bowl', 'on')
+        self.hass.pool.block_till_done()
+        self.assertEqual(['light.bowl'], runs)
+
+        self.hass.bus.remove_listener(ha.EVENT_STATE_CHANGED, listener)
+
+        self.hass.states.set('light.bowl', 'off')
+        self.hass.pool.block_till_done()
+        self.assertEqual(['light.bowl'], runs)
+
     def test_track_sunrise(self):
         """Test track the sunrise."""
         latitude = 32.87336
@@ -352,3 +391,69 @@ class TestEventHelpers(unittest.TestCase):
         self._send_time_changed(datetime(2014, 5, 2, 0, 0, 0))
         self.hass.pool.block_till_done()
         self.assertEqual(0, len(specific_runs))
+
+    def test_time_pattern_next_match(self):
+        """Test calculating the next time a pattern matches."""
+        start = datetime(2014, 5, 24, 12, 3, 10, 500)
+
+        self.assertEqual(
+            datetime(2014, 5, 24, 12, 3, 10),
+            TimePattern().next_match(start))
+        self.assertEqual(
+            datetime(2014, 5, 24, 12, 5, 0),
+            TimePattern(minute='/5', second=0).next_match(start))
+        self.assertEqual(
+            datetime(2014, 5, 25, 0, 0, 0),
+            TimePattern(hour=0, minute=0, second=[0, 30]).next_match(
+                datetime(2014, 5, 24, 0, 0, 31)))
+        self.assertEqual(
+            datetime(2016, 2, 29, 0, 0, 0),
+            TimePattern(month=2, day=29, hour=0, minute=0,
+                        second=0).next_match(start))
+        self.assertEqual(
+            datetime(2016, 1, 1, 0, 0, 0),
+            TimePattern(year='/4', month=1, day=1, hour=0, minute=0,
+                        second=0).next_match(start))
+        self.assertIsNone(TimePattern(year=2013).next_match(start))
+        self.assertIsNone(TimePattern(year='/two').next_match(start))
+
+    def test_time_pattern_not_evaluated_every_tick(self):
+        """Test that a tick only evaluates the patterns that are due."""
+        runs = []
+
+        for _ in range(100):
+            track_utc_time_change(
+                self.hass, lambda x: runs.append(1), minute=0, second=0)
+
+        self._send_time_changed(datetime(2014, 5, 24, 12, 0, 0))
+        self.hass.pool.block_till_done()
+        self.assertEqual(100, len(runs))
+
+        with patch.object(TimePattern, 'matches') as mock_matches:
+            for second in range(1, 60):
+                self._send_time_changed(
+                    datetime(2014, 5, 24, 12, 1, second))
+                self.hass.pool.block_till_done()
+
+        self.assertEqual(0, mock_matches.call_count)
+
+        self._send_time_changed(datetime(2014, 5, 24, 13, 0, 0))
+        self.hass.pool.block_till_done()
+        self.assertEqual(200, len(runs))
+
+    def test_cancel_time_change(self):
+        """Test cancelling a time change listener."""
+        runs = []
+
+        handle = track_utc_time_change(
+            self.hass, lambda x: runs.append(1), second=0)
+
+        self._send_time_changed(datetime(2014, 5, 24, 12, 0, 0))
+        self.hass.pool.block_till_done()
+        self.assertEqual(1, len(runs))
+
+        self.assertTrue(self.hass.scheduler.cancel(handle))
+
+        self._send_time_changed(datetime(2014, 5, 24, 12, 1, 0))
+        self.hass.pool.block_till_done()
+        self.assertEqual(1, len(runs))
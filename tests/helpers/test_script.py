@@ -74,6 +74,21 @@ class TestScriptHelper(unittest.TestCase):
         assert len(calls) == 1
         assert calls[0].data.get('hello') == 'world'
 
+    def test_calling_service_that_fails(self):
+        """Test a script is done after a service that raised."""
+        def fail(service):
+            """Service that fails."""
+            raise ValueError('fail')
+
+        self.hass.services.register('test', 'fail', fail)
+
+        script_obj = script.Script(self.hass, {'service': 'test.fail'})
+
+        script_obj.run()
+        self.hass.pool.block_till_done()
+
+        assert not script_obj.is_running
+
     def test_calling_service_template(self):
         """Test the calling of a service."""
         calls = []
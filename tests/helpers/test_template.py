@@ -1,9 +1,11 @@
 """Test Home Assistant template helper methods."""
 # pylint: disable=too-many-public-methods
+import json
 import unittest
 from unittest.mock import patch
 
 from homeassistant.components import group
+from homeassistant.const import MATCH_ALL
 from homeassistant.exceptions import TemplateError
 from homeassistant.helpers import template
 import homeassistant.util.dt as dt_util
@@ -183,6 +185,54 @@ class TestUtilTemplate(unittest.TestCase):
             template.render_with_possible_json_value(
                 self.hass, '{{ value_json', 'hello', '-'))
 
+    def test_render_with_possible_json_value_value_paths(self):
+        """Test simple value templates render the same as with Jinja."""
+        value = ('{"temp": 21.5, "on": true, "name": " hall ", "none": null, '
+                 '"items": 3, "list": [{"a": 1}], "nested": {"b-c": "d"}}')
+        templates = (
+            '{{ value }}', '{{ value_json.temp }}', '{{value_json.on}}',
+            '{{ value_json.name }}', '{{ value_json.none }}',
+            '{{ value_json["items"] }}',
+            '{{ value_json.list[0].a }}', "{{ value_json.nested['b-c'] }}",
+            '{{ value_json.list }}', '{{ value_json.missing }}',
+            '{{ value_json.list[1] }}',
+        )
+
+        for tpl in templates:
+            self.assertEqual(
+                template.render(self.hass, tpl, {
+                    'value': value, 'value_json': json.loads(value)}),
+                template.render_with_possible_json_value(
+                    self.hass, tpl, value), tpl)
+
+    def test_render_with_possible_json_value_skips_jinja(self):
+        """Test simple value templates do not render with Jinja."""
+        with patch.object(template, 'compile_template') as mock_compile:
+            self.assertEqual(
+                '21.5',
+                template.render_with_possible_json_value(
+                    self.hass, '{{ value_json.sensor.temp }}',
+                    '{"sensor": {"temp": 21.5}}'))
+            self.assertEqual(
+                'on',
+                template.render_with_possible_json_value(
+                    self.hass, '{{ value }}', 'on'))
+
+        self.assertFalse(mock_compile.called)
+
+    def test_render_with_possible_json_value_parses_once(self):
+        """Test the same value is only parsed once."""
+        value = '{"temp": 21.5, "humidity": 40}'
+
+        with patch('homeassistant.helpers.template.json.loads',
+                   side_effect=json.loads) as mock_loads:
+            self.assertEqual('21.5', template.render_with_possible_json_value(
+                self.hass, '{{ value_json.temp }}', value))
+            self.assertEqual('40', template.render_with_possible_json_value(
+                self.hass, '{{ value_json.humidity | int }}', value))
+
+        self.assertEqual(1, mock_loads.call_count)
+
     def test_raise_exception_on_error(self):
         """."""
         with self.assertRaises(TemplateError):
@@ -551,3 +601,76 @@ class TestUtilTemplate(unittest.TestCase):
         """."""
         self.assertEqual('None',
                          template.render(self.hass, '{{ closest(states) }}'))
+
+    def test_extract_entities_references(self):
+        """Test extracting the entities a template reads."""
+        self.assertEqual(
+            ['sensor.temperature', 'switch.kitchen'],
+            template.extract_entities(
+                "{{ states.sensor.temperature.state | float > 20 and "
+                "is_state('switch.kitchen', 'on') }}"))
+
+        self.assertEqual(
+            ['device_tracker.phone'],
+            template.extract_entities(
+                "{{ is_state_attr('device_tracker.phone', 'battery', 40) "
+                "or states('device_tracker.phone') }}"))
+
+    def test_extract_entities_match_all(self):
+        """Test extracting entities from templates that read any state."""
+        self.assertEqual(
+            MATCH_ALL,
+            template.extract_entities(
+                '{% for state in states.sensor %}{{ state.state }}'
+                '{% endfor %}'))
+
+        self.assertEqual(
+            MATCH_ALL,
+            template.extract_entities(
+                '{{ closest(states.zone.home, states) }}'))
+
+        self.assertEqual(
+            MATCH_ALL, template.extract_entities('{{ now.hour }}'))
+
+    def test_template_object(self):
+        """Test rendering a template object repeatedly."""
+        tpl = template.Template('{{ states.test.object.state }}', self.hass)
+
+        self.assertEqual(['test.object'], tpl.extract_entities())
+
+        self.hass.states.set('test.object', 'happy')
+        self.assertEqual('happy', tpl.render())
+
+        self.hass.states.set('test.object', 'sad')
+        self.assertEqual('sad', tpl.render())
+
+    def test_template_object_variables(self):
+        """Test passing variables to a template object."""
+        tpl = template.Template('{{ value }} {{ extra }}', self.hass)
+
+        self.assertEqual('1 2', tpl.render({'value': 1}, extra=2))
+        self.assertEqual('3 4', tpl.render({'value': 3}, extra=4))
+
+    def test_compile_template_cache(self):
+        """Test compiled templates are reused."""
+        compiled = template.compile_template('{{ 1 + 1 }}')
+
+        self.assertIs(compiled, template.compile_template('{{ 1 + 1 }}'))
+        self.assertIsNot(compiled, template.compile_template('{{ 1 + 2 }}'))
+
+    def test_compile_template_cache_size(self):
+        """Test the least recently used template is dropped."""
+        with patch.object(template, 'TEMPLATE_CACHE_SIZE', 2), \
+                patch.object(template, '_COMPILED', template.OrderedDict()):
+            first = template.compile_template('{{ 1 }}')
+            template.compile_template('{{ 2 }}')
+            self.assertIs(first, template.compile_template('{{ 1 }}'))
+
+            template.compile_template('{{ 3 }}')
+            self.assertNotIn('{{ 2 }}', template._COMPILED)
+            self.assertIn('{{ 1 }}', template._COMPILED)
+
+    def test_compile_template_error(self):
+        """Test compiling an invalid template raises TemplateError."""
+        with self.assertRaises(TemplateError):
+            template.compile_template('{{ states.test.object.state ')
@@ -303,3 +303,115 @@ class TestBootstrap:
                 'valid': True
             }
         })
+
+    def test_component_setup_called_once(self):
+        """Test the setup of a component is called exactly once."""
+        mock_setup = mock.MagicMock(return_value=True)
+
+        loader.set_component('comp', MockModule('comp', setup=mock_setup))
+
+        assert bootstrap.setup_component(self.hass, 'comp')
+        assert 1 == mock_setup.call_count
+        assert 'comp' in self.hass.config.component_setup_times
+
+    @mock.patch('homeassistant.config.process_ha_config_upgrade')
+    def test_parallel_setup(self, mock_upgrade):
+        """Test independent components are set up at the same time."""
+        comp_c_setup = threading.Event()
+        result = {}
+
+        def setup_a(hass, config):
+            """Wait for the independent component to be set up."""
+            result['concurrent'] = comp_c_setup.wait(5)
+            return True
+
+        def setup_b(hass, config):
+            """Check the dependency is set up first."""
+            result['dependency'] = 'comp_a' in hass.config.components
+            return True
+
+        def setup_c(hass, config):
+            """Let the other component continue."""
+            comp_c_setup.set()
+            return True
+
+        def setup_d(hass, config):
+            """Check the components not depending on group are set up."""
+            result['group'] = all(
+                comp in hass.config.components
+                for comp in ('comp_a', 'comp_b', 'comp_c'))
+            return True
+
+        loader.set_component('comp_a', MockModule('comp_a', setup=setup_a))
+        loader.set_component(
+            'comp_b', MockModule('comp_b', ['comp_a'], setup=setup_b))
+        loader.set_component('comp_c', MockModule('comp_c', setup=setup_c))
+        loader.set_component(
+            'comp_d', MockModule('comp_d', ['group'], setup=setup_d))
+
+        bootstrap.from_config_dict({
+            'comp_a': None,
+            'comp_b': None,
+            'comp_c': None,
+            'comp_d': None,
+        }, self.hass, enable_log=False, parallel_setup=True)
+
+        assert {
+            'concurrent': True,
+            'dependency': True,
+            'group': True,
+        } == result
+        for comp in ('comp_a', 'comp_b', 'comp_c', 'comp_d', 'group'):
+            assert comp in self.hass.config.components
+            assert comp in self.hass.config.component_setup_times
+
+    def test_components_setting_up_each_other(self):
+        """Test components setting up each other from two threads."""
+        started = {'comp_a': threading.Event(), 'comp_b': threading.Event()}
+
+        def setup_other(domain, other):
+            """Set up the other component once it is setting up too."""
+            def setup(hass, config):
+                started[domain].set()
+                started[other].wait(5)
+                bootstrap.setup_component(hass, other)
+                return True
+            return setup
+
+        loader.set_component('comp_a', MockModule(
+            'comp_a', setup=setup_other('comp_a', 'comp_b')))
+        loader.set_component('comp_b', MockModule(
+            'comp_b', setup=setup_other('comp_b', 'comp_a')))
+
+        threads = [threading.Thread(target=bootstrap.setup_component,
+                                    args=(self.hass, domain))
+                   for domain in ('comp_a', 'comp_b')]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+
+        assert not any(thread.is_alive() for thread in threads)
+        assert 'comp_a' in self.hass.config.components
+        assert 'comp_b' in self.hass.config.components
+
+    @mock.patch('homeassistant.config.process_ha_config_upgrade')
+    def test_parallel_setup_failed_dependency(self, mock_upgrade):
+        """Test components are not set up if a dependency failed."""
+        mock_setup = mock.MagicMock(return_value=True)
+
+        loader.set_component(
+            'comp_a', MockModule('comp_a', setup=lambda hass, config: False))
+        loader.set_component(
+            'comp_b', MockModule('comp_b', ['comp_a'], setup=mock_setup))
+        loader.set_component('comp_c', MockModule('comp_c'))
+
+        bootstrap.from_config_dict({
+            'comp_b': None,
+            'comp_c': None,
+        }, self.hass, enable_log=False, parallel_setup=True)
+
+        assert not mock_setup.called
+        assert 'comp_a' not in self.hass.config.components
+        assert 'comp_b' not in self.hass.config.components
+        assert 'comp_c' in self.hass.config.components
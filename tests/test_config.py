@@ -178,6 +178,8 @@ class TestConfig(unittest.TestCase):
             {'customize': 'bla'},
             {'customize': {'invalid_entity_id': {}}},
             {'customize': {'light.sensor': 100}},
+            {'min_worker_threads': 0},
+            {'min_worker_threads': 5, 'max_worker_threads': 4},
         ):
             with pytest.raises(MultipleInvalid):
                 config_util.CORE_CONFIG_SCHEMA(value)
@@ -187,6 +189,8 @@ class TestConfig(unittest.TestCase):
             'latitude': '-23.45',
             'longitude': '123.45',
             'temperature_unit': 'c',
+            'min_worker_threads': 4,
+            'max_worker_threads': 30,
             'customize': {
                 'sensor.temperature': {
                     'hidden': True,
@@ -270,8 +274,13 @@ class TestConfig(unittest.TestCase):
             'name': 'Huis',
             'temperature_unit': 'F',
             'time_zone': 'America/New_York',
+            'dispatch_per_event': True,
+            'min_worker_threads': 4,
+            'max_worker_threads': 30,
         })
 
+        assert hass.bus.dispatch_per_event is True
+        hass.pool.set_worker_limits.assert_called_once_with(4, 30)
         assert config.latitude == 60
         assert config.longitude == 50
         assert config.elevation == 25
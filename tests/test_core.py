@@ -1,6 +1,7 @@
 """Test to verify that Home Assistant core works."""
 # pylint: disable=protected-access,too-many-public-methods
 # pylint: disable=too-few-public-methods
+import json
 import os
 import signal
 import unittest
@@ -16,13 +17,14 @@ except ImportError:
 import pytz
 
 import homeassistant.core as ha
+import homeassistant.util as util
 from homeassistant.exceptions import (
-    HomeAssistantError, InvalidEntityFormatError)
+    HomeAssistantError, InvalidEntityFormatError, ServiceCallTimeout)
 import homeassistant.util.dt as dt_util
 from homeassistant.const import (
     __version__, EVENT_HOMEASSISTANT_START, EVENT_HOMEASSISTANT_STOP,
     EVENT_STATE_CHANGED, ATTR_FRIENDLY_NAME, TEMP_CELSIUS,
-    TEMP_FAHRENHEIT)
+    TEMP_FAHRENHEIT, MATCH_ALL, ATTR_NOW, EVENT_TIME_CHANGED)
 
 from tests.common import get_test_home_assistant
 
@@ -184,6 +186,127 @@ class TestEventBus(unittest.TestCase):
         self.bus._pool.block_till_done()
         self.assertEqual(1, len(runs))
 
+    def test_dispatch_per_event(self):
+        """Test that one job is queued per event in dispatch_per_event."""
+        self.bus.dispatch_per_event = True
+        runs = []
+
+        def failing_listener(event):
+            """Raise to verify the other listeners still run."""
+            raise ValueError()
+
+        self.bus.listen(MATCH_ALL, lambda event: runs.append('all'))
+        self.bus.listen('test_event', failing_listener)
+        self.bus.listen('test_event', lambda event: runs.append('test'))
+
+        with mock.patch.object(self.bus._pool, 'add_job',
+                               wraps=self.bus._pool.add_job) as mock_add_job:
+            self.bus.fire('test_event')
+
+        self.assertEqual(1, mock_add_job.call_count)
+
+        self.bus._pool.add_worker()
+        self.bus._pool.block_till_done()
+        self.assertEqual(['all', 'test'], runs)
+
+    def test_listen_state(self):
+        """Test listening for state changes of a specific entity."""
+        self.bus._pool.add_worker()
+        old_count = self.bus.listeners.get(EVENT_STATE_CHANGED, 0)
+        runs = []
+
+        def listener(event):
+            """Record state changed events."""
+            runs.append(event.data['entity_id'])
+
+        self.bus.listen_state('light.Kitchen', listener)
+        self.bus.listen_state('light.bowl', listener)
+        self.assertEqual(old_count + 2,
+                         self.bus.listeners[EVENT_STATE_CHANGED])
+
+        self.bus.fire(EVENT_STATE_CHANGED, {'entity_id': 'light.kitchen'})
+        self.bus.fire(EVENT_STATE_CHANGED, {'entity_id': 'light.other'})
+        self.bus._pool.block_till_done()
+        self.assertEqual(['light.kitchen'], runs)
+
+        self.bus.remove_listener(EVENT_STATE_CHANGED, listener)
+        self.assertEqual(old_count,
+                         self.bus.listeners.get(EVENT_STATE_CHANGED, 0))
+
+        self.bus.fire(EVENT_STATE_CHANGED, {'entity_id': 'light.bowl'})
+        self.bus._pool.block_till_done()
+        self.assertEqual(['light.kitchen'], runs)
+
+    def test_remove_state_listener_registered_twice(self):
+        """Test removing a state listener removes every registration."""
+        self.bus._pool.add_worker()
+        runs = []
+
+        def listener(event):
+            """Record state changed events."""
+            runs.append(event.data['entity_id'])
+
+        self.bus.listen_state('light.kitchen', listener)
+        self.bus.listen_state('light.kitchen', listener)
+        self.bus.remove_listener(EVENT_STATE_CHANGED, listener)
+
+        self.bus.fire(EVENT_STATE_CHANGED, {'entity_id': 'light.kitchen'})
+        self.bus._pool.block_till_done()
+        self.assertEqual([], runs)
+
+    def test_state_changes_in_order(self):
+        """Test listeners get the state changes of an entity in order."""
+        for _ in range(4):
+            self.bus._pool.add_worker()
+        states = []
+
+        def listener(event):
+            """Record the new states of the entity."""
+            time.sleep(0.001)
+            states.append(event.data['new_state'])
+
+        self.bus.listen(EVENT_STATE_CHANGED, listener)
+
+        for idx in range(20):
+            self.bus.fire(EVENT_STATE_CHANGED,
+                          {'entity_id': 'light.kitchen', 'new_state': idx})
+
+        self.bus._pool.block_till_done()
+        self.assertEqual(list(range(20)), states)
+
+    def test_fire_uses_listener_snapshot(self):
+        """Test that an event goes to the listeners at the time of firing."""
+        self.bus.dispatch_per_event = True
+        runs = []
+        remove_second = []
+
+        def second(event):
+            """Record the call."""
+            runs.append('second')
+
+        def first(event):
+            """Record the call and remove the second listener if asked."""
+            runs.append('first')
+
+            if remove_second:
+                self.bus.remove_listener('snapshot_event', second)
+
+        self.bus.listen('snapshot_event', first)
+        self.bus.fire('snapshot_event')
+
+        # Added before the job of the fired event runs
+        self.bus.listen('snapshot_event', second)
+
+        self.bus._pool.add_worker()
+        self.bus._pool.block_till_done()
+        self.assertEqual(['first'], runs)
+
+        # Removed while the listeners of the event are being called
+        remove_second.append(True)
+        self.bus.fire('snapshot_event')
+        self.bus._pool.block_till_done()
+        self.assertEqual(['first', 'first', 'second'], runs)
+
 
 class TestState(unittest.TestCase):
     """Test State methods."""
@@ -221,6 +344,20 @@ class TestState(unittest.TestCase):
         state = ha.State('domain.hello', 'world', {'some': 'attr'})
         self.assertEqual(state, ha.State.from_dict(state.as_dict()))
 
+    def test_as_json(self):
+        """Test that the JSON of a state is kept."""
+        now = dt_util.utcnow()
+        state = ha.State('domain.hello', 'world', {'some': 'attr'}, now, now)
+
+        self.assertEqual({
+            'entity_id': 'domain.hello',
+            'state': 'world',
+            'attributes': {'some': 'attr'},
+            'last_changed': now.isoformat(),
+            'last_updated': now.isoformat(),
+        }, json.loads(state.as_json()))
+        self.assertIs(state.as_json(), state.as_json())
+
     def test_dict_conversion_with_wrong_data(self):
         """Test conversion with wrong data."""
         self.assertIsNone(ha.State.from_dict(None))
@@ -313,6 +450,37 @@ class TestStateMachine(unittest.TestCase):
         self.pool.block_till_done()
         self.assertEqual(1, len(events))
 
+    def test_set_keeps_unchanged_attributes(self):
+        """Test that a new state shares attributes that did not change."""
+        self.states.set('light.Bowl', 'on', {'brightness': 100})
+        old_state = self.states.get('light.Bowl')
+
+        self.states.set('light.Bowl', 'off', {'brightness': 100})
+        new_state = self.states.get('light.Bowl')
+
+        self.assertEqual('off', new_state.state)
+        self.assertIs(old_state.attributes, new_state.attributes)
+        self.assertEqual('light', new_state.domain)
+        self.assertEqual('bowl', new_state.object_id)
+
+        self.states.set('light.Bowl', 'off', {'brightness': 50})
+
+        self.assertEqual({'brightness': 50},
+                         self.states.get('light.Bowl').attributes)
+
+    def test_set_validates_new_entity_ids_only(self):
+        """Test that entity ids are validated when first set."""
+        with mock.patch('homeassistant.core.valid_entity_id',
+                        return_value=True) as mock_valid:
+            self.states.set('light.Bowl', 'off')
+            self.states.set('light.Ceiling', 'off')
+
+        self.assertEqual([mock.call('light.ceiling')],
+                         mock_valid.mock_calls)
+
+        self.assertRaises(InvalidEntityFormatError, self.states.set,
+                          'invalid_entity_format', 'on')
+
     def test_case_insensitivty(self):
         """Test insensitivty."""
         self.pool.add_worker()
@@ -352,6 +520,142 @@ class TestStateMachine(unittest.TestCase):
         self.bus._pool.block_till_done()
         self.assertEqual(1, len(events))
 
+    def test_revision(self):
+        """Test every change gets the next revision."""
+        self.pool.add_worker()
+        events = []
+        self.bus.listen(EVENT_STATE_CHANGED, events.append)
+        revision = self.states.revision
+
+        self.states.set('light.bowl', 'on')
+        self.assertEqual(revision, self.states.revision)
+
+        self.states.set('light.bowl', 'off')
+        self.states.remove('switch.ac')
+        self.bus._pool.block_till_done()
+
+        self.assertEqual(revision + 2, self.states.revision)
+        self.assertEqual([revision + 1, revision + 2],
+                         sorted(event.data['revision'] for event in events))
+
+    def test_changes_since(self):
+        """Test getting the changes since a revision."""
+        run_id = self.states.run_id
+        revision = self.states.revision
+
+        self.assertEqual((revision, [], []),
+                         self.states.changes_since(revision, run_id))
+
+        self.states.set('light.bowl', 'off')
+        self.states.remove('switch.ac')
+        self.states.set('light.kitchen', 'on')
+
+        changed_revision, states, removed = \
+            self.states.changes_since(revision, run_id)
+
+        self.assertEqual(revision + 3, changed_revision)
+        self.assertEqual(['light.bowl', 'light.kitchen'],
+                         sorted(state.entity_id for state in states))
+        self.assertEqual(['switch.ac'], removed)
+
+        self.assertEqual(
+            (revision + 3, [self.states.get('light.kitchen')], []),
+            self.states.changes_since(revision + 2, run_id))
+
+        self.states.set('switch.ac', 'on')
+
+        self.assertEqual(
+            (revision + 4, [self.states.get('switch.ac')], []),
+            self.states.changes_since(revision + 3, run_id))
+
+    def test_changes_since_unknown(self):
+        """Test changes since revisions the state machine does not know."""
+        run_id = self.states.run_id
+        self.assertIsNone(self.states.changes_since(-1, run_id))
+        self.assertIsNone(
+            self.states.changes_since(self.states.revision, 'previous run'))
+        self.assertIsNone(
+            self.states.changes_since(self.states.revision + 1, run_id))
+
+    def test_changes_since_forgets_removed_states(self):
+        """Test removed entities are only remembered up to a limit."""
+        run_id = self.states.run_id
+        revision = self.states.revision
+
+        with mock.patch('homeassistant.core.MAX_REMOVED_STATES', 1):
+            self.states.remove('light.bowl')
+            self.assertEqual(
+                (revision + 1, [], ['light.bowl']),
+                self.states.changes_since(revision, run_id))
+
+            self.states.remove('switch.ac')
+
+        self.assertIsNone(self.states.changes_since(revision, run_id))
+        self.assertEqual((revision + 2, [], ['switch.ac']),
+                         self.states.changes_since(revision + 1, run_id))
+
+
+class TestScheduler(unittest.TestCase):
+    """Test Scheduler methods."""
+
+    def setUp(self):     # pylint: disable=invalid-name
+        """Setup things to be run when tests are started."""
+        self.pool = ha.create_worker_pool(1)
+        self.bus = ha.EventBus(self.pool)
+        self.scheduler = ha.Scheduler(self.bus, self.pool)
+        self.now = datetime(2016, 7, 9, 12, 0, 0, tzinfo=dt_util.UTC)
+
+    def tearDown(self):  # pylint: disable=invalid-name
+        """Stop down stuff we started."""
+        self.pool.stop()
+
+    def _tick(self, seconds):
+        """Fire a time changed event seconds after self.now."""
+        self.bus.fire(EVENT_TIME_CHANGED,
+                      {ATTR_NOW: self.now + timedelta(seconds=seconds)})
+        self.pool.block_till_done()
+
+    def test_schedule_calls_once_in_order(self):
+        """Test that actions are called once when their time has passed."""
+        runs = []
+
+        self.scheduler.schedule(self.now + timedelta(seconds=2),
+                                lambda now: runs.append(2))
+        self.scheduler.schedule(self.now + timedelta(seconds=1),
+                                lambda now: runs.append(1))
+        self.assertEqual(2, self.scheduler.pending)
+
+        self._tick(0)
+        self.assertEqual([], runs)
+
+        self._tick(1)
+        self.assertEqual([1], runs)
+
+        self._tick(5)
+        self._tick(6)
+        self.assertEqual([1, 2], runs)
+        self.assertEqual(0, self.scheduler.pending)
+
+    def test_cancel(self):
+        """Test that cancelled actions are not called."""
+        runs = []
+
+        handles = [self.scheduler.schedule(self.now + timedelta(seconds=1),
+                                           lambda now: runs.append(1))
+                   for _ in range(3)]
+
+        self.assertTrue(self.scheduler.cancel(handles[0]))
+        self.assertFalse(self.scheduler.cancel(handles[0]))
+        self.assertTrue(self.scheduler.cancel(handles[1]))
+        self.assertEqual(1, self.scheduler.pending)
+
+        self._tick(1)
+        self.assertEqual([1], runs)
+
+        # Already called
+        self.assertFalse(self.scheduler.cancel(handles[2]))
+        self.assertEqual(0, self.scheduler.pending)
+
 
 class TestServiceCall(unittest.TestCase):
     """Test ServiceCall class."""
@@ -433,6 +737,81 @@ class TestServiceRegistry(unittest.TestCase):
             self.services.call('test_domain', 'i_do_not_exist', blocking=True))
         ha.SERVICE_CALL_LIMIT = orig_limit
 
+    def test_call_returns_result(self):
+        """Test a call can return what the service returned."""
+        self.pool.add_worker()
+        self.services.register("test_domain", "answer", lambda call: 42)
+        self.services.register("test_domain", "refuse", lambda call: False)
+
+        self.assertEqual(42, self.services.call(
+            'test_domain', 'answer', return_result=True))
+        self.assertFalse(self.services.call(
+            'test_domain', 'refuse', return_result=True))
+        self.assertTrue(
+            self.services.call('test_domain', 'refuse', blocking=True))
+
+    def test_call_returns_result_not_done_in_time(self):
+        """Test a call for the result raises if it is not done in time."""
+        with mock.patch('homeassistant.core.SERVICE_CALL_LIMIT', 0.01):
+            with self.assertRaises(ServiceCallTimeout):
+                self.services.call('test_domain', 'test_service',
+                                   return_result=True)
+
+    def test_call_with_blocking_service_raises(self):
+        """Test a blocking call logs the exception of the service."""
+        self.pool.add_worker()
+        executed = []
+        self.bus.listen(ha.EVENT_SERVICE_EXECUTED, executed.append)
+
+        def fail(call):
+            """Service that fails."""
+            raise ValueError('fail')
+
+        self.services.register("test_domain", "fail", fail)
+
+        with mock.patch('homeassistant.core._LOGGER.error') as mock_error:
+            self.assertFalse(
+                self.services.call('test_domain', 'fail', blocking=True))
+        self.assertEqual(1, mock_error.call_count)
+
+        with self.assertRaises(ValueError):
+            self.services.call('test_domain', 'fail', return_result=True)
+
+        self.pool.block_till_done()
+        self.assertEqual(2, len(executed))
+
+    def test_call_with_blocking_no_listener_per_call(self):
+        """Test blocking calls do not add service executed listeners."""
+        self.pool.add_worker()
+        listeners = self.bus.listeners
+
+        for _ in range(3):
+            self.assertTrue(self.services.call(
+                'test_domain', 'test_service', blocking=True))
+
+        self.assertEqual(listeners, self.bus.listeners)
+        self.assertEqual({}, self.services._pending)
+
+    def test_call_with_blocking_executed_elsewhere(self):
+        """Test a blocking call completes on an executed event."""
+        self.pool.add_worker()
+        self.pool.add_worker()
+
+        other_bus = ha.EventBus(self.pool)
+        other = ha.ServiceRegistry(other_bus, self.pool)
+        other.register('other_domain', 'other_service', lambda call: 42)
+
+        def forward_executed(event):
+            """Forward the executed event back."""
+            self.bus.fire(ha.EVENT_SERVICE_EXECUTED, event.data)
+
+        self.bus.listen(ha.EVENT_CALL_SERVICE, lambda event: (
+            other._event_to_service_call(event)))
+        other_bus.listen(ha.EVENT_SERVICE_EXECUTED, forward_executed)
+
+        self.assertTrue(self.services.call(
+            'other_domain', 'other_service', blocking=True))
+
 
 class TestConfig(unittest.TestCase):
     """Test configuration methods."""
@@ -541,3 +920,74 @@ class TestWorkerPool(unittest.TestCase):
         pool.add_job(ha.JobPriority.EVENT_DEFAULT, (register_call, None))
         pool.block_till_done()
         self.assertEqual(1, len(calls))
+
+    def test_scale_up_when_jobs_wait(self):
+        """Test that a worker is added when jobs wait too long."""
+        with mock.patch.object(util, 'POOL_SCALE_UP_LATENCY', -1):
+            pool = ha.create_worker_pool(1, max_worker_count=3)
+            running = threading.Event()
+
+            for _ in range(5):
+                pool.add_job(ha.JobPriority.EVENT_DEFAULT,
+                             (lambda _: running.wait(1), None))
+
+            running.set()
+            pool.block_till_done()
+
+        self.assertEqual(3, pool.worker_count)
+        self.assertEqual(1, pool.min_worker_count)
+        pool.stop()
+
+    def test_scale_down_when_idle(self):
+        """Test that added workers are removed again when idle."""
+        with mock.patch.object(util, 'POOL_SCALE_UP_LATENCY', -1), \
+                mock.patch.object(util, 'POOL_IDLE_TIMEOUT', 0.01):
+            pool = ha.create_worker_pool(1, max_worker_count=3)
+
+            for _ in range(3):
+                pool.add_job(ha.JobPriority.EVENT_DEFAULT,
+                             (lambda _: time.sleep(0.05), None))
+
+            pool.block_till_done()
+
+            for _ in range(50):
+                if pool.worker_count == 1:
+                    break
+                time.sleep(0.02)
+
+        self.assertEqual(1, pool.worker_count)
+        pool.stop()
+
+    def test_job_timings(self):
+        """Test the wall time of jobs is recorded by job name."""
+        pool = ha.create_worker_pool(1)
+        bus = ha.EventBus(pool)
+        services = ha.ServiceRegistry(bus, pool)
+        services.register('test_domain', 'test_service', lambda call: None)
+
+        services.call('test_domain', 'test_service', blocking=True)
+        pool.block_till_done()
+        pool.stop()
+
+        timings = pool.timings.as_dict()
+        self.assertEqual(
+            1, timings['service test_domain.test_service']['count'])
+        self.assertEqual(
+            1, timings['homeassistant.core.ServiceRegistry.'
+                       '_event_to_service_call']['count'])
+        self.assertEqual(
+            {'<0.01s': 1, '<0.1s': 0, '<1s': 0, '<10s': 0, '>=10s': 0},
+            timings['service test_domain.test_service']['histogram'])
+
+    def test_dispatch_job_timings(self):
+        """Test per event dispatch jobs are timed by their event type."""
+        pool = ha.create_worker_pool(1)
+        bus = ha.EventBus(pool, dispatch_per_event=True)
+        bus.listen('test_event', lambda event: None)
+
+        bus.fire('test_event')
+        pool.block_till_done()
+        pool.stop()
+
+        self.assertEqual(
+            1, pool.timings.as_dict()['dispatch test_event']['count'])
@@ -1,11 +1,18 @@
 """Test to verify that we can load components."""
 # pylint: disable=too-many-public-methods,protected-access
+import json
+import os
+import shutil
+import sys
+import tempfile
 import unittest
+from unittest import mock
 
 import homeassistant.loader as loader
 import homeassistant.components.http as http
 
-from tests.common import get_test_home_assistant, MockModule
+from tests.common import (
+    get_test_config_dir, get_test_home_assistant, MockModule)
 
 
 class TestLoader(unittest.TestCase):
@@ -82,3 +89,93 @@ class TestLoader(unittest.TestCase):
         self.assertEqual(
             ['group', 'mod2'],
             loader.load_order_components(['mod2', 'mod1']))
+
+
+class TestComponentManifest(unittest.TestCase):
+    """Test the component manifest of the loader."""
+
+    def setUp(self):  # pylint: disable=invalid-name
+        """Setup tests."""
+        self.hass = get_test_home_assistant()
+        self.config_dir = tempfile.mkdtemp()
+        self.custom_dir = os.path.join(self.config_dir, 'custom_components')
+        os.makedirs(os.path.join(self.custom_dir, 'manifest_switch'))
+
+        self._write('manifest_comp.py',
+                    "DEPENDENCIES = ['manifest_dep']\n"
+                    "REQUIREMENTS = ['package==1.0']\n"
+                    "raise ImportError('should not be imported')\n")
+        self._write('manifest_dep.py', '')
+        self._write(os.path.join('manifest_switch', 'wemo.py'), '')
+
+        self.hass.config.config_dir = self.config_dir
+        loader.prepare(self.hass)
+
+    def tearDown(self):  # pylint: disable=invalid-name
+        """Stop everything that was started."""
+        self.hass.stop()
+        shutil.rmtree(self.config_dir)
+        sys.path.remove(self.config_dir)
+
+        # Restore the components of the test config dir
+        self.hass.config.config_dir = get_test_config_dir()
+        loader.prepare(self.hass)
+
+    def _write(self, name, content):
+        """Write a file to the custom components dir."""
+        with open(os.path.join(self.custom_dir, name), 'w') as fil:
+            fil.write(content)
+
+    def _manifest(self):
+        """Return the components in the written manifest."""
+        with open(os.path.join(self.config_dir, loader.MANIFEST_FILE)) as fil:
+            dirs = json.load(fil)['dirs']
+
+        return dirs[self.custom_dir]['components']
+
+    def test_manifest_written(self):
+        """Test the manifest holds the custom components."""
+        components = self._manifest()
+
+        self.assertEqual(['manifest_dep'], components[
+            'custom_components.manifest_comp']['dependencies'])
+        self.assertEqual(['package==1.0'], components[
+            'custom_components.manifest_comp']['requirements'])
+        self.assertEqual(['wemo'], components[
+            'custom_components.manifest_switch']['platforms'])
+        self.assertIsNone(
+            components['custom_components.manifest_switch']['path'])
+        self.assertIn('homeassistant.components.http',
+                      loader.AVAILABLE_COMPONENTS)
+
+    def test_load_order_without_import(self):
+        """Test the load order is resolved without importing."""
+        with mock.patch('importlib.import_module') as mock_import:
+            self.assertEqual(
+                ['manifest_dep', 'manifest_comp'],
+                list(loader.load_order_component('manifest_comp')))
+
+        self.assertFalse(mock_import.called)
+
+    def test_missing_platform_not_imported(self):
+        """Test platforms the manifest does not list are not imported."""
+        self.assertEqual(['custom_components.manifest_switch.wemo'],
+                         loader._potential_paths('manifest_switch.wemo'))
+        self.assertEqual([], loader._potential_paths('manifest_switch.demo'))
+        self.assertEqual([], loader._potential_paths('manifest_switch'))
+
+    def test_changed_component_rescanned(self):
+        """Test a changed component is scanned again."""
+        path = os.path.join(self.custom_dir, 'manifest_dep.py')
+        self._write('manifest_dep.py', "DEPENDENCIES = ['http']\n")
+        os.utime(path, (0, 0))
+        self._write('new_comp.py', '')
+
+        loader.prepare(self.hass)
+
+        components = self._manifest()
+        self.assertEqual(['http'], components[
+            'custom_components.manifest_dep']['dependencies'])
+        self.assertIn('custom_components.new_comp', components)
+        self.assertIn('custom_components.new_comp',
+                      loader.AVAILABLE_COMPONENTS)
@@ -1,7 +1,10 @@
 """Test Home Assistant remote methods and classes."""
 # pylint: disable=protected-access,too-many-public-methods
+import json
+import threading
 import time
 import unittest
+from unittest import mock
 
 import homeassistant.core as ha
 import homeassistant.bootstrap as bootstrap
@@ -29,6 +32,13 @@ def _url(path=""):
     return HTTP_BASE_URL + path
 
 
+def _block_till_forwarded():
+    """Block till the master forwarded its events to the slave."""
+    hass.pool.block_till_done()
+    hass.wsgi.views['api:event-forward'].event_forwarder.block_till_done()
+    slave.pool.block_till_done()
+
+
 def setUpModule():   # pylint: disable=invalid-name
     """Initalization of a Home Assistant server and Slave instance."""
     global hass, slave, master_api
@@ -215,6 +225,20 @@ class TestRemoteMethods(unittest.TestCase):
         now = dt_util.utcnow()
         self.assertEqual(now.isoformat(), ha_json_enc.default(now))
 
+    def test_json_dumps(self):
+        """Test that states are serialized with their kept JSON."""
+        state = hass.states.get('test.test')
+        data = {'revision': 1, 'states': [state], 'removed': []}
+
+        self.assertEqual(
+            json.dumps(data, sort_keys=True, cls=remote.JSONEncoder),
+            remote.json_dumps(data))
+
+        with mock.patch.object(ha.State, 'as_dict') as mock_as_dict:
+            remote.json_dumps([state])
+
+        self.assertFalse(mock_as_dict.called)
+
 
 class TestRemoteClasses(unittest.TestCase):
     """Test the homeassistant.remote module."""
@@ -248,7 +272,7 @@ class TestRemoteClasses(unittest.TestCase):
         # Wait till slave tells master
         slave.pool.block_till_done()
         # Wait till master gives updated state
-        hass.pool.block_till_done()
+        _block_till_forwarded()
 
         self.assertEqual("remote.statemachine test",
                          slave.states.get("remote.test").state)
@@ -256,25 +280,25 @@ class TestRemoteClasses(unittest.TestCase):
     def test_statemachine_remove_from_master(self):
         """Remove statemachine from master."""
         hass.states.set("remote.master_remove", "remove me!")
-        hass.pool.block_till_done()
+        _block_till_forwarded()
 
         self.assertIn('remote.master_remove', slave.states.entity_ids())
 
         hass.states.remove("remote.master_remove")
-        hass.pool.block_till_done()
+        _block_till_forwarded()
 
         self.assertNotIn('remote.master_remove', slave.states.entity_ids())
 
     def test_statemachine_remove_from_slave(self):
         """Remove statemachine from slave."""
         hass.states.set("remote.slave_remove", "remove me!")
-        hass.pool.block_till_done()
+        _block_till_forwarded()
 
         self.assertIn('remote.slave_remove', slave.states.entity_ids())
 
         self.assertTrue(slave.states.remove("remote.slave_remove"))
         slave.pool.block_till_done()
-        hass.pool.block_till_done()
+        _block_till_forwarded()
 
         self.assertNotIn('remote.slave_remove', slave.states.entity_ids())
 
@@ -292,6 +316,169 @@ class TestRemoteClasses(unittest.TestCase):
         # Wait till slave tells master
         slave.pool.block_till_done()
         # Wait till master gives updated event
-        hass.pool.block_till_done()
+        _block_till_forwarded()
 
         self.assertEqual(1, len(test_value))
+
+
+class TestEventForwarder(unittest.TestCase):
+    """Test forwarding events in batches."""
+
+    def setUp(self):  # pylint: disable=invalid-name
+        """Setup things to be run when tests are started."""
+        self.hass = get_test_home_assistant()
+        self.api = mock.Mock(host='127.0.0.1', port=8123)
+        self.api.return_value.status_code = 200
+        self.forwarder = remote.EventForwarder(self.hass)
+        self.forwarder.connect(self.api)
+
+    def tearDown(self):  # pylint: disable=invalid-name
+        """Stop everything that was started."""
+        self.forwarder.disconnect(self.api)
+        self.hass.stop()
+
+    def sent_events(self):
+        """Return the event types sent per batch."""
+        return [[event['event_type'] for event in call[0][2]]
+                for call in self.api.call_args_list]
+
+    def test_forward_batch(self):
+        """Test queued events are sent in one request."""
+        target = self.forwarder._targets[('127.0.0.1', 8123)]
+
+        with mock.patch.object(target, '_send',
+                               wraps=target._send) as mock_send:
+            for idx in range(3):
+                target.put(ha.Event('test_event_{}'.format(idx)))
+
+            target.block_till_done()
+
+        self.assertEqual(
+            ['test_event_0', 'test_event_1', 'test_event_2'],
+            [event for batch in self.sent_events() for event in batch])
+        self.assertLessEqual(mock_send.call_count, 3)
+        self.assertEqual(3, target.sent)
+        self.assertEqual(mock_send.call_count, target.batches)
+        self.assertEqual(remote.URL_API_EVENT_BATCH,
+                         self.api.call_args[0][1])
+
+    def test_forward_listens_to_bus(self):
+        """Test events fired on the bus are forwarded."""
+        self.hass.bus.fire('test_event', {'hello': 'world'})
+        self.hass.bus.fire(ha.EVENT_TIME_CHANGED, {'now': 1})
+        self.hass.pool.block_till_done()
+        self.forwarder.block_till_done()
+
+        self.assertEqual([['test_event']], self.sent_events())
+        self.assertEqual({'hello': 'world'},
+                         self.api.call_args[0][2][0]['event_data'])
+
+    @mock.patch.object(remote, 'FORWARD_QUEUE_SIZE', 2)
+    def test_forward_drops_when_full(self):
+        """Test events are dropped when the target does not keep up."""
+        sending = threading.Event()
+        proceed = threading.Event()
+
+        def slow_call(*args, **kwargs):
+            """Block the forwarding thread."""
+            sending.set()
+            proceed.wait()
+            return mock.Mock(status_code=200)
+
+        self.api.side_effect = slow_call
+        target = remote.ForwardTarget(self.api)
+        target.put(ha.Event('test_event'))
+        sending.wait()
+
+        for _ in range(7):
+            target.put(ha.Event('test_event'))
+
+        self.assertEqual(5, target.dropped)
+        self.assertEqual(2, target.as_dict()['queued'])
+
+        proceed.set()
+        target.block_till_done()
+        target.stop()
+        self.assertEqual(3, target.sent)
+
+    def test_forward_falls_back_to_single_events(self):
+        """Test targets without the batch endpoint get single events."""
+        target = self.forwarder._targets[('127.0.0.1', 8123)]
+        self.api.return_value.status_code = 404
+
+        target.put(ha.Event('test_event', {'hello': 'world'}))
+        target.block_till_done()
+
+        self.assertFalse(target.batch_supported)
+        self.assertEqual(
+            (remote.METHOD_POST,
+             remote.URL_API_EVENTS_EVENT.format('test_event'),
+             {'hello': 'world'}),
+            self.api.call_args[0])
+        self.assertIs(target._session, self.api.call_args[1]['session'])
+        # The target answered 404 to the single event too
+        self.assertEqual(0, target.sent)
+        self.assertEqual(1, target.failed)
+
+        self.api.return_value.status_code = 200
+        target.put(ha.Event('test_event'))
+        target.block_till_done()
+
+        self.assertEqual(1, target.sent)
+
+        self.api.side_effect = remote.HomeAssistantError
+        target.put(ha.Event('test_event'))
+        target.block_till_done()
+
+        self.assertEqual(1, target.sent)
+        self.assertEqual(2, target.failed)
+
+    def test_forward_metrics(self):
+        """Test the metrics of the targets."""
+        self.api.side_effect = remote.HomeAssistantError
+        target = self.forwarder._targets[('127.0.0.1', 8123)]
+        target.put(ha.Event('test_event'))
+        target.block_till_done()
+
+        metrics = self.forwarder.as_dict()['127.0.0.1:8123']
+        self.assertEqual(1, metrics['failed'])
+        self.assertEqual(0, metrics['sent'])
+        self.assertEqual(0, metrics['queued'])
+
+
+class TestRemoteStateMachine(unittest.TestCase):
+    """Test syncing the remote state machine."""
+
+    def setUp(self):  # pylint: disable=invalid-name
+        """Setup things to be run when tests are started."""
+        self.bus = mock.Mock()
+        self.api = mock.Mock()
+
+    @mock.patch('homeassistant.remote.get_state_changes')
+    def test_mirror_changes(self, mock_changes):
+        """Test only the changes are applied after the first sync."""
+        mock_changes.return_value = (
+            10, True, [ha.State('light.kitchen', 'on'),
+                       ha.State('light.hall', 'on')], [])
+        states = remote.StateMachine(self.bus, self.api)
+
+        self.assertEqual(10, states.remote_revision)
+        self.assertEqual((self.api, None), mock_changes.call_args[0])
+
+        mock_changes.return_value = (
+            12, False, [ha.State('light.kitchen', 'off')], ['light.hall'])
+        states.mirror()
+
+        self.assertEqual(12, states.remote_revision)
+        self.assertEqual((self.api, 10), mock_changes.call_args[0])
+        self.assertEqual([ha.State('light.kitchen', 'off')], states.all())
+
+    @mock.patch('homeassistant.remote.get_states',
+                return_value=[ha.State('light.kitchen', 'on')])
+    @mock.patch('homeassistant.remote.get_state_changes', return_value=None)
+    def test_mirror_without_revisions(self, mock_changes, mock_states):
+        """Test all states are copied if the API has no revisions."""
+        states = remote.StateMachine(self.bus, self.api)
+
+        self.assertIsNone(states.remote_revision)
+        self.assertEqual([ha.State('light.kitchen', 'on')], states.all())
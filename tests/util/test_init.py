@@ -1,5 +1,8 @@
 """Test Home Assistant util methods."""
 # pylint: disable=too-many-public-methods
+import collections
+import threading
+import time
 import unittest
 try:
     from unittest.mock import patch
@@ -262,3 +265,104 @@ class TestUtil(unittest.TestCase):
 
         self.assertTrue(tester.hello())
         self.assertTrue(tester.goodbye())
+
+    def test_job_timings(self):
+        """Test job timing histograms."""
+        timings = util.JobTimings((0.1, 1))
+        timings.add('fast', 0.05)
+        timings.add('fast', 0.05)
+        timings.add('slow', 0.5)
+        timings.add('slow', 5)
+
+        self.assertEqual({
+            'fast': {'count': 2, 'total': 0.1, 'max': 0.05,
+                     'histogram': {'<0.1s': 2, '<1s': 0, '>=1s': 0}},
+            'slow': {'count': 2, 'total': 5.5, 'max': 5,
+                     'histogram': {'<0.1s': 0, '<1s': 1, '>=1s': 1}},
+        }, timings.as_dict())
+        self.assertEqual(['slow'],
+                         [name for name, _ in timings.slowest(1)])
+
+    def test_priority_queue_item_order(self):
+        """Test items with the same priority are first in, first out."""
+        items = [util.PriorityQueueItem(priority, idx)
+                 for idx, priority in enumerate((2, 1, 2, 1, 2))]
+
+        self.assertEqual([1, 3, 0, 2, 4],
+                         [item.item for item in sorted(items)])
+
+    def test_thread_pool_lanes(self):
+        """Test jobs with the same key run one at a time and in order."""
+        lock = threading.Lock()
+        running = collections.Counter()
+        overlaps = []
+        done = collections.defaultdict(list)
+
+        def handler(job):
+            """Record if another job with the same key is running."""
+            key, idx = job
+            with lock:
+                running[key] += 1
+                if running[key] > 1:
+                    overlaps.append(job)
+            time.sleep(0.001)
+            with lock:
+                running[key] -= 1
+                done[key].append(idx)
+
+        pool = util.ThreadPool(handler, 4)
+
+        for idx in range(50):
+            for key in ('a', 'b'):
+                pool.add_job(0, (key, idx), key)
+
+        pool.block_till_done()
+        self.assertEqual(0, pool.queue_size)
+        pool.stop()
+
+        self.assertEqual([], overlaps)
+        self.assertEqual(list(range(50)), done['a'])
+        self.assertEqual(list(range(50)), done['b'])
+
+    def test_thread_pool_lane_wait_does_not_scale_up(self):
+        """Test waiting for a job with the same key does not add workers."""
+        pool = util.ThreadPool(lambda job: time.sleep(0.05), 1,
+                               max_worker_count=5)
+
+        with patch.object(util, 'POOL_SCALE_UP_LATENCY', 0.02):
+            for idx in range(3):
+                pool.add_job(0, idx, 'key')
+
+            pool.block_till_done()
+
+        self.assertEqual(1, pool.worker_count)
+        pool.stop()
+
+    def test_thread_pool_job_names(self):
+        """Test jobs are timed by their name or by the job_name method."""
+        pool = util.ThreadPool(lambda job: None, 1,
+                               job_name=lambda job: 'generic')
+
+        pool.add_job(0, 'job')
+        pool.add_job(0, 'job', name='named')
+        pool.block_till_done()
+        pool.stop()
+
+        timings = pool.timings.as_dict()
+        self.assertEqual(1, timings['generic']['count'])
+        self.assertEqual(1, timings['named']['count'])
+
+    def test_thread_pool_worker_limits(self):
+        """Test changing the number of workers of a pool."""
+        pool = util.ThreadPool(lambda job: None, 2, max_worker_count=10)
+
+        pool.set_worker_limits(4, 20)
+        self.assertEqual(4, pool.worker_count)
+        self.assertEqual(4, pool.min_worker_count)
+        self.assertEqual(20, pool.max_worker_count)
+
+        pool.set_worker_limits(1)
+        self.assertEqual(1, pool.worker_count)
+        self.assertEqual(20, pool.max_worker_count)
+
+        pool.stop()
@@ -0,0 +1,71 @@
+"""Test Home Assistant startup profile utility functions."""
+import json
+import os
+import tempfile
+import unittest
+
+from homeassistant.util import profile
+
+
+class TestProfile(unittest.TestCase):
+    """Test util.profile methods."""
+
+    def tearDown(self):  # pylint: disable=invalid-name
+        """Stop profiling."""
+        profile.stop()
+
+    def test_timed_not_profiling(self):
+        """Test timed does nothing if not profiling."""
+        with profile.timed('import', 'comp'):
+            pass
+
+        profile.mark('started')
+        self.assertIsNone(profile.ACTIVE)
+
+    def test_timed(self):
+        """Test timed adds up the time spent per name."""
+        startup_profile = profile.start()
+
+        with profile.timed('import', 'comp'):
+            pass
+
+        with self.assertRaises(ValueError):
+            with profile.timed('import', 'comp'):
+                raise ValueError()
+
+        with profile.timed('config', 'load_yaml'):
+            pass
+
+        profile.mark('started')
+        self.assertIs(startup_profile, profile.stop())
+
+        with profile.timed('import', 'other'):
+            pass
+
+        data = startup_profile.as_dict()
+        self.assertEqual(['comp'], list(data['timings']['import']))
+        self.assertEqual(['load_yaml'], list(data['timings']['config']))
+        self.assertEqual(['started'], list(data['milestones']))
+
+    def test_summary_and_write(self):
+        """Test the profile summary and JSON output."""
+        startup_profile = profile.StartupProfile()
+        startup_profile.add('setup', 'light', 2)
+        startup_profile.add('setup', 'sun', 1)
+        startup_profile.add('setup', 'light', 1)
+        startup_profile.mark('started')
+
+        summary = startup_profile.summary(count=1).split('\n')
+        self.assertEqual('setup (2 entries, 4.000s total)', summary[2])
+        self.assertEqual(['light'], summary[3].split()[:1])
+        self.assertEqual(4, len(summary))
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'profile.json')
+            startup_profile.write(path)
+
+            with open(path) as fil:
+                data = json.load(fil)
+
+        self.assertEqual({'light': 3, 'sun': 1}, data['timings']['setup'])
+        self.assertIn('started', data['milestones'])
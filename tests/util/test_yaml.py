@@ -1,8 +1,12 @@
 """Test Home Assistant yaml loader."""
+import datetime
 import io
+import pickle
 import unittest
 import os
 import tempfile
+import time
+from unittest import mock
 from homeassistant.util import yaml
 import homeassistant.config as config_util
 from tests.common import get_test_config_dir
@@ -214,3 +218,145 @@ class TestSecrets(unittest.TestCase):
         """Ensure logger: debug was removed."""
         with self.assertRaises(yaml.HomeAssistantError):
             load_yaml(self._yaml_path, 'api_password: !secret logger')
+
+
+class TestYamlCache(unittest.TestCase):
+    """Test the cache of parsed YAML files."""
+
+    def setUp(self):  # pylint: disable=invalid-name
+        """Create a config dir and an empty cache."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.fname = os.path.join(self.tmp_dir.name, 'configuration.yaml')
+        self.orig_cache = yaml._CACHE
+        yaml._CACHE = {}
+
+    def tearDown(self):  # pylint: disable=invalid-name
+        """Restore the cache."""
+        yaml._CACHE = self.orig_cache
+        yaml._CACHE_PATH = None
+        self.tmp_dir.cleanup()
+
+    def _write(self, content, age=60):
+        """Write the config file, modified age seconds ago."""
+        with open(self.fname, 'w') as fil:
+            fil.write(content)
+        mtime = time.time() - age
+        os.utime(self.fname, (mtime, mtime))
+
+    def test_unchanged_file_not_parsed(self):
+        """Test an unchanged file is loaded from the cache."""
+        self._write('sensor:\n  platform: demo\n')
+        first = yaml.load_yaml(self.fname)
+
+        with mock.patch('homeassistant.util.yaml._parse_yaml') as mock_parse:
+            second = yaml.load_yaml(self.fname)
+
+        assert not mock_parse.called
+        assert first == second == {'sensor': {'platform': 'demo'}}
+        assert first is not second
+        assert 2 == second['sensor'].__line__
+        assert self.fname == second['sensor'].__config_file__
+
+    def test_changed_file_parsed_again(self):
+        """Test a changed file is parsed again."""
+        self._write('key: one')
+        assert {'key': 'one'} == yaml.load_yaml(self.fname)
+
+        self._write('key: other', age=30)
+        assert {'key': 'other'} == yaml.load_yaml(self.fname)
+
+    def test_recently_changed_file_not_cached(self):
+        """Test a file that was just written is not cached."""
+        self._write('key: one', age=0)
+        yaml.load_yaml(self.fname)
+
+        assert self.fname not in yaml._CACHE
+
+    def test_dynamic_tags_resolved_from_cache(self):
+        """Test secrets and environment variables are looked up again."""
+        with open(os.path.join(self.tmp_dir.name, 'secrets.yaml'), 'w') as fil:
+            fil.write('password: secret')
+
+        self._write('user: !env_var YAML_CACHE_USER\n'
+                    'password: !secret password\n')
+
+        with mock.patch.dict(os.environ, {'YAML_CACHE_USER': 'paulus'}):
+            assert {'user': 'paulus', 'password': 'secret'} == \
+                yaml.load_yaml(self.fname)
+
+        with mock.patch.dict(os.environ, {'YAML_CACHE_USER': 'other'}):
+            assert {'user': 'other', 'password': 'secret'} == \
+                yaml.load_yaml(self.fname)
+
+        with self.assertRaises(yaml.HomeAssistantError):
+            yaml.load_yaml(self.fname)
+
+    def test_cache_file(self):
+        """Test parsed files are kept in the cache file."""
+        cache_path = os.path.join(self.tmp_dir.name, '.yaml_cache')
+        self._write('key: value')
+
+        yaml.load_cache(cache_path)
+        yaml.load_yaml(self.fname)
+        yaml.save_cache()
+
+        yaml._CACHE = {}
+        yaml.load_cache(cache_path)
+
+        with mock.patch('homeassistant.util.yaml._parse_yaml') as mock_parse:
+            assert {'key': 'value'} == yaml.load_yaml(self.fname)
+
+        assert not mock_parse.called
+
+    def test_invalid_cache_file(self):
+        """Test an invalid cache file is ignored."""
+        cache_path = os.path.join(self.tmp_dir.name, '.yaml_cache')
+
+        with open(cache_path, 'w') as fil:
+            fil.write('invalid')
+
+        yaml.load_cache(cache_path)
+        assert {} == yaml._CACHE
+
+    def test_pickled_cache_file_ignored(self):
+        """Test a cache file is never unpickled."""
+        cache_path = os.path.join(self.tmp_dir.name, '.yaml_cache')
+
+        with open(cache_path, 'wb') as fil:
+            pickle.dump({'version': yaml.CACHE_VERSION, 'files': {}}, fil)
+
+        with mock.patch('pickle.load') as mock_load, \
+                mock.patch('pickle.loads') as mock_loads:
+            yaml.load_cache(cache_path)
+
+        assert not mock_load.called
+        assert not mock_loads.called
+        assert {} == yaml._CACHE
+
+    def test_invalid_cache_entry_parsed(self):
+        """Test a file is parsed again if its cache entry is invalid."""
+        self._write('key: value')
+        stat = os.stat(self.fname)
+        yaml._CACHE[self.fname] = (stat.st_mtime, stat.st_size, False,
+                                   '{"m": 1}')
+
+        assert {'key': 'value'} == yaml.load_yaml(self.fname)
+
+    def test_cached_values(self):
+        """Test the values of a file are the same when loaded from cache."""
+        self._write('list:\n  - 1\n  - 2.5\n  - !!set {a, b}\n'
+                    '1: true\nnone:\n')
+        first = yaml.load_yaml(self.fname)
+
+        with mock.patch('homeassistant.util.yaml._parse_yaml') as mock_parse:
+            assert first == yaml.load_yaml(self.fname)
+
+        assert not mock_parse.called
+
+    def test_dates_not_cached(self):
+        """Test a file with values the cache can not hold is not cached."""
+        self._write('date: 2016-08-01')
+
+        assert {'date': datetime.date(2016, 8, 1)} == \
+            yaml.load_yaml(self.fname)
+        assert self.fname not in yaml._CACHE